@@ -0,0 +1,100 @@
+import math
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo import EARTH_RADIUS_KM, distance_matrix_km, haversine_km, initial_bearing, vincenty_km  # noqa: E402
+
+# --- 거리 계산 벤치마크 ---
+# geo.py의 벡터화된 haversine/vincenty를 예전 05 페이지의 스칼라 haversine(math 모듈, 반복문)과 비교합니다.
+# 먼저 결과가 같은지 확인한 뒤(반지름 6371km → EARTH_RADIUS_KM 차이는 보정), 한국 안의 임의 지점 쌍으로 시간을 잽니다.
+# 실행: python bench/bench_geo.py
+LEGACY_RADIUS_KM = 6371
+SEED = 0
+PAIR_COUNTS = (1_000, 100_000)
+MATRIX_POINTS = 2_000
+SCALAR_MATRIX_POINTS = 200  # 스칼라 행렬은 느려서 이 크기로 잰 뒤 비례로 환산
+VINCENTY_MATRIX_POINTS = 500
+
+# Vincenty(1975) 검증 예제: Flinders Peak → Buninyong
+FLINDERS_PEAK = (-37.95103342, 144.42486789)
+BUNINYONG = (-37.65282114, 143.92649554)
+FLINDERS_DISTANCE_KM = 54.972271
+FLINDERS_BEARING_DEGREES = 306 + 52 / 60 + 5.37 / 3600
+
+
+def legacy_haversine(lat1, lon1, lat2, lon2):
+    # pages/05_지도3.py의 get_directions 안에 있던 함수 그대로
+    R = LEGACY_RADIUS_KM
+    dLat = math.radians(lat2 - lat1)
+    dLon = math.radians(lon2 - lon1)
+    a = math.sin(dLat/2) * math.sin(dLat/2) + math.cos(math.radians(lat1)) \
+        * math.cos(math.radians(lat2)) * math.sin(dLon/2) * math.sin(dLon/2)
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return R * c
+
+
+def random_points(rng, count):
+    # 한국 주변 (위도 33~38, 경도 125~129)
+    return 33 + rng.random(count) * 5, 125 + rng.random(count) * 4
+
+
+def check_correctness(rng):
+    lat1, lon1 = random_points(rng, 10_000)
+    lat2, lon2 = random_points(rng, 10_000)
+    legacy = np.array([legacy_haversine(*args) for args in zip(lat1.tolist(), lon1.tolist(), lat2.tolist(), lon2.tolist())])
+    vectorized = haversine_km(lat1, lon1, lat2, lon2)
+    max_diff = np.max(np.abs(legacy * EARTH_RADIUS_KM / LEGACY_RADIUS_KM - vectorized))
+    assert max_diff < 1e-9, f"스칼라 haversine과 차이: {max_diff}"
+
+    matrix = distance_matrix_km(lat1[:300], lon1[:300])
+    pairwise = haversine_km(lat1[:300, None], lon1[:300, None], lat1[None, :300], lon1[None, :300])
+    assert np.allclose(matrix, pairwise, rtol=0, atol=1e-9), "distance_matrix_km과 쌍별 계산이 다름"
+
+    distance = float(vincenty_km(*FLINDERS_PEAK, *BUNINYONG))
+    assert abs(distance - FLINDERS_DISTANCE_KM) < 1e-6, f"Flinders Peak → Buninyong: {distance:.6f} km"
+    # initial_bearing은 구면 방위이므로 타원체 값과는 소수점 아래에서 조금 다름
+    bearing = float(initial_bearing(*FLINDERS_PEAK, *BUNINYONG))
+    assert abs(bearing - FLINDERS_BEARING_DEGREES) < 0.2, f"Flinders Peak → Buninyong 방위: {bearing:.4f}°"
+    print(f"정확도 확인: 스칼라 대비 최대 차이 {max_diff:.1e} km, Flinders Peak → Buninyong {distance:.6f} km")
+
+
+def seconds(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    check_correctness(rng)
+
+    print(f"{'경우':<26}{'스칼라 반복문':>14}{'haversine':>14}{'vincenty':>14}{'배율':>8}")
+    for count in PAIR_COUNTS:
+        lat1, lon1 = random_points(rng, count)
+        lat2, lon2 = random_points(rng, count)
+        args = list(zip(lat1.tolist(), lon1.tolist(), lat2.tolist(), lon2.tolist()))
+        repeat = 20 if count <= 10_000 else 3
+        scalar = seconds(lambda: [legacy_haversine(*a) for a in args], repeat)
+        vector = seconds(lambda: haversine_km(lat1, lon1, lat2, lon2), repeat)
+        ellipsoid = seconds(lambda: vincenty_km(lat1, lon1, lat2, lon2), repeat)
+        print(f"{f'{count:,}쌍':<26}{scalar * 1000:>12.2f}ms{vector * 1000:>12.3f}ms{ellipsoid * 1000:>12.2f}ms"
+              f"{scalar / vector:>7.0f}x")
+
+    lats, lons = random_points(rng, MATRIX_POINTS)
+    small = list(zip(lats[:SCALAR_MATRIX_POINTS].tolist(), lons[:SCALAR_MATRIX_POINTS].tolist()))
+    scalar = seconds(lambda: [[legacy_haversine(a, b, c, d) for c, d in small] for a, b in small], 1)
+    scalar *= (MATRIX_POINTS / SCALAR_MATRIX_POINTS) ** 2
+    vector = seconds(lambda: distance_matrix_km(lats, lons), 3)
+    ellipsoid = seconds(lambda: distance_matrix_km(lats[:VINCENTY_MATRIX_POINTS], lons[:VINCENTY_MATRIX_POINTS],
+                                                   "vincenty"), 3)
+    print(f"{f'{MATRIX_POINTS:,}×{MATRIX_POINTS:,} 행렬 (스칼라는 환산)':<26}{scalar * 1000:>12.0f}ms"
+          f"{vector * 1000:>12.0f}ms{'-':>14}{scalar / vector:>7.0f}x")
+    print(f"{f'{VINCENTY_MATRIX_POINTS}×{VINCENTY_MATRIX_POINTS} vincenty 행렬':<26}{'-':>14}{'-':>14}"
+          f"{ellipsoid * 1000:>12.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import io
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from population_data import (  # noqa: E402
+    BUNDLED_MF_FILE,
+    BUNDLED_TOTAL_FILE,
+    age_columns,
+    parse_population_csv,
+    read_bundled_file,
+)
+
+# --- 인구 CSV 파싱 벤치마크 ---
+# 저장소에 포함된 두 파일로 parse_population_csv(읽는 시점에 쉼표 처리)와
+# 예전 페이지의 clean_numeric 루프(문자열로 읽은 뒤 컬럼마다 쉼표 제거 + int 변환)를 비교합니다.
+# 실행: python bench/bench_population_parse.py [반복 횟수]
+REPEAT = 5
+
+
+def legacy_parse(raw_bytes):
+    # pages/01_plotly.py 초기 버전과 같은 방식
+    df = pd.read_csv(io.BytesIO(raw_bytes), encoding='cp949')
+    df.columns = df.columns.str.strip()
+    for col in age_columns(df):
+        # pandas 3에서는 문자열 컬럼이 object가 아니라 str dtype이므로 숫자형이 아닌지로 판별
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].str.replace(",", "").astype(int)
+    return df
+
+
+def check_same(raw_bytes):
+    old, new = legacy_parse(raw_bytes), parse_population_csv(raw_bytes)
+    cols = age_columns(old)
+    assert cols == age_columns(new), "연령 컬럼 목록이 다름"
+    assert (old[cols].to_numpy() == new[cols].to_numpy()).all(), "연령 값이 다름"
+    assert (old['행정구역'].astype(str) == new['행정구역'].astype(str)).all(), "행정구역이 다름"
+
+
+def best_seconds(func, raw_bytes, repeat):
+    return min(timeit.repeat(lambda: func(raw_bytes), number=1, repeat=repeat))
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else REPEAT
+    print(f"{'파일':<24}{'행 수':>8}{'clean_numeric':>16}{'parse_population_csv':>24}{'배율':>8}")
+    for path in (BUNDLED_MF_FILE, BUNDLED_TOTAL_FILE):
+        raw_bytes = read_bundled_file(path)
+        check_same(raw_bytes)
+        rows = len(parse_population_csv(raw_bytes))
+        old = best_seconds(legacy_parse, raw_bytes, repeat)
+        new = best_seconds(parse_population_csv, raw_bytes, repeat)
+        print(f"{os.path.basename(path):<24}{rows:>8}{old * 1000:>14.1f}ms{new * 1000:>22.1f}ms{old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
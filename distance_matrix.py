@@ -0,0 +1,134 @@
+import sqlite3
+from functools import partial
+
+import numpy as np
+
+from geo import distance_matrix_km
+from http_client import get_json, run_parallel
+from route_cache import ROUTE_CACHE_FILE, cache_policy, get_cached_routes, put_cached_routes
+
+# --- 마커 간 거리/시간 행렬 ---
+# N개 지점의 모든 쌍에 대해 이동 시간(초)과 거리(m)를 구합니다.
+# 1) 직선거리(haversine)로 거를 수 있는 쌍(같은 위치, 이동 수단별 최대 거리 초과)은 API에 묻지 않고
+# 2) 경로 캐시(route_cache)에 있는 쌍을 한 번에 조회한 뒤
+# 3) 남은 쌍만 요청당 요소 수 제한에 맞춰 묶어 Distance Matrix API를 병렬로 호출합니다.
+# base_url을 바꾸면 같은 형식의 다른 서버(로컬 테스트용 스텁 등)를 쓸 수 있습니다.
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+MAX_ELEMENTS_PER_REQUEST = 100  # 출발지 수 × 도착지 수
+MAX_POINTS_PER_SIDE = 25
+ORIGIN_BLOCK = 10
+SAME_PLACE_KM = 0.01
+# 이동 수단별 직선거리 상한 (km, 이보다 멀면 경로가 있어도 쓸모가 없으므로 묻지 않음)
+MAX_STRAIGHT_KM = {"walking": 100, "bicycling": 300}
+
+
+def straight_distances(points):
+    # points: [(lat, lon)] → N×N 직선거리(km)
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return distance_matrix_km(coords[:, 0], coords[:, 1])
+
+
+def matrix_batches(needed, origin_block=ORIGIN_BLOCK):
+    # needed: 요청할 쌍 N×N bool → [(출발 인덱스 배열, 도착 인덱스 배열)]
+    # 출발지를 origin_block개씩 묶고, 그 묶음에 필요한 도착지만 요소 수 제한에 맞게 나눔
+    batches = []
+    for start in range(0, len(needed), origin_block):
+        origins = np.arange(start, min(start + origin_block, len(needed)))
+        origins = origins[needed[origins].any(axis=1)]
+        if not len(origins):
+            continue
+        destinations = np.nonzero(needed[origins].any(axis=0))[0]
+        per_request = min(MAX_POINTS_PER_SIDE, MAX_ELEMENTS_PER_REQUEST // len(origins))
+        for d in range(0, len(destinations), per_request):
+            batches.append((origins, destinations[d:d + per_request]))
+    return batches
+
+
+def request_batch(points, origins, destinations, mode, options, api_key, base_url, fetch):
+    # → (결과 행 목록, 오류 메시지 또는 None)
+    params = {
+        "origins": "|".join(f"{points[i][0]},{points[i][1]}" for i in origins),
+        "destinations": "|".join(f"{points[j][0]},{points[j][1]}" for j in destinations),
+        "mode": mode,
+        "key": api_key,
+        "language": "ko",
+        **options,
+    }
+    try:
+        data = fetch(base_url, params)
+    except Exception as e:
+        # 예외 메시지에는 API 키가 든 URL이 포함될 수 있으므로 종류만 표시
+        return None, f"API 호출 오류: {type(e).__name__}"
+    if data.get("status") != "OK":
+        message = data.get("error_message") or data.get("status", "알 수 없는 오류")
+        # 서버가 요청 내용을 되풀이하는 경우에 대비해 API 키는 가림
+        return None, message.replace(api_key, "***") if api_key else message
+    return data["rows"], None
+
+
+def compute_distance_matrix(points, mode="driving", options=None, api_key="", base_url=DISTANCE_MATRIX_URL,
+                            max_km=None, cache_path=ROUTE_CACHE_FILE, fetch=get_json):
+    # points: [(lat, lon)] → {"duration": N×N 초, "distance": N×N m (구하지 못한 쌍은 NaN), 요약 값들}
+    options = dict(options or {})
+    points = [(float(lat), float(lon)) for lat, lon in points]
+    n = len(points)
+    straight = straight_distances(points)
+    duration = np.full((n, n), np.nan)
+    distance = np.full((n, n), np.nan)
+
+    same = straight < SAME_PLACE_KM
+    duration[same], distance[same] = 0.0, 0.0
+    limit = max_km if max_km is not None else MAX_STRAIGHT_KM.get(mode)
+    wanted = ~same if limit is None else ~same & (straight <= limit)
+
+    # 캐시 조회
+    pairs = list(zip(*np.nonzero(wanted)))
+    policies = {
+        (i, j): cache_policy("matrix", *points[i], *points[j], mode, options)
+        for i, j in pairs
+    }
+    try:
+        cached = get_cached_routes([key for key, _ in policies.values()], cache_path)
+    except sqlite3.Error:
+        cached = {}  # 캐시 파일 문제는 API 호출로 대신함
+    needed = wanted.copy()
+    for (i, j), (key, _) in policies.items():
+        if key in cached:
+            duration[i, j], distance[i, j] = cached[key]["duration_value"], cached[key]["distance_value"]
+            needed[i, j] = False
+
+    # 남은 쌍만 묶어서 병렬 요청
+    batches = matrix_batches(needed)
+    responses = run_parallel({
+        b: partial(request_batch, points, origins, destinations, mode, options, api_key, base_url, fetch)
+        for b, (origins, destinations) in enumerate(batches)
+    })
+    errors, fresh = [], []
+    for b, (origins, destinations) in enumerate(batches):
+        rows, error = responses[b]
+        if error:
+            errors.append(error)
+            continue
+        for i, row in zip(origins, rows):
+            for j, element in zip(destinations, row["elements"]):
+                if not needed[i, j] or element.get("status") != "OK":
+                    continue
+                value = {"duration_value": element["duration"]["value"], "distance_value": element["distance"]["value"]}
+                duration[i, j], distance[i, j] = value["duration_value"], value["distance_value"]
+                key, ttl = policies[(i, j)]
+                fresh.append((key, value, ttl))
+    if fresh:
+        try:
+            put_cached_routes(fresh, cache_path)
+        except sqlite3.Error:
+            pass
+
+    return {
+        "duration": duration,
+        "distance": distance,
+        "straight_km": straight,
+        "requests": len(batches),
+        "cached": len(cached),
+        "skipped": int((~same & ~wanted).sum()),
+        "errors": errors,
+    }
@@ -0,0 +1,249 @@
+import numpy as np
+
+# --- 지도 화면 범위 ---
+# st_folium이 돌려주는 center/zoom으로 Web Mercator 기준 화면에 보이는 위도·경도 범위를 계산합니다.
+TILE_SIZE = 256
+
+
+def viewport_bounds(center, zoom, width_px=900, height_px=600, padding=0.5):
+    # (south, west, north, east), padding 비율만큼 화면보다 넓게 잡아 살짝 이동해도 마커가 비지 않도록 함
+    lat, lon = center
+    world_px = TILE_SIZE * 2 ** zoom
+    half_width = width_px / 2 * 360 / world_px * (1 + padding)
+    # 위도는 메르카토르 y로 바꿔 화면 높이만큼 위아래로 이동한 뒤 되돌림
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+    half_height = height_px / 2 * 2 * np.pi / world_px * (1 + padding)
+    south = np.degrees(2 * np.arctan(np.exp(y - half_height)) - np.pi / 2)
+    north = np.degrees(2 * np.arctan(np.exp(y + half_height)) - np.pi / 2)
+    return float(south), lon - half_width, float(north), lon + half_width
+
+
+# --- 거리 / 방위 ---
+# 모든 함수는 스칼라와 NumPy 배열을 모두 받으며, 배열은 브로드캐스팅 규칙대로 한 번에 계산합니다.
+# haversine은 구면 근사(오차 최대 약 0.5%), vincenty는 WGS-84 타원체 기준(mm 단위 정확도)입니다.
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = np.pi * EARTH_RADIUS_KM / 180  # 같은 구면 반지름 기준 (haversine 거리와 어긋나지 않도록)
+
+WGS84_A = 6378.137  # 장반경 (km)
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+VINCENTY_MAX_ITERATIONS = 200
+VINCENTY_TOLERANCE = 1e-12
+
+
+def _radians(*values):
+    return (np.radians(np.asarray(v, dtype=np.float64)) for v in values)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    # 배열끼리(또는 한 점과 배열) 대원 거리를 한 번에 계산
+    lat1, lon1, lat2, lon2 = _radians(lat1, lon1, lat2, lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def vincenty_km(lat1, lon1, lat2, lon2):
+    # Vincenty 역해법. 아직 수렴하지 않은 원소만 반복 계산하고, 끝내 수렴하지 않는 대척점 부근은 haversine 값으로 대신함
+    phi1, lam1, phi2, lam2 = np.broadcast_arrays(*_radians(lat1, lon1, lat2, lon2))
+    big_l = lam2 - lam1
+    u1 = np.arctan((1 - WGS84_F) * np.tan(phi1))
+    u2 = np.arctan((1 - WGS84_F) * np.tan(phi2))
+    sin_u1, cos_u1, sin_u2, cos_u2 = np.sin(u1), np.cos(u1), np.sin(u2), np.cos(u2)
+
+    lam = big_l.copy()
+    active = np.ones(lam.shape, dtype=bool)
+    for _ in range(VINCENTY_MAX_ITERATIONS):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha)
+        c = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+        new_lam = big_l + (1 - c) * WGS84_F * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+        )
+        converged = np.abs(new_lam - lam) < VINCENTY_TOLERANCE
+        lam = np.where(active, new_lam, lam)
+        active &= ~converged
+        if not active.any():
+            break
+
+    sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+    sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+    cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+    sigma = np.arctan2(sin_sigma, cos_sigma)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+        cos2_alpha = 1 - sin_alpha ** 2
+        cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha)
+    u_sq = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = big_b * sin_sigma * (cos_2sigma_m + big_b / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+    ))
+    distance = WGS84_B * big_a * (sigma - delta_sigma)
+    if active.any():
+        distance = np.where(active, haversine_km(lat1, lon1, lat2, lon2), distance)
+    return distance
+
+
+def distance_matrix_km(lats, lons, method="haversine"):
+    # N개 지점의 모든 쌍 거리 (N×N)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    distance = vincenty_km if method == "vincenty" else haversine_km
+    return distance(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+
+
+def initial_bearing(lat1, lon1, lat2, lon2):
+    # 출발점에서 도착점을 향하는 처음 방위각 (도, 북쪽 0 · 시계 방향)
+    lat1, lon1, lat2, lon2 = _radians(lat1, lon1, lat2, lon2)
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+
+def destination_point(lat, lon, bearing, distance_km):
+    # 방위각(도) 방향으로 distance_km만큼 간 지점 (구면 기준) → (위도, 경도)
+    lat, lon, bearing = _radians(lat, lon, bearing)
+    delta = np.asarray(distance_km, dtype=np.float64) / EARTH_RADIUS_KM
+    lat2 = np.arcsin(np.sin(lat) * np.cos(delta) + np.cos(lat) * np.sin(delta) * np.cos(bearing))
+    lon2 = lon + np.arctan2(
+        np.sin(bearing) * np.sin(delta) * np.cos(lat), np.cos(delta) - np.sin(lat) * np.sin(lat2)
+    )
+    return np.degrees(lat2), (np.degrees(lon2) + 540) % 360 - 180
+
+
+# --- 마커 공간 색인 ---
+# 위도·경도를 INDEX_CELL_DEGREES 크기의 격자(geohash처럼 칸 번호로 묶는 방식)로 나눠 칸 → 마커 위치를 유지합니다.
+# 반경/최근접/범위 질의는 해당 범위의 칸에 든 후보만 꺼내 거리를 벡터 연산으로 계산합니다.
+# 추가/삭제는 해당 칸만 고치며, 삭제된 자리가 절반을 넘으면 한 번 다시 만듭니다.
+INDEX_CELL_DEGREES = 0.05  # 약 5km
+MAX_SEARCH_KM = 20038  # 지구 반 바퀴
+BOX_PADDING_DEGREES = 1e-9  # 반경 경계의 부동소수점 오차만큼 후보 범위를 넓힘
+
+
+class MarkerIndex:
+    def __init__(self, markers=(), cell=INDEX_CELL_DEGREES):
+        self._cell = cell
+        self._lats = np.empty(0, dtype=np.float64)
+        self._lons = np.empty(0, dtype=np.float64)
+        self._markers = []  # 위치 → 마커 dict (삭제된 자리는 None)
+        self._cells = {}  # (위도 칸, 경도 칸) → {위치}
+        self._positions = {}  # 마커 id → 위치
+        self._labels = {}  # 이름 → [위치]
+        self.add_many(markers)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell_keys(self, lats, lons):
+        return zip(
+            np.floor(np.asarray(lats) / self._cell).astype(np.int64).tolist(),
+            np.floor(np.asarray(lons) / self._cell).astype(np.int64).tolist(),
+        )
+
+    def add_many(self, markers):
+        markers = list(markers)
+        if not markers:
+            return
+        start = len(self._markers)
+        lats = np.fromiter((m["lat"] for m in markers), dtype=np.float64, count=len(markers))
+        lons = np.fromiter((m["lon"] for m in markers), dtype=np.float64, count=len(markers))
+        if start + len(markers) > len(self._lats):
+            capacity = max(start + len(markers), 2 * len(self._lats), 64)
+            self._lats = np.resize(self._lats, capacity)
+            self._lons = np.resize(self._lons, capacity)
+        self._lats[start:start + len(markers)] = lats
+        self._lons[start:start + len(markers)] = lons
+        self._markers.extend(markers)
+        for position, marker, key in zip(range(start, start + len(markers)), markers, self._cell_keys(lats, lons)):
+            self._cells.setdefault(key, set()).add(position)
+            self._positions[marker["id"]] = position
+            self._labels.setdefault(marker["label"], []).append(position)
+
+    def remove(self, marker_id):
+        position = self._positions.pop(marker_id, None)
+        if position is None:
+            return
+        marker = self._markers[position]
+        self._markers[position] = None
+        key = next(self._cell_keys([marker["lat"]], [marker["lon"]]))
+        self._cells[key].discard(position)
+        if not self._cells[key]:
+            del self._cells[key]
+        self._labels[marker["label"]].remove(position)
+        if not self._labels[marker["label"]]:
+            del self._labels[marker["label"]]
+        if len(self._positions) * 2 < len(self._markers) - 64:
+            self.__init__([m for m in self._markers if m is not None], self._cell)
+
+    def find_label(self, label):
+        positions = self._labels.get(label)
+        return self._markers[positions[0]] if positions else None
+
+    def _candidates(self, south, west, north, east):
+        lat_range = range(int(np.floor(south / self._cell)), int(np.floor(north / self._cell)) + 1)
+        lon_range = range(int(np.floor(west / self._cell)), int(np.floor(east / self._cell)) + 1)
+        if len(lat_range) * len(lon_range) > len(self._cells):
+            keys = [key for key in self._cells if key[0] in lat_range and key[1] in lon_range]
+        else:
+            keys = [(i, j) for i in lat_range for j in lon_range if (i, j) in self._cells]
+        positions = [p for key in keys for p in self._cells[key]]
+        return np.fromiter(positions, dtype=np.int64, count=len(positions))
+
+    def _results(self, positions, distances):
+        order = np.argsort(distances, kind="stable")
+        return [(self._markers[p], float(d)) for p, d in zip(positions[order].tolist(), distances[order].tolist())]
+
+    def _radius_candidates(self, lat, lon, radius_km):
+        # 구면 위 반경 radius_km 원을 모두 덮는 위도·경도 범위의 후보
+        # 경도 폭은 중심 위도의 cos로 나누면 고위도 쪽 가장자리에서 모자라므로 asin(sin(r/R) / cos φ)로 구하고,
+        # 원이 극을 포함하면 모든 경도, 날짜변경선을 넘으면 두 범위로 나눠 찾습니다.
+        angle = radius_km / EARTH_RADIUS_KM
+        dlat = np.degrees(angle) + BOX_PADDING_DEGREES
+        south, north = lat - dlat, lat + dlat
+        if north >= 90 or south <= -90:
+            west, east = -180.0, 180.0
+        else:
+            ratio = np.sin(angle) / np.cos(np.radians(lat))
+            dlon = np.degrees(np.arcsin(min(ratio, 1.0))) + BOX_PADDING_DEGREES
+            west, east = lon - dlon, lon + dlon
+        if east - west >= 360:
+            boxes = [(south, -180.0, north, 180.0)]
+        elif west < -180:
+            boxes = [(south, west + 360, north, 180.0), (south, -180.0, north, east)]
+        elif east > 180:
+            boxes = [(south, west, north, 180.0), (south, -180.0, north, east - 360)]
+        else:
+            boxes = [(south, west, north, east)]
+        return np.concatenate([self._candidates(*box) for box in boxes])
+
+    def within_radius(self, lat, lon, radius_km):
+        # [(마커, 거리 km)], 가까운 순
+        candidates = self._radius_candidates(lat, lon, radius_km)
+        distances = haversine_km(lat, lon, self._lats[candidates], self._lons[candidates])
+        inside = distances <= radius_km
+        return self._results(candidates[inside], distances[inside])
+
+    def nearest(self, lat, lon, k=5):
+        # 반경을 두 배씩 늘리며 k개 이상 찾으면 그 안에서 가까운 k개 (반경 안의 결과는 정확하므로 누락 없음)
+        radius_km = self._cell * KM_PER_DEGREE_LAT
+        while True:
+            found = self.within_radius(lat, lon, radius_km)
+            if len(found) >= k or len(found) == len(self) or radius_km >= MAX_SEARCH_KM:
+                return found[:k]
+            radius_km *= 2
+
+    def within_bounds(self, bounds):
+        south, west, north, east = bounds
+        candidates = self._candidates(south, west, north, east)
+        lats, lons = self._lats[candidates], self._lons[candidates]
+        inside = (lats >= south) & (lats <= north) & (lons >= west) & (lons <= east)
+        return [self._markers[p] for p in candidates[inside].tolist()]
@@ -0,0 +1,40 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- 공유 HTTP 세션 ---
+# Google Maps API 호출은 프로세스 전체가 하나의 requests.Session(연결 풀)을 써서 TLS 연결을 재사용합니다.
+# 서로 독립적인 요청(예: 도보/자동차 경로)은 run_parallel로 동시에 보내 가장 느린 요청 시간만큼만 기다립니다.
+REQUEST_TIMEOUT = (3.05, 10)  # (연결, 응답 대기) 초
+POOL_SIZE = 16
+MAX_PARALLEL_REQUESTS = 8
+
+_session = None
+_session_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS, thread_name_prefix="http")
+
+
+def shared_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_json(url, params, timeout=REQUEST_TIMEOUT):
+    response = shared_session().get(url, params=params, timeout=timeout)
+    response.raise_for_status()  # HTTP 오류 검출
+    return response.json()
+
+
+def run_parallel(tasks):
+    # tasks: {이름: 인자 없는 함수} → {이름: 결과}, 예외는 호출한 쪽에서 그대로 발생
+    futures = {name: _executor.submit(task) for name, task in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
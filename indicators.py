@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# --- 기술적 지표 ---
+# 모든 함수는 (날짜 × 종목) 형태의 가격 DataFrame을 받아 같은 모양의 DataFrame을 돌려줍니다.
+# 종목별 반복 없이 pandas rolling/ewm 연산이 모든 열을 한 번에 계산합니다.
+TRADING_DAYS_PER_YEAR = 252
+
+
+def moving_average(prices, window):
+    return prices.rolling(window, min_periods=window).mean()
+
+
+def exponential_moving_average(prices, window):
+    return prices.ewm(span=window, adjust=False, min_periods=window).mean()
+
+
+def rsi(prices, window=14):
+    # Wilder 방식: 상승/하락폭의 지수평활 평균 비율
+    delta = prices.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    rs = gain / loss.replace(0, np.nan)
+    return (100 - 100 / (1 + rs)).where(loss != 0, 100.0).where(gain.notna())
+
+
+def bollinger_bands(prices, window=20, num_std=2.0):
+    middle = moving_average(prices, window)
+    std = prices.rolling(window, min_periods=window).std()
+    return middle, middle + num_std * std, middle - num_std * std
+
+
+def drawdown(prices):
+    # 직전 최고점 대비 하락률 (0 이하)
+    return prices / prices.cummax() - 1
+
+
+def rolling_volatility(prices, window=20):
+    # 일간 로그수익률의 연율화 표준편차
+    log_returns = np.log(prices / prices.shift(1))
+    return log_returns.rolling(window, min_periods=window).std() * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+
+def compute_indicators(prices, window=20, rsi_window=14):
+    middle, upper, lower = bollinger_bands(prices, window)
+    return {
+        "sma": moving_average(prices, window),
+        "ema": exponential_moving_average(prices, window),
+        "rsi": rsi(prices, rsi_window),
+        "bb_middle": middle,
+        "bb_upper": upper,
+        "bb_lower": lower,
+        "drawdown": drawdown(prices),
+        "volatility": rolling_volatility(prices, window),
+    }
+
+
+def indicator_summary(prices, indicators):
+    # 종목별 최신 지표 요약 (표 출력용)
+    return pd.DataFrame({
+        "최근 가격": prices.ffill().iloc[-1],
+        "RSI": indicators["rsi"].ffill().iloc[-1],
+        "변동성(연율)": indicators["volatility"].ffill().iloc[-1],
+        "현재 낙폭": indicators["drawdown"].ffill().iloc[-1],
+        "최대 낙폭": indicators["drawdown"].min(),
+    })
+
+
+def rebase(prices, base=100.0):
+    # 첫 유효 가격을 base로 맞춰 통화·가격대가 다른 종목을 같은 축에서 비교
+    first = prices.bfill().iloc[0]
+    return prices / first * base
+
+
+def log_returns(prices):
+    return np.log(prices / prices.shift(1)).iloc[1:]
+
+
+def correlation_matrix(returns, window=60):
+    # 최근 window일 수익률을 표준화한 뒤 Z^T Z 한 번으로 전체 종목 쌍의 상관계수를 계산
+    recent = returns.iloc[-window:].dropna(axis=1, how="any")
+    values = recent.to_numpy()
+    z = (values - values.mean(axis=0)) / values.std(axis=0, ddof=1)
+    corr = z.T @ z / (len(values) - 1)
+    return pd.DataFrame(corr, index=recent.columns, columns=recent.columns)
@@ -0,0 +1,165 @@
+import codecs
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+# --- 마커 대량 가져오기 / 내보내기 ---
+# CSV는 IMPORT_CHUNK_ROWS 행씩 나눠 읽고, 좌표 검증과 중복 제거는 덩어리 단위로 벡터 연산합니다.
+# 중복은 좌표를 약 1m 격자(DEDUPE_CELL_DEGREES)로 나눈 공간 해시가 같은지로 판단합니다.
+IMPORT_CHUNK_ROWS = 5000
+DEDUPE_CELL_DEGREES = 0.00001
+EXPORT_CHUNK_ROWS = 1000
+# 인코딩은 UTF-8(BOM 포함)을 먼저 시도하고, 아니면 한국어 엑셀 기본값인 cp949로 읽음
+FALLBACK_ENCODING = "cp949"
+ENCODING_CHECK_BYTES = 1 << 20
+
+# 파일마다 다른 컬럼 이름을 label, lat, lon으로 맞춤
+COLUMN_ALIASES = {
+    "label": ("label", "name", "title", "이름", "장소", "지명"),
+    "lat": ("latitude", "lat", "y", "위도"),
+    "lon": ("longitude", "lon", "lng", "long", "x", "경도"),
+}
+
+
+def find_column(columns, target):
+    lowered = {str(col).strip().lower(): col for col in columns}
+    for alias in COLUMN_ALIASES[target]:
+        if alias in lowered:
+            return lowered[alias]
+    return None
+
+
+def normalize_columns(frame):
+    renames = {}
+    for target in COLUMN_ALIASES:
+        column = find_column(frame.columns, target)
+        if column is not None:
+            renames[column] = target
+    return frame.rename(columns=renames)
+
+
+def detect_encoding(file, block_size=ENCODING_CHECK_BYTES):
+    # 끝까지 UTF-8(BOM 포함)로 읽히면 utf-8-sig, 아니면 한국어 엑셀에서 저장한 cp949로 봄
+    # 덩어리를 읽는 도중에 실패하면 앞부분이 이미 가져와진 뒤이므로, 읽기 전에 파일 전체를 확인하고 처음으로 되돌림
+    start = file.tell()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        while True:
+            block = file.read(block_size)
+            if isinstance(block, str):
+                return None  # 이미 문자열로 열린 파일
+            decoder.decode(block, final=not block)
+            if not block:
+                return "utf-8-sig"
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    finally:
+        file.seek(start)
+
+
+def read_marker_csv(file, chunksize=IMPORT_CHUNK_ROWS, encoding=None):
+    # 파일 전체를 한 번에 메모리에 올리지 않고 덩어리(DataFrame)를 차례로 돌려줌
+    encoding = encoding or detect_encoding(file)
+    for chunk in pd.read_csv(file, chunksize=chunksize, dtype=str, skipinitialspace=True, encoding=encoding):
+        yield normalize_columns(chunk)
+
+
+def read_marker_geojson(file, chunksize=IMPORT_CHUNK_ROWS):
+    # Point 피처만 사용하고, 이름은 properties의 label/name 등에서 가져옴
+    features = json.load(file).get("features", [])
+    for start in range(0, len(features), chunksize):
+        rows = []
+        for feature in features[start:start + chunksize]:
+            geometry = feature.get("geometry") or {}
+            coords = geometry.get("coordinates") if geometry.get("type") == "Point" else None
+            properties = feature.get("properties") or {}
+            label_key = find_column(properties, "label")
+            rows.append({
+                "label": properties[label_key] if label_key is not None else None,
+                "lon": coords[0] if coords and len(coords) >= 2 else None,
+                "lat": coords[1] if coords and len(coords) >= 2 else None,
+            })
+        yield pd.DataFrame(rows, columns=["label", "lat", "lon"])
+
+
+def validate_coordinates(frame):
+    # 숫자로 바꿀 수 없거나 범위를 벗어난 좌표를 한 번에 걸러 냄
+    lat = pd.to_numeric(frame["lat"], errors="coerce") if "lat" in frame else pd.Series(np.nan, index=frame.index)
+    lon = pd.to_numeric(frame["lon"], errors="coerce") if "lon" in frame else pd.Series(np.nan, index=frame.index)
+    valid = lat.between(-90, 90) & lon.between(-180, 180)
+    label = frame["label"] if "label" in frame else pd.Series("", index=frame.index)
+    cleaned = pd.DataFrame({
+        "label": label.fillna("").astype(str).str.strip(),
+        "lat": lat,
+        "lon": lon,
+    })[valid]
+    return cleaned, int((~valid).sum())
+
+
+def spatial_keys(lat, lon, cell=DEDUPE_CELL_DEGREES):
+    # 위도/경도 격자 칸 번호를 하나의 정수로 합친 공간 해시
+    lat_cell = np.floor((np.asarray(lat, dtype=np.float64) + 90) / cell).astype(np.int64)
+    lon_cell = np.floor((np.asarray(lon, dtype=np.float64) + 180) / cell).astype(np.int64)
+    return lat_cell * int(np.ceil(360 / cell) + 1) + lon_cell
+
+
+def import_markers(chunks, existing_locations, write_batch):
+    # chunks: read_marker_csv/read_marker_geojson 결과, write_batch: 검증된 마커 목록을 받아 저장하는 함수
+    seen = set(spatial_keys(
+        [loc["lat"] for loc in existing_locations], [loc["lon"] for loc in existing_locations]
+    ).tolist())
+    summary = {"read": 0, "invalid": 0, "duplicate": 0, "added": 0}
+    for chunk in chunks:
+        summary["read"] += len(chunk)
+        cleaned, invalid = validate_coordinates(chunk)
+        summary["invalid"] += invalid
+
+        keys = spatial_keys(cleaned["lat"], cleaned["lon"])
+        fresh = ~pd.Series(keys).duplicated().to_numpy() & ~np.isin(keys, list(seen))
+        summary["duplicate"] += int((~fresh).sum())
+        new = cleaned[fresh]
+        seen.update(keys[fresh].tolist())
+
+        # 이름이 없는 마커는 '마커 N'으로 채움
+        unnamed = new["label"] == ""
+        numbers = np.arange(summary["added"] + 1, summary["added"] + len(new) + 1)
+        new = new.assign(label=new["label"].where(~unnamed, [f"마커 {n}" for n in numbers]))
+        if len(new):
+            write_batch([
+                {"label": label, "lat": lat, "lon": lon}
+                for label, lat, lon in zip(new["label"].tolist(), new["lat"].tolist(), new["lon"].tolist())
+            ])
+        summary["added"] += len(new)
+    return summary
+
+
+def iter_markers_csv(locations, chunk_rows=EXPORT_CHUNK_ROWS):
+    # 헤더와 EXPORT_CHUNK_ROWS 행씩의 CSV 조각을 차례로 돌려줌
+    yield "label,lat,lon\n"
+    for start in range(0, len(locations), chunk_rows):
+        chunk = pd.DataFrame(locations[start:start + chunk_rows], columns=["label", "lat", "lon"])
+        yield chunk.to_csv(index=False, header=False)
+
+
+def iter_markers_geojson(locations):
+    # FeatureCollection을 피처 단위로 나눠 돌려줌
+    yield '{"type": "FeatureCollection", "features": ['
+    for i, loc in enumerate(locations):
+        feature = {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [loc["lon"], loc["lat"]]},
+            "properties": {"label": loc["label"]},
+        }
+        yield ("," if i else "") + json.dumps(feature, ensure_ascii=False)
+    yield "]}\n"
+
+
+def write_chunks(chunks):
+    # 조각을 이어 붙인 큰 문자열을 만들지 않고 바로 바이트 버퍼에 씀
+    buffer = io.BytesIO()
+    for chunk in chunks:
+        buffer.write(chunk.encode("utf-8"))
+    buffer.seek(0)
+    return buffer
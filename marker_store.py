@@ -0,0 +1,424 @@
+import re
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from gspread.exceptions import APIError
+from gspread.utils import ValueRenderOption, rowcol_to_a1
+
+from geo import MarkerIndex
+
+# --- 마커 시트 로컬 사본 ---
+# Google Sheet(Label, Latitude, Longitude)의 내용을 프로세스 안의 표로 보관하고 모든 읽기를 여기서 처리합니다.
+# 시트는 SYNC_INTERVAL_SECONDS마다 백그라운드에서 수정 시각(revision)만 확인하고, 바뀐 경우에만 전체 값을 다시 받습니다.
+# 같은 시트를 쓰는 04/05/06 페이지와 모든 세션이 하나의 사본을 공유합니다.
+SYNC_INTERVAL_SECONDS = 30
+
+LABEL_COLUMN = "Label"
+LAT_COLUMN = "Latitude"
+LON_COLUMN = "Longitude"
+ID_COLUMN = "ID"
+DEFAULT_HEADER = [LABEL_COLUMN, LAT_COLUMN, LON_COLUMN, ID_COLUMN]
+
+# 각 마커는 바뀌지 않는 ID를 가지며, 로컬에 ID → 시트 행 번호 색인을 유지합니다.
+# 삭제는 좌표 비교로 시트 전체를 훑지 않고, 색인의 행 번호로 바로 지웁니다.
+# ID가 없는 기존 행은 처음 불러올 때 ID를 만들어 시트에 한 번에 기록합니다.
+APPENDED_RANGE_PATTERN = re.compile(r"![A-Z]+(\d+):[A-Z]+(\d+)$")
+
+# --- 쓰기 지연(write-behind) 큐 ---
+# 추가/삭제는 로컬 사본에 바로 반영하고, 시트에는 FLUSH_DELAY_SECONDS 동안 모은 뒤
+# 연속된 추가는 append_rows 한 번, 연속된 삭제는 batch_update(deleteDimension) 한 번으로 보냅니다.
+# 할당량 초과(429)나 일시적인 서버 오류는 지수 백오프로 다시 시도합니다.
+FLUSH_DELAY_SECONDS = 2
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_BACKOFF_SECONDS = 64
+MAX_BATCH_ROWS = 1000  # 요청 하나에 담을 최대 변경 수 (대량 가져오기 시 요청 크기 제한)
+
+
+def new_marker_id():
+    # 숫자로 해석되지 않도록 문자로 시작
+    return f"m{uuid.uuid4().hex[:12]}"
+
+
+def empty_locations():
+    return pd.DataFrame({
+        "id": pd.Series(dtype=str),
+        "label": pd.Series(dtype=str),
+        "lat": pd.Series(dtype="float64"),
+        "lon": pd.Series(dtype="float64"),
+    })
+
+
+def sheet_header(values):
+    return [str(col).strip() for col in values[0]] if values else list(DEFAULT_HEADER)
+
+
+def values_to_locations(values):
+    # get_all_values() 결과(헤더 + 행)를 행 단위 반복 없이 id, label, lat, lon 표로 변환
+    # 위도/경도가 비었거나 숫자가 아닌 행은 건너뜁니다.
+    if not values or len(values) < 2:
+        return empty_locations()
+    header = sheet_header(values)
+    if LAT_COLUMN not in header or LON_COLUMN not in header:
+        return empty_locations()
+    frame = pd.DataFrame(values[1:]).reindex(columns=range(len(header)))
+    frame.columns = header
+
+    lat = pd.to_numeric(frame[LAT_COLUMN].replace("", None), errors="coerce")
+    lon = pd.to_numeric(frame[LON_COLUMN].replace("", None), errors="coerce")
+    if LABEL_COLUMN in header:
+        label = frame[LABEL_COLUMN].fillna("").astype(str)
+    else:
+        label = pd.Series([f"무명 마커 {i + 1}" for i in range(len(frame))])
+    ids = frame[ID_COLUMN].fillna("").astype(str) if ID_COLUMN in header else pd.Series([""] * len(frame))
+    valid = lat.notna() & lon.notna()
+    return pd.DataFrame({
+        "id": ids[valid],
+        "label": label[valid],
+        "lat": lat[valid].astype("float64"),
+        "lon": lon[valid].astype("float64"),
+    }).reset_index(drop=True)
+
+
+def row_index_from_ids(ids, first_row=2):
+    # 시트의 ID 열 값(헤더 제외) → ID별 행 번호 (1부터, 헤더가 1행)
+    rows = pd.Series(np.arange(first_row, first_row + len(ids), dtype=np.int64), index=pd.Index(ids, dtype=str))
+    return rows[rows.index != ""]
+
+
+def shift_rows(rows, deleted):
+    # 지운 행보다 아래에 있던 행은 지운 개수만큼 위로 당겨짐
+    deleted = np.sort(np.asarray(deleted, dtype=np.int64))
+    return rows - np.searchsorted(deleted, rows.to_numpy(), side="left")
+
+
+def appended_rows(response, count):
+    # append_rows 응답의 updatedRange('Sheet1!A302:D304')에서 새 행 번호를 읽음
+    match = APPENDED_RANGE_PATTERN.search(response.get("updates", {}).get("updatedRange", ""))
+    if match is None:
+        return None
+    first = int(match.group(1))
+    return list(range(first, first + count))
+
+
+def location_row(location, header):
+    fields = {LABEL_COLUMN: "label", LAT_COLUMN: "lat", LON_COLUMN: "lon", ID_COLUMN: "id"}
+    return [location[fields[col]] if col in fields else "" for col in header]
+
+
+def delete_rows_request(sheet_id, start, end):
+    # start/end는 0부터 세는 반열린 구간 [start, end)
+    return {"deleteDimension": {"range": {
+        "sheetId": sheet_id, "dimension": "ROWS", "startIndex": start, "endIndex": end,
+    }}}
+
+
+def is_retryable(error):
+    return isinstance(error, APIError) and error.code in RETRY_STATUS_CODES
+
+
+def table_to_records(table):
+    # 페이지에서 쓰는 [{'id', 'label', 'lat', 'lon'}, ...] 형식 (DataFrame.to_dict보다 훨씬 빠름)
+    return [
+        {"id": marker_id, "label": label, "lat": lat, "lon": lon}
+        for marker_id, label, lat, lon in zip(
+            table["id"].tolist(), table["label"].tolist(), table["lat"].tolist(), table["lon"].tolist()
+        )
+    ]
+
+
+class MarkerMirror:
+    def __init__(self, sync_interval=SYNC_INTERVAL_SECONDS, flush_delay=FLUSH_DELAY_SECONDS):
+        self.worksheet = None
+        self.last_write_error = None
+        self._sync_interval = sync_interval
+        self._flush_delay = flush_delay
+        self._pending = []  # 시트에 아직 보내지 않은 (종류, 마커) 목록
+        self._writer = None
+        self._table = empty_locations()
+        self._header = list(DEFAULT_HEADER)
+        self._rows = row_index_from_ids([])  # ID → 시트 행 번호
+        self._records = []  # 표가 바뀔 때만 다시 만드는 레코드 목록
+        self._index = MarkerIndex()  # 반경/최근접/범위 질의용 공간 색인 (추가/삭제 때 해당 마커만 고침)
+        self._revision = None
+        self._checked_at = None  # 마지막으로 시트와 맞춰 본 시각 (None이면 아직 불러오지 않음)
+        self._edits = 0  # 로컬 변경 횟수 (동기화 중 생긴 변경을 덮어쓰지 않도록)
+        self._lock = threading.Lock()
+        self._syncing = None
+
+    def attach(self, worksheet):
+        # 여러 세션이 동시에 연결해도 처음 연결된 워크시트를 계속 사용
+        with self._lock:
+            if self.worksheet is None:
+                self.worksheet = worksheet
+            return self.worksheet
+
+    @property
+    def loaded(self):
+        return self._checked_at is not None
+
+    def sync(self, force=False):
+        # 시트 수정 시각이 그대로면 값을 다시 받지 않음. 바뀌었을 때만 전체 값을 한 번에 받아 표를 교체
+        revision = self.worksheet.spreadsheet.get_lastUpdateTime()
+        with self._lock:
+            if self._pending or (not force and self.loaded and revision == self._revision):
+                # 보내지 않은 변경이 있으면 시트 값으로 덮어쓰지 않고, 반영된 뒤에 다시 확인
+                self._checked_at = time.monotonic()
+                return False
+            edits = self._edits
+        values = self.worksheet.get_all_values(value_render_option=ValueRenderOption.unformatted)
+        if self._fill_missing_ids(values):
+            revision = self.worksheet.spreadsheet.get_lastUpdateTime()
+        header = sheet_header(values)
+        table = values_to_locations(values)
+        rows = row_index_from_ids([str(row[header.index(ID_COLUMN)]) for row in values[1:]])
+        with self._lock:
+            if self._edits != edits:
+                # 받는 사이 로컬 변경이 있었으면 버리고 다음 주기에 다시 확인
+                return False
+            self._set_table(table)
+            self._header, self._rows = header, rows
+            self._revision, self._checked_at = revision, time.monotonic()
+        return True
+
+    def _fill_missing_ids(self, values):
+        # ID 열이 없거나 비어 있는 행에 ID를 만들어 열 전체를 한 번에 기록 (values도 같이 고침)
+        if not values:
+            values.append(list(DEFAULT_HEADER))
+            self.worksheet.update([DEFAULT_HEADER], "A1")
+            return True
+        header = sheet_header(values)
+        id_idx = header.index(ID_COLUMN) if ID_COLUMN in header else len(header)
+        for row in values:
+            row.extend([""] * (id_idx + 1 - len(row)))
+        if ID_COLUMN in header and all(str(row[id_idx]) for row in values[1:]):
+            return False
+        values[0][id_idx] = ID_COLUMN
+        for row in values[1:]:
+            row[id_idx] = str(row[id_idx]) or new_marker_id()
+        column_range = f"{rowcol_to_a1(1, id_idx + 1)}:{rowcol_to_a1(len(values), id_idx + 1)}"
+        self.worksheet.update([[row[id_idx]] for row in values], column_range)
+        return True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.sync()
+
+    def locations(self):
+        self._start_background_sync()
+        with self._lock:
+            return list(self._records)
+
+    def _start_background_sync(self):
+        with self._lock:
+            if self.worksheet is None or not self.loaded:
+                return
+            if time.monotonic() - self._checked_at < self._sync_interval:
+                return
+            if self._syncing is not None and self._syncing.is_alive():
+                return
+            self._syncing = threading.Thread(target=self._background_sync, name="marker-sync", daemon=True)
+            self._syncing.start()
+
+    def _background_sync(self):
+        try:
+            self.sync()
+        except Exception:
+            # 일시적인 오류는 기존 사본을 유지하고 다음 주기에 다시 시도
+            with self._lock:
+                self._checked_at = time.monotonic()
+
+    def _set_table(self, table):
+        # self._lock을 잡은 상태에서만 호출
+        self._table = table
+        self._records = table_to_records(table)
+        self._index = MarkerIndex(self._records)
+
+    # --- 공간 질의 (색인 사용) ---
+    def nearby(self, lat, lon, radius_km):
+        # [(마커, 거리 km)], 가까운 순
+        with self._lock:
+            return self._index.within_radius(lat, lon, radius_km)
+
+    def nearest(self, lat, lon, k=5):
+        with self._lock:
+            return self._index.nearest(lat, lon, k)
+
+    def within_bounds(self, bounds):
+        # bounds: (south, west, north, east)
+        with self._lock:
+            return self._index.within_bounds(bounds)
+
+    def find_label(self, label):
+        with self._lock:
+            return self._index.find_label(label)
+
+    # --- 로컬 사본에 변경 반영 ---
+    def apply_add(self, location):
+        self.apply_add_many([location])
+
+    def apply_add_many(self, locations):
+        rows = pd.DataFrame(locations, columns=["id", "label", "lat", "lon"])
+        records = table_to_records(rows)
+        with self._lock:
+            self._table = pd.concat([self._table, rows], ignore_index=True)
+            self._records.extend(records)
+            self._index.add_many(records)
+            self._edits += 1
+
+    def apply_delete(self, location):
+        with self._lock:
+            table = self._table
+            self._table = table[table["id"] != location["id"]].reset_index(drop=True)
+            self._records = [record for record in self._records if record["id"] != location["id"]]
+            self._index.remove(location["id"])
+            self._edits += 1
+
+    def apply_clear(self):
+        with self._lock:
+            self._set_table(empty_locations())
+            self._edits += 1
+
+    # --- 쓰기 지연 큐 ---
+    def queue_add(self, location):
+        location = {**location, "id": location.get("id") or new_marker_id()}
+        self.apply_add(location)
+        self._enqueue("add", location)
+        return location
+
+    def queue_add_many(self, locations):
+        # 대량 가져오기: 로컬 사본에는 한 번에 붙이고, 시트에는 MAX_BATCH_ROWS씩 나눠 보냄
+        locations = [{**location, "id": location.get("id") or new_marker_id()} for location in locations]
+        self.apply_add_many(locations)
+        with self._lock:
+            self._pending.extend(("add", location) for location in locations)
+        self._start_writer()
+        return locations
+
+    def queue_delete(self, location):
+        self.apply_delete(location)
+        self._enqueue("delete", location)
+
+    def queue_clear(self):
+        self.apply_clear()
+        self._enqueue("clear", None)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _enqueue(self, kind, location):
+        with self._lock:
+            self._pending.append((kind, location))
+        self._start_writer()
+
+    def _start_writer(self):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="marker-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        backoff = 1
+        while True:
+            time.sleep(self._flush_delay)  # 그동안 들어온 변경을 한 번에 모아 보냄
+            with self._lock:
+                batch = self._next_batch()
+                if not batch:
+                    self._writer = None
+                    return
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self.last_write_error = e
+                if is_retryable(e):
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+                    continue
+                # 다시 보내도 실패할 변경은 버리고, 다음 동기화에서 시트 내용으로 되돌림
+                with self._lock:
+                    del self._pending[:len(batch)]
+                    self._revision = None
+                continue
+            backoff = 1
+            self.last_write_error = None
+            with self._lock:
+                del self._pending[:len(batch)]
+
+    def _next_batch(self):
+        # 맨 앞부터 같은 종류가 이어지는 변경만 묶음 (추가와 삭제의 순서를 지키기 위해)
+        if not self._pending:
+            return []
+        kind = self._pending[0][0]
+        batch = []
+        for item in self._pending:
+            if item[0] != kind or len(batch) >= MAX_BATCH_ROWS:
+                break
+            batch.append(item)
+        return batch
+
+    def _write_batch(self, batch):
+        kind = batch[0][0]
+        if kind == "add":
+            locations = [location for _, location in batch]
+            response = self.worksheet.append_rows([location_row(location, self._header) for location in locations])
+            rows = appended_rows(response, len(locations))
+            with self._lock:
+                if rows is None:
+                    self._revision = None  # 행 번호를 알 수 없으면 다음 동기화에서 색인을 새로 만듦
+                else:
+                    new_rows = pd.Series(rows, index=[location["id"] for location in locations], dtype=np.int64)
+                    self._rows = pd.concat([self._rows, new_rows])
+            return
+
+        if kind == "clear":
+            ids = self._sheet_ids()
+            rows = list(range(2, len(ids) + 2))
+            spans = [(1, len(ids) + 1)] if ids else []
+        else:
+            rows = self._verified_rows([location["id"] for _, location in batch])
+            # 뒤쪽 행부터 지워야 앞쪽 행 번호가 밀리지 않음
+            spans = [(row - 1, row) for row in sorted(rows, reverse=True)]
+        if spans:
+            requests = [delete_rows_request(self.worksheet.id, start, end) for start, end in spans]
+            self.worksheet.spreadsheet.batch_update({"requests": requests})
+        with self._lock:
+            rows_index = self._rows[~self._rows.isin(rows)]
+            self._rows = shift_rows(rows_index, rows)
+
+    def _sheet_ids(self):
+        # ID 열만 받아 색인을 다시 만듦 (시트 전체를 받지 않음)
+        id_col = self._header.index(ID_COLUMN) + 1
+        ids = [str(value) for value in self.worksheet.col_values(id_col)[1:]]
+        with self._lock:
+            self._rows = row_index_from_ids(ids)
+        return ids
+
+    def _verified_rows(self, ids):
+        # 색인의 행에 실제로 같은 ID가 있는지 해당 셀만 읽어 확인하고,
+        # 다른 곳에서 시트가 바뀌어 어긋났으면 ID 열만 다시 받아 색인을 고침
+        with self._lock:
+            rows = self._rows.reindex(ids)
+        known = rows.dropna().astype(np.int64)
+        id_col = self._header.index(ID_COLUMN) + 1
+        if len(known) == len(ids):
+            cells = self.worksheet.batch_get([rowcol_to_a1(row, id_col) for row in known])
+            found = [str(cell[0][0]) if cell and cell[0] else "" for cell in cells]
+            if found == list(known.index):
+                return known.tolist()
+        self._sheet_ids()
+        with self._lock:
+            return self._rows.reindex(ids).dropna().astype(np.int64).tolist()
+
+_mirrors = {}
+_mirrors_lock = threading.Lock()
+
+
+def mirror_for(sheet_key, worksheet_name):
+    with _mirrors_lock:
+        key = (sheet_key, worksheet_name)
+        if key not in _mirrors:
+            _mirrors[key] = MarkerMirror()
+        return _mirrors[key]
@@ -1,91 +1,262 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from population_data import (
+    BUNDLED_MF_FILE, BUNDLED_TOTAL_FILE, LEVEL_EUPMYEONDONG, LEVEL_GU, LEVEL_SIGUNGU,
+    build_children_map, build_region_index, read_bundled_file
+)
+from population_store import (
+    AGE_BAND_WIDTHS, KIND_MF, KIND_TOTAL, SEX_FEMALE, SEX_MALE, SEX_TOTAL,
+    ingest_population_file, list_months, load_partition, population_matrix, query_cube,
+    query_population, store_version
+)
 
 st.title("🧭 연령별 인구 시각화 대시보드")
 
-# 1. 사용자 파일 업로드
-mf_file = st.file_uploader("📄 남녀구분 인구 CSV 파일 업로드", type="csv", key="mf")
-total_file = st.file_uploader("📄 남녀합계 인구 CSV 파일 업로드", type="csv", key="total")
+# --- 저장소 조회 (저장소 버전이 바뀌면 캐시도 갱신) ---
+@st.cache_data(show_spinner=False)
+def load_region_index(month, kind, version):
+    region_index = build_region_index(load_partition(month, kind))
+    return region_index, build_children_map(region_index)
 
-if mf_file is not None and total_file is not None:
-    # 2. CSV 읽기
-    mf_df = pd.read_csv(mf_file, encoding='cp949')
-    total_df = pd.read_csv(total_file, encoding='cp949')
+@st.cache_data(show_spinner=False)
+def cached_query(codes, months, sexes, version):
+    return query_population(list(codes), list(months), sexes)
 
-    # 3. 컬럼 공백 제거
-    mf_df.columns = mf_df.columns.str.strip()
-    total_df.columns = total_df.columns.str.strip()
+@st.cache_data(show_spinner=False)
+def cached_cube(month, width, sex, parent, version):
+    return query_cube(month, width, sex, parent=parent)
 
-    # 4. 연령 관련 컬럼 추출
-    age_cols_mf = [col for col in mf_df.columns if "세" in col]
-    age_cols_total = [col for col in total_df.columns if "세" in col]
+# --- 지역 선택 (시도 → 시군구 → 구 → 읍면동, 행정기관코드 반환) ---
+# 구가 있는 시는 시 → 구 → 읍면동 순서로, 구가 없는 시군구는 바로 읍면동을 고릅니다.
+SUB_LEVEL_KEYS = {LEVEL_SIGUNGU: "sigungu", LEVEL_GU: "gu", LEVEL_EUPMYEONDONG: "dong"}
 
-    # 5. 숫자형으로 변환
-    def clean_numeric(df, cols):
-        for col in cols:
-            if df[col].dtype == object:
-                df[col] = df[col].str.replace(",", "").astype(int)
-        return df
+def short_region_name(region_index, code):
+    info = region_index.loc[code]
+    if info["level"] == LEVEL_EUPMYEONDONG:
+        return info["eupmyeondong"]
+    if info["level"] == LEVEL_GU:
+        return info["name"].split(" ")[-1]
+    if info["level"] == LEVEL_SIGUNGU and info["sigungu"]:
+        return info["sigungu"]
+    return info["name"]
 
-    mf_df = clean_numeric(mf_df, age_cols_mf)
-    total_df = clean_numeric(total_df, age_cols_total)
+def select_region(region_index, children, key):
+    columns = st.columns(len(SUB_LEVEL_KEYS) + 1)
+    with columns[0]:
+        code = st.selectbox(
+            "시도", children[None], key=f"{key}_sido",
+            format_func=lambda c: short_region_name(region_index, c)
+        )
+    for column in columns[1:]:
+        sub_codes = children.get(code, [])
+        if not sub_codes:
+            break
+        level = region_index.at[sub_codes[0], "level"]
+        with column:
+            parent = code
+            code = st.selectbox(
+                level, [parent] + sub_codes, key=f"{key}_{SUB_LEVEL_KEYS[level]}",
+                format_func=lambda c, parent=parent: "전체" if c == parent else short_region_name(region_index, c)
+            )
+        if code == parent:
+            break
+    return code
+
+# 1. 월별 파일 업로드 → 저장소에 적재 (이미 적재된 파일은 건너뜀)
+uploaded_files = st.file_uploader(
+    "📄 월별 인구 CSV 파일 업로드 (남녀구분/남여합계, 여러 개 선택 가능)",
+    type="csv", accept_multiple_files=True, key="population_files"
+)
+add_bundled = st.checkbox("기본 제공 2025년 4월 데이터를 저장소에 추가", value=False)
+
+raw_files = [f.getvalue() for f in uploaded_files or []]
+if add_bundled:
+    raw_files += [read_bundled_file(BUNDLED_MF_FILE), read_bundled_file(BUNDLED_TOTAL_FILE)]
 
-    # 6. 지역명 추출
-    mf_df['지역'] = mf_df['행정구역'].str.extract(r"([\uAC00-\uD7AF\s]+구|\w+시|\w+군|\w+읍|\w+면)")
-    region_options = mf_df['지역'].dropna().unique().tolist()
-    region_options.sort()
+for raw_bytes in raw_files:
+    ingested, is_new = ingest_population_file(raw_bytes)
+    if is_new:
+        st.toast("저장소에 추가됨: " + ", ".join(f"{month} {kind}" for month, kind in ingested), icon="📥")
 
-    # 7. UI 탭 구성
-    tab1, tab2 = st.tabs(["👫 남녀 인구 피라미드", "👥 전체 인구 구조"])
+# 2. 저장소에 있는 월 목록
+mf_months = list_months(KIND_MF)
+total_months = list_months(KIND_TOTAL)
+version = store_version()
+
+if mf_months or total_months:
+    # 3. 행정구역 코드 인덱스 (가장 최근 월 기준)
+    if mf_months:
+        region_index, children = load_region_index(mf_months[-1], KIND_MF, version)
+    else:
+        region_index, children = load_region_index(total_months[-1], KIND_TOTAL, version)
+    st.caption(f"저장된 월: 남녀구분 {', '.join(mf_months) or '-'} / 남여합계 {', '.join(total_months) or '-'}")
+
+    # 4. UI 탭 구성
+    tab1, tab2, tab3, tab4 = st.tabs(
+        ["👫 남녀 인구 피라미드", "👥 전체 인구 구조", "📊 하위 지역 연령대 비교", "🔀 여러 지역 피라미드 비교"]
+    )
 
     # 탭 1 - 남녀 인구 피라미드
     with tab1:
-        region = st.selectbox("지역 선택 (남녀 피라미드)", region_options, key="tab1")
-        filtered = mf_df[mf_df['지역'] == region]
-
-        if not filtered.empty:
-            male_cols = [col for col in age_cols_mf if "_남_" in col]
-            female_cols = [col for col in age_cols_mf if "_여_" in col]
-            age_labels = [col.split("_")[-1] for col in male_cols]
-
-            male = filtered.iloc[0][male_cols].values * -1  # 좌측 대칭
-            female = filtered.iloc[0][female_cols].values
-
-            fig = go.Figure()
-            fig.add_trace(go.Bar(x=male, y=age_labels, orientation='h', name='남성', marker_color='blue'))
-            fig.add_trace(go.Bar(x=female, y=age_labels, orientation='h', name='여성', marker_color='red'))
-
-            fig.update_layout(
-                title=f"{region} 인구 피라미드",
-                barmode='relative',
-                xaxis=dict(title='인구 수', tickvals=[-2000, 0, 2000]),
-                yaxis=dict(title='연령'),
-                height=700
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if not mf_months:
+            st.info("남녀구분 파일을 먼저 추가해 주세요.")
         else:
-            st.warning("해당 지역 데이터가 없습니다.")
+            month = st.selectbox("기준 월", mf_months, index=len(mf_months) - 1, key="tab1_month")
+            st.markdown("지역 선택 (남녀 피라미드)")
+            region_code = select_region(region_index, children, key="tab1")
+            region = region_index.at[region_code, "name"]
+            result = cached_query((region_code,), (month,), (SEX_MALE, SEX_FEMALE), version)
+
+            if not result.empty:
+                male_df = result[result["sex"] == SEX_MALE]
+                female_df = result[result["sex"] == SEX_FEMALE]
+                age_labels = male_df["age"].tolist()
+
+                male = male_df["population"].values * -1  # 좌측 대칭
+                female = female_df["population"].values
+
+                fig = go.Figure()
+                fig.add_trace(go.Bar(x=male, y=age_labels, orientation='h', name='남성', marker_color='blue'))
+                fig.add_trace(go.Bar(x=female, y=age_labels, orientation='h', name='여성', marker_color='red'))
+
+                fig.update_layout(
+                    title=f"{region} 인구 피라미드 ({month})",
+                    barmode='relative',
+                    xaxis=dict(title='인구 수', tickvals=[-2000, 0, 2000]),
+                    yaxis=dict(title='연령'),
+                    height=700
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.warning("해당 지역 데이터가 없습니다.")
 
     # 탭 2 - 전체 인구 구조
     with tab2:
-        region2 = st.selectbox("지역 선택 (전체 인구)", region_options, key="tab2")
-        filtered2 = total_df[total_df['행정구역'].str.contains(region2)]
-
-        if not filtered2.empty:
-            age_labels = [col.split("_")[-1] for col in age_cols_total]
-            total_pop = filtered2.iloc[0][age_cols_total].values
-
-            fig2 = go.Figure()
-            fig2.add_trace(go.Scatter(x=age_labels, y=total_pop, mode='lines+markers', name='총인구'))
-            fig2.update_layout(
-                title=f"{region2} 연령별 인구 구조",
-                xaxis_title='연령',
+        if not total_months:
+            st.info("남여합계 파일을 먼저 추가해 주세요.")
+        else:
+            months2 = st.multiselect("비교할 월", total_months, default=total_months[-1:], key="tab2_months")
+            st.markdown("지역 선택 (전체 인구)")
+            region2_code = select_region(region_index, children, key="tab2")
+            region2 = region_index.at[region2_code, "name"]
+            result2 = cached_query((region2_code,), tuple(months2), (SEX_TOTAL,), version)
+
+            if not result2.empty:
+                fig2 = go.Figure()
+                for month2, month_df in result2.groupby("month", sort=True):
+                    fig2.add_trace(go.Scatter(
+                        x=month_df["age"], y=month_df["population"], mode='lines+markers', name=f"{month2} 총인구"
+                    ))
+                fig2.update_layout(
+                    title=f"{region2} 연령별 인구 구조",
+                    xaxis_title='연령',
+                    yaxis_title='인구 수',
+                    height=600
+                )
+                st.plotly_chart(fig2, use_container_width=True)
+
+                # 여러 달을 선택한 경우 월별 총인구 추이
+                if len(months2) > 1:
+                    monthly_total = result2.groupby("month")["population"].sum()
+                    fig_trend = go.Figure(go.Scatter(x=monthly_total.index, y=monthly_total.values, mode='lines+markers'))
+                    fig_trend.update_layout(
+                        title=f"{region2} 월별 총인구 추이", xaxis_title='월', yaxis_title='인구 수', height=400
+                    )
+                    st.plotly_chart(fig_trend, use_container_width=True)
+            else:
+                st.warning("해당 지역 데이터가 없습니다.")
+
+    # 탭 3 - 하위 지역 연령대 비교 (사전 집계 큐브 사용)
+    with tab3:
+        cube_months = sorted(set(mf_months) | set(total_months))
+        col_month, col_width, col_sex = st.columns(3)
+        with col_month:
+            month3 = st.selectbox("기준 월", cube_months, index=len(cube_months) - 1, key="tab3_month")
+        with col_width:
+            width = st.radio("연령대 폭", AGE_BAND_WIDTHS, format_func=lambda w: f"{w}세", horizontal=True, key="tab3_width")
+        with col_sex:
+            sex_options = [SEX_TOTAL, SEX_MALE, SEX_FEMALE] if month3 in mf_months else [SEX_TOTAL]
+            sex3 = st.radio("성별", sex_options, horizontal=True, key="tab3_sex")
+        st.markdown("상위 지역 선택 (하위 지역을 비교합니다)")
+        parent3 = select_region(region_index, children, key="tab3")
+        bands = cached_cube(month3, width, sex3, parent3, version)
+
+        if not bands.empty:
+            names = [region_index["name"].get(code, code) for code in bands.index]
+            fig3 = go.Figure()
+            for band in bands.columns:
+                fig3.add_trace(go.Bar(x=names, y=bands[band].values, name=band))
+            fig3.update_layout(
+                title=f"{region_index.at[parent3, 'name']} 하위 지역별 연령대 인구 ({month3}, {sex3})",
+                barmode='stack',
+                xaxis_title='지역',
                 yaxis_title='인구 수',
                 height=600
             )
-            st.plotly_chart(fig2, use_container_width=True)
+            st.plotly_chart(fig3, use_container_width=True)
+        else:
+            st.info("선택한 지역에는 하위 지역이 없습니다. 상위 지역을 선택해 주세요.")
+
+    # 탭 4 - 여러 지역 피라미드 비교 (한 번의 조회 + 하나의 Figure)
+    with tab4:
+        if not mf_months:
+            st.info("남녀구분 파일을 먼저 추가해 주세요.")
         else:
-            st.warning("해당 지역 데이터가 없습니다.")
+            col_month4, col_mode4 = st.columns(2)
+            with col_month4:
+                month4 = st.selectbox("기준 월", mf_months, index=len(mf_months) - 1, key="tab4_month")
+            with col_mode4:
+                compare_mode = st.radio("표시 방식", ["작은 피라미드 나열", "비율(%) 겹쳐 보기"], horizontal=True, key="tab4_mode")
+            compare_codes = st.multiselect(
+                "비교할 지역 선택", region_index.index.tolist(), key="tab4_regions",
+                format_func=lambda c: region_index.at[c, "name"]
+            )
+
+            if compare_codes:
+                result4 = cached_query(tuple(compare_codes), (month4,), (SEX_MALE, SEX_FEMALE), version)
+                codes4, age_labels4, values4 = population_matrix(result4, (SEX_MALE, SEX_FEMALE))
+                names4 = [region_index.at[c, "name"] for c in codes4]
+                male4, female4 = values4[:, 0, :], values4[:, 1, :]
+
+                # 선택한 월 파일에 없는 지역(신설/폐지 등)은 알려 주고 나머지만 그림
+                found4 = set(codes4)
+                missing4 = [c for c in compare_codes if c not in found4]
+                if missing4:
+                    st.warning(f"{month4} 데이터에 없는 지역: " + ", ".join(region_index.at[c, "name"] for c in missing4))
+
+                if codes4:
+                    if compare_mode == "작은 피라미드 나열":
+                        n_cols = min(4, len(codes4))
+                        n_rows = -(-len(codes4) // n_cols)
+                        fig4 = make_subplots(rows=n_rows, cols=n_cols, subplot_titles=names4, shared_yaxes=True)
+                        for i in range(len(codes4)):
+                            row, col = i // n_cols + 1, i % n_cols + 1
+                            fig4.add_trace(go.Bar(x=-male4[i], y=age_labels4, orientation='h', name='남성',
+                                                  marker_color='blue', showlegend=i == 0), row=row, col=col)
+                            fig4.add_trace(go.Bar(x=female4[i], y=age_labels4, orientation='h', name='여성',
+                                                  marker_color='red', showlegend=i == 0), row=row, col=col)
+                        fig4.update_layout(barmode='relative', height=max(500, 450 * n_rows),
+                                           title=f"지역별 인구 피라미드 ({month4})")
+                    else:
+                        # 지역별 총인구 대비 비율로 정규화해 규모가 다른 지역도 모양을 비교
+                        totals = values4.sum(axis=(1, 2))[:, None]
+                        male_share = male4 / totals * 100
+                        female_share = female4 / totals * 100
+                        fig4 = go.Figure()
+                        for i, name in enumerate(names4):
+                            fig4.add_trace(go.Scatter(x=-male_share[i], y=age_labels4, mode='lines', name=f"{name} 남",
+                                                      legendgroup=name))
+                            fig4.add_trace(go.Scatter(x=female_share[i], y=age_labels4, mode='lines', name=f"{name} 여",
+                                                      legendgroup=name, line=dict(dash='dot')))
+                        fig4.update_layout(
+                            title=f"지역별 인구 구성비 비교 ({month4})",
+                            xaxis=dict(title='인구 비율 (%)  ← 남성 | 여성 →'),
+                            yaxis=dict(title='연령'),
+                            height=800
+                        )
+                    st.plotly_chart(fig4, use_container_width=True)
+            else:
+                st.info("비교할 지역을 하나 이상 선택해 주세요.")
 else:
-    st.info("좌측 상단에서 두 개의 CSV 파일을 모두 업로드해 주세요.")
+    st.info("월별 인구 CSV 파일을 업로드하거나 기본 제공 데이터를 저장소에 추가해 주세요.")
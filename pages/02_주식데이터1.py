@@ -1,24 +1,21 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from plotly.colors import qualitative
+from datetime import date, datetime, timedelta
+from stock_data import fetch_close_prices, load_universe
+from indicators import compute_indicators, correlation_matrix, indicator_summary, log_returns, rebase
 
 st.set_page_config(page_title="📈 글로벌 시가총액 TOP10 주가 트렌드", layout="wide")
 st.title("📈 글로벌 시가총액 TOP10 기업의 최근 1년 주가 트렌드")
 
-top10_companies = {
-    "Apple": "AAPL",
-    "Microsoft": "MSFT",
-    "Saudi Aramco": "2222.SR",
-    "Alphabet (Google)": "GOOGL",
-    "Amazon": "AMZN",
-    "Nvidia": "NVDA",
-    "Berkshire Hathaway": "BRK-B",
-    "Meta Platforms": "META",
-    "TSMC": "TSM",
-    "Tesla": "TSLA"
-}
+# 종목 목록은 data/global_universe.csv에서 불러옵니다.
+top10_companies = load_universe()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_indicators(tickers, window, as_of, _prices):
+    # (종목 묶음, 창 크기, 기준일)별로 한 번만 계산
+    return compute_indicators(_prices, window)
 
 # 날짜 설정
 end_date = datetime.today() - timedelta(days=1)  # 미래 방지
@@ -26,52 +23,95 @@ start_date = end_date - timedelta(days=365)
 
 st.info("📡 주가 데이터를 로딩 중입니다...")
 
-data = {}
-error_list = []
-
-for name, ticker in top10_companies.items():
-    try:
-        ticker_obj = yf.Ticker(ticker)
-        hist = ticker_obj.history(start=start_date, end=end_date)
-        if hist.empty:
-            error_list.append(f"{name}: 데이터 없음")
-            continue
-        # 'Adj Close' 우선 사용, 없으면 'Close'
-        if "Adj Close" in hist.columns:
-            series = hist["Adj Close"]
-        elif "Close" in hist.columns:
-            series = hist["Close"]
-        else:
-            error_list.append(f"{name}: 'Adj Close' 또는 'Close' 컬럼 없음")
-            continue
-        data[name] = series
-    except Exception as e:
-        error_list.append(f"{name} 데이터 로드 실패: {e}")
+# 모든 종목을 동시에 요청 (종목별 오류는 error_list에 수집)
+data, error_list = fetch_close_prices(top10_companies, start_date, end_date)
 
 # 시각화
 if data:
     price_df = pd.DataFrame(data)
     price_df = price_df.interpolate(method='time')  # 시간 기준 보간
-    price_df = price_df.fillna(method='bfill')  # 앞에서 채우기
-    price_df = price_df.fillna(method='ffill')  # 뒤에서 채우기
-    fig = go.Figure()
-    for company in price_df.columns:
-        fig.add_trace(go.Scatter(
-            x=price_df.index,
-            y=price_df[company],
-            mode='lines',
-            name=company,
-            connectgaps=True  # 결측값 연결
-    ))
+    price_df = price_df.bfill()  # 앞에서 채우기
+    price_df = price_df.ffill()  # 뒤에서 채우기
+
+    view_mode = st.radio("표시 방식", ["주가", "100 기준 정규화", "수익률 상관관계"], horizontal=True)
+
+    # 기술적 지표 (전체 종목을 한 번에 계산)
+    indicator_window = 20
+    selected_overlays = []
+    if view_mode != "수익률 상관관계":
+        overlay_col, window_col = st.columns([2, 1])
+        with overlay_col:
+            selected_overlays = st.multiselect("차트에 겹쳐 볼 지표", ["이동평균", "지수이동평균"], default=[])
+        with window_col:
+            indicator_window = st.slider("지표 기간(일)", 5, 120, 20)
+    indicators = get_indicators(tuple(price_df.columns), indicator_window, date.today(), price_df)
+
+    if view_mode == "수익률 상관관계":
+        # 일간 로그수익률의 최근 N일 상관계수 행렬
+        corr_window = st.slider("상관계수 계산 기간(최근 거래일 수)", 20, 250, 60)
+        corr = correlation_matrix(log_returns(price_df), corr_window)
+        fig = go.Figure(go.Heatmap(
+            z=corr.values,
+            x=corr.columns,
+            y=corr.index,
+            zmin=-1,
+            zmax=1,
+            colorscale="RdBu_r",
+            hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>"
+        ))
+        fig.update_layout(
+            title=f"📊 최근 {corr_window}거래일 일간 로그수익률 상관관계",
+            height=max(500, 30 * len(corr)),
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        normalized = view_mode == "100 기준 정규화"
+        plot_df = rebase(price_df) if normalized else price_df
+        # 정규화 모드에서는 지표선도 같은 비율로 맞춤
+        scale = 100 / price_df.bfill().iloc[0] if normalized else pd.Series(1.0, index=price_df.columns)
+
+        fig = go.Figure()
+        for i, company in enumerate(plot_df.columns):
+            color = qualitative.Plotly[i % len(qualitative.Plotly)]
+            fig.add_trace(go.Scatter(
+                x=plot_df.index,
+                y=plot_df[company],
+                mode='lines',
+                name=company,
+                line=dict(color=color),
+                legendgroup=company,
+                connectgaps=True  # 결측값 연결
+            ))
+            for overlay, key, dash in (("이동평균", "sma", "dash"), ("지수이동평균", "ema", "dot")):
+                if overlay in selected_overlays:
+                    fig.add_trace(go.Scatter(
+                        x=plot_df.index,
+                        y=indicators[key][company] * scale[company],
+                        mode='lines',
+                        name=f"{company} {overlay}({indicator_window})",
+                        line=dict(color=color, dash=dash, width=1),
+                        legendgroup=company,
+                        showlegend=False
+                    ))
+
+        fig.update_layout(
+            title="📊 글로벌 시가총액 상위 기업의 최근 1년간 주가 변화" + (" (시작일 = 100)" if normalized else ""),
+            xaxis_title="날짜",
+            yaxis_title="상대 주가 (시작일 = 100)" if normalized else "주가 (현지 통화)",
+            height=700,
+            legend=dict(orientation="h", y=-0.2),
+        )
+        st.plotly_chart(fig, use_container_width=True)
 
-    fig.update_layout(
-        title="📊 글로벌 시가총액 상위 10개 기업의 최근 1년간 주가 변화",
-        xaxis_title="날짜",
-        yaxis_title="주가 (USD)",
-        height=700,
-        legend=dict(orientation="h", y=-0.2),
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    st.subheader("📐 종목별 지표 요약")
+    summary = indicator_summary(price_df, indicators)
+    st.dataframe(summary.style.format({
+        "최근 가격": "{:,.2f}",
+        "RSI": "{:.1f}",
+        "변동성(연율)": "{:.1%}",
+        "현재 낙폭": "{:.1%}",
+        "최대 낙폭": "{:.1%}",
+    }), use_container_width=True)
 else:
     st.warning("❌ 유효한 데이터를 불러오지 못했습니다.")
 
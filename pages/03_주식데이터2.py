@@ -1,21 +1,14 @@
 import streamlit as st
-import yfinance as yf
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-import os
 import folium
+from folium.plugins import MarkerCluster
 from streamlit_folium import st_folium
 import pandas as pd
+import copy
 import random
-
-# --- 한글 폰트 설정 ---
-# 시스템 환경에 따라 경로 조정 (Streamlit Cloud 또는 리눅스 서버 기준 예시)
-font_path = os.path.join("fonts", "Malgun Gothic")
-if os.path.exists(font_path):
-    fontprop = fm.FontProperties(fname=font_path)
-    plt.rcParams['font.family'] = fontprop.get_name()
-else:
-    st.warning("한글 폰트 파일이 존재하지 않습니다. 경로를 확인해주세요.")
+from datetime import date
+from stock_data import companies_in_bounds, load_company_table, prefetch_histories, shared_history
+from stock_charts import build_price_figure
+from indicators import compute_indicators, indicator_summary
 
 # --- 페이지 설정 ---
 st.set_page_config(
@@ -25,15 +18,47 @@ st.set_page_config(
 )
 
 # --- 데이터 ---
-COMPANIES = {
-    "삼성전자": {"ticker": "005930.KS", "lat": 37.2390, "lon": 127.0708, "logo": "https://upload.wikimedia.org/wikipedia/commons/thumb/2/24/Samsung_Logo.svg/2560px-Samsung_Logo.svg.png"},
-    "SK하이닉스": {"ticker": "000660.KS", "lat": 37.2780, "lon": 127.1460, "logo": "https://upload.wikimedia.org/wikipedia/commons/thumb/c/ca/SK_Hynix_logo.svg/1200px-SK_Hynix_logo.svg.png"},
-    "LG에너지솔루션": {"ticker": "373220.KS", "lat": 37.5267, "lon": 126.9290, "logo": "https://www.lgensol.com/assets/images/common/logo_header.svg"},
-    "현대자동차": {"ticker": "005380.KS", "lat": 37.5282, "lon": 127.0262, "logo": "https://upload.wikimedia.org/wikipedia/commons/thumb/2/27/Hyundai_Motor_Company_logo.svg/1920px-Hyundai_Motor_Company_logo.svg.png"},
-    "NAVER": {"ticker": "035420.KS", "lat": 37.3948, "lon": 127.1112, "logo": "https://upload.wikimedia.org/wikipedia/commons/thumb/2/23/Naver_Logotype.svg/1200px-Naver_Logotype.svg.png"},
-    "카카오": {"ticker": "035720.KS", "lat": 33.4996, "lon": 126.5312, "logo": "https://upload.wikimedia.org/wikipedia/commons/thumb/e/e3/KakaoTalk_logo.svg/1024px-KakaoTalk_logo.svg.png"}
+# 기업 목록(티커, 본사 위도/경도, 로고)은 data/k_companies.csv에서 불러옵니다.
+@st.cache_data(show_spinner=False)
+def get_company_table():
+    return load_company_table()
+
+COMPANIES = get_company_table()
+PREFETCH_NEIGHBOURS = 8  # 지도에 보이는 기업 중 미리 받아 둘 주가 수
+
+def company_popup_html(name, info):
+    return f"""
+    <b>{name}</b> ({info['ticker']})<br>
+    <img src='{info['logo']}' alt='logo' width='50' onerror="this.style.display='none'"><br>
+    <a href='https://finance.yahoo.com/quote/{info['ticker']}' target='_blank'>Yahoo Finance에서 보기</a>
+    """
+
+# 모든 기업 마커가 들어간 정적 기본 지도는 한 번만 만들어 모든 세션이 함께 씁니다.
+# 만든 뒤에는 고치지 않으며, 화면에 그릴 때는 실행마다 복사본을 씁니다.
+@st.cache_resource(show_spinner=False)
+def get_base_map():
+    m = folium.Map(location=[COMPANIES["lat"].mean(), COMPANIES["lon"].mean()], zoom_start=7)
+    # 기업이 많아도 가까운 마커끼리 묶어서 표시
+    marker_cluster = MarkerCluster().add_to(m)
+    for name, info in COMPANIES.iterrows():
+        folium.Marker(
+            [info["lat"], info["lon"]],
+            popup=folium.Popup(company_popup_html(name, info), max_width=200),
+            tooltip=name,
+            icon=folium.Icon(color="blue", icon="info-sign")
+        ).add_to(marker_cluster)
+    return m
+
+PERIOD_OPTIONS = {
+    "6개월": "6mo",
+    "1년": "1y",
+    "2년": "2y",
+    "5년": "5y",
+    "10년": "10y",
 }
 
+INDICATOR_OVERLAYS = ["이동평균", "지수이동평균", "볼린저 밴드"]
+
 INVESTMENT_OPINIONS = [
     "🚀 지금이 매수 타이밍! 우주로 가즈아!",
     "🤔 신중한 접근이 필요해 보입니다. 시장 상황을 더 지켜보세요.",
@@ -44,34 +69,41 @@ INVESTMENT_OPINIONS = [
 ]
 
 # --- 함수 정의 ---
-@st.cache_data(ttl=3600)
 def get_stock_data(ticker_symbol, period="1y"):
     try:
-        stock = yf.Ticker(ticker_symbol)
-        data = stock.history(period=period)
-        data.index = data.index.strftime('%Y-%m-%d')
+        # 세션 간 공유 캐시 → 디스크 캐시 → Yahoo Finance 순으로 조회
+        data = shared_history(ticker_symbol, period=period)
         return data
     except Exception as e:
         st.error(f"{ticker_symbol} 주식 데이터를 가져오는 중 오류 발생: {e}")
         return pd.DataFrame()
 
-def plot_stock_chart(data, company_name):
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_indicators(tickers, period, window, as_of, _prices):
+    # (종목 묶음, 기간, 창 크기, 기준일)별로 한 번만 계산
+    return compute_indicators(_prices, window)
+
+def indicator_overlays(indicators, ticker_symbol, selected_overlays):
+    overlays = {}
+    if "이동평균" in selected_overlays:
+        overlays["이동평균"] = indicators["sma"][ticker_symbol]
+    if "지수이동평균" in selected_overlays:
+        overlays["지수이동평균"] = indicators["ema"][ticker_symbol]
+    if "볼린저 밴드" in selected_overlays:
+        overlays["볼린저 상단"] = indicators["bb_upper"][ticker_symbol]
+        overlays["볼린저 하단"] = indicators["bb_lower"][ticker_symbol]
+    return overlays
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_stock_chart(ticker_symbol, period, company_name, period_label, as_of, selected_overlays, window):
+    # (종목, 기간, 기준일, 지표 설정)별로 다운샘플링된 Plotly 차트를 한 번만 만듭니다.
+    data = get_stock_data(ticker_symbol, period)
     if data.empty or 'Close' not in data.columns:
-        st.warning(f"{company_name}의 주가 데이터를 표시할 수 없습니다.")
         return None
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(data.index, data['Close'], label=f'{company_name} 종가', color='dodgerblue', linewidth=2)
-    ax.set_title(f'{company_name} 최근 1년 주가 추이', fontsize=18)
-    ax.set_xlabel('날짜', fontsize=12)
-    ax.set_ylabel('주가 (KRW)', fontsize=12)
-    ax.legend(fontsize=10)
-    ax.grid(True, linestyle='--', alpha=0.7)
-    plt.xticks(rotation=45)
-    if len(data.index) > 50:
-        ax.xaxis.set_major_locator(plt.MaxNLocator(10))
-    plt.tight_layout()
-    return fig
+    prices = data[['Close']].rename(columns={'Close': ticker_symbol})
+    indicators = get_indicators((ticker_symbol,), period, window, as_of, prices)
+    overlays = indicator_overlays(indicators, ticker_symbol, selected_overlays)
+    return build_price_figure(data, company_name, period_label, overlays=overlays)
 
 # --- 앱 UI 구성 ---
 st.title("📈 나만의 K-기업 투자 지도 🗺️")
@@ -81,10 +113,21 @@ st.markdown("관심 있는 한국 기업의 주가와 본사 위치를 한눈에
 st.sidebar.header("🏢 기업 선택")
 selected_company_name = st.sidebar.selectbox(
     "분석할 기업을 선택하세요:",
-    list(COMPANIES.keys())
+    COMPANIES.index.tolist()
 )
 
-selected_company_info = COMPANIES[selected_company_name]
+selected_period_label = st.sidebar.selectbox(
+    "조회 기간:",
+    list(PERIOD_OPTIONS.keys()),
+    index=1
+)
+selected_period = PERIOD_OPTIONS[selected_period_label]
+
+st.sidebar.header("📐 기술적 지표")
+selected_overlays = st.sidebar.multiselect("차트에 표시할 지표:", INDICATOR_OVERLAYS, default=["이동평균"])
+indicator_window = st.sidebar.slider("이동평균/볼린저/변동성 기간(일):", 5, 120, 20)
+
+selected_company_info = COMPANIES.loc[selected_company_name]
 ticker = selected_company_info["ticker"]
 
 # --- 메인 화면 ---
@@ -93,22 +136,37 @@ st.header(f"{selected_company_name} ({ticker})")
 col1, col2 = st.columns([2, 1])
 
 with col1:
-    st.subheader("📊 주가 정보 (최근 1년)")
-    stock_data = get_stock_data(ticker)
+    st.subheader(f"📊 주가 정보 (최근 {selected_period_label})")
+    stock_data = get_stock_data(ticker, selected_period)
 
     if not stock_data.empty:
-        chart_fig = plot_stock_chart(stock_data, selected_company_name)
+        chart_fig = get_stock_chart(
+            ticker, selected_period, selected_company_name, selected_period_label,
+            date.today(), tuple(selected_overlays), indicator_window
+        )
         if chart_fig:
-            st.pyplot(chart_fig)
+            st.plotly_chart(chart_fig, use_container_width=True)
+        else:
+            st.warning(f"{selected_company_name}의 주가 데이터를 표시할 수 없습니다.")
 
         st.markdown("---")
         latest_price = stock_data['Close'].iloc[-1]
-        highest_price_1y = stock_data['High'].max()
-        lowest_price_1y = stock_data['Low'].min()
+        highest_price = stock_data['High'].max()
+        lowest_price = stock_data['Low'].min()
         st.markdown(f"""
         - **최근 종가:** `{latest_price:,.0f} KRW`
-        - **지난 1년 최고가:** `{highest_price_1y:,.0f} KRW`
-        - **지난 1년 최저가:** `{lowest_price_1y:,.0f} KRW`
+        - **지난 {selected_period_label} 최고가:** `{highest_price:,.0f} KRW`
+        - **지난 {selected_period_label} 최저가:** `{lowest_price:,.0f} KRW`
+        """)
+
+        prices = stock_data[['Close']].rename(columns={'Close': ticker})
+        summary = indicator_summary(
+            prices, get_indicators((ticker,), selected_period, indicator_window, date.today(), prices)
+        ).loc[ticker]
+        st.markdown(f"""
+        - **RSI(14):** `{summary['RSI']:.1f}`
+        - **변동성({indicator_window}일, 연율):** `{summary['변동성(연율)']:.1%}`
+        - **현재 낙폭 / 최대 낙폭:** `{summary['현재 낙폭']:.1%}` / `{summary['최대 낙폭']:.1%}`
         """)
     else:
         st.warning(f"{selected_company_name}의 주가 데이터를 가져올 수 없습니다.")
@@ -118,30 +176,35 @@ with col2:
     map_center_lat = selected_company_info["lat"]
     map_center_lon = selected_company_info["lon"]
 
-    m = folium.Map(location=[map_center_lat, map_center_lon], zoom_start=7)
-
-    for name, info in COMPANIES.items():
-        popup_html = f"""
-        <b>{name}</b> ({info['ticker']})<br>
-        <img src='{info.get('logo', '')}' alt='logo' width='50' onerror="this.style.display='none'"><br>
-        <a href='https://finance.yahoo.com/quote/{info['ticker']}' target='_blank'>Yahoo Finance에서 보기</a>
-        """
-        if name == selected_company_name:
-            folium.Marker(
-                [info["lat"], info["lon"]],
-                popup=folium.Popup(popup_html, max_width=200),
-                tooltip=f"{name} (선택됨)",
-                icon=folium.Icon(color="red", icon="star")
-            ).add_to(m)
-        else:
-            folium.Marker(
-                [info["lat"], info["lon"]],
-                popup=folium.Popup(popup_html, max_width=200),
-                tooltip=name,
-                icon=folium.Icon(color="blue", icon="info-sign")
-            ).add_to(m)
-
-    st_folium(m, width=700, height=400)
+    # 선택 강조 마커만 매번 새로 만들고, 기본 지도는 바꾸지 않아 브라우저가 지도를 다시 그리지 않음
+    # st_folium은 렌더링하면서 지도 객체를 고치고 강조 레이어도 지도에 붙이므로(add_to), 공유 지도 대신 이번 실행용 복사본을 넘김
+    # (복사본은 요소 id가 같아 기본 지도 HTML이 그대로 유지됨)
+    session_map = copy.deepcopy(get_base_map())
+    highlight = folium.FeatureGroup(name="선택한 기업")
+    folium.Marker(
+        [map_center_lat, map_center_lon],
+        popup=folium.Popup(company_popup_html(selected_company_name, selected_company_info), max_width=200),
+        tooltip=f"{selected_company_name} (선택됨)",
+        icon=folium.Icon(color="red", icon="star"),
+        z_index_offset=1000
+    ).add_to(highlight)
+
+    map_state = st_folium(
+        session_map,
+        key="company_map",
+        width=700,
+        height=400,
+        center=(map_center_lat, map_center_lon),
+        feature_group_to_add=highlight,
+        returned_objects=["bounds"],
+    )
+
+    # 지도에 보이는 주변 기업의 주가는 백그라운드에서 미리 받아 둠 (선택 시 바로 표시)
+    if map_state and map_state.get("bounds") and map_state["bounds"].get("_southWest"):
+        visible = companies_in_bounds(COMPANIES, map_state["bounds"]).drop(selected_company_name, errors="ignore")
+        distance = (visible["lat"] - map_center_lat) ** 2 + (visible["lon"] - map_center_lon) ** 2
+        neighbours = visible.loc[distance.nsmallest(PREFETCH_NEIGHBOURS).index, "ticker"]
+        prefetch_histories(neighbours.tolist(), period=selected_period)
 
     st.markdown("---")
     st.subheader("🤖 AI의 재미로 보는 투자 의견")
@@ -153,7 +216,7 @@ with col2:
 st.markdown("---")
 st.subheader("ℹ️ 정보")
 st.markdown("""
-- 이 앱은 `Streamlit`, `yfinance`, `Matplotlib`, `Folium` 등을 사용하여 제작되었습니다.
+- 이 앱은 `Streamlit`, `yfinance`, `Plotly`, `Folium` 등을 사용하여 제작되었습니다.
 - 주가 데이터는 Yahoo Finance에서 제공되며, 실시간이 아닐 수 있습니다.
 - 본사 위치 및 로고는 예시이며, 실제와 다를 수 있습니다.
 - 모든 투자 결정은 개인의 판단과 책임 하에 이루어져야 합니다.
@@ -3,6 +3,7 @@ import folium
 from streamlit_folium import st_folium
 import gspread
 from google.oauth2.service_account import Credentials # google-auth의 일부
+from marker_store import mirror_for
 
 # -----------------------------------------------------------------------------
 # 페이지 설정 - 반드시 Streamlit 명령어 중 가장 먼저 실행되어야 합니다!
@@ -56,29 +57,14 @@ def get_worksheet(gc, sheet_key, worksheet_name_or_index=0):
         st.error(f"워크시트 '{sheet_key}' (시트: {worksheet_name_or_index}) 로딩 중 오류: {e}")
         return None
 
-def load_locations_from_sheet(worksheet):
-    if worksheet is None:
+def load_locations_from_sheet(mirror):
+    if mirror.worksheet is None:
         st.warning("워크시트가 제공되지 않아 위치 정보를 불러올 수 없습니다.")
         return []
     try:
-        records = worksheet.get_all_records()
-        locations = []
-        for i, record in enumerate(records):
-            try:
-                lat = record.get("Latitude")
-                lon = record.get("Longitude")
-                if lat is None or lon is None:
-                    st.warning(f"시트의 {i+2}번째 행에 Latitude 또는 Longitude 데이터가 없습니다. 건너뜁니다. (레이블: {record.get('Label', 'N/A')})")
-                    continue
-                locations.append({
-                    "label": str(record.get("Label", f"무명 마커 {i+1}")),
-                    "lat": float(lat),
-                    "lon": float(lon)
-                })
-            except ValueError:
-                st.warning(f"시트의 {i+2}번째 행 (레이블: '{record.get('Label')}')의 위도/경도 값을 숫자로 변환할 수 없습니다. 건너뜁니다.")
-                continue
-        if records:
+        mirror.ensure_loaded()
+        locations = mirror.locations()
+        if locations:
             st.success("Google Sheet에서 데이터를 성공적으로 불러왔습니다.")
         else:
             st.info("Google Sheet에 데이터가 없거나 헤더만 있습니다.")
@@ -87,56 +73,29 @@ def load_locations_from_sheet(worksheet):
         st.error(f"Google Sheet에서 데이터를 불러오는 중 오류 발생: {e}")
         return []
 
-def add_location_to_sheet(worksheet, location_data):
-    if worksheet is None:
+# 추가/삭제는 로컬 사본에 바로 반영하고 시트에는 모아서 보냄 (marker_store의 쓰기 지연 큐)
+def add_location_to_sheet(mirror, location_data):
+    if mirror.worksheet is None:
         st.error("워크시트가 제공되지 않아 위치 정보를 추가할 수 없습니다.")
         return False
-    try:
-        worksheet.append_row([location_data["label"], location_data["lat"], location_data["lon"]])
-        return True
-    except Exception as e:
-        st.error(f"Google Sheet에 데이터를 추가하는 중 오류 발생: {e}")
-        return False
+    mirror.queue_add(location_data)
+    return True
 
-def delete_location_from_sheet(worksheet, location_to_delete):
-    if worksheet is None:
+def delete_location_from_sheet(mirror, location_to_delete):
+    if mirror.worksheet is None:
         st.error("워크시트가 제공되지 않아 위치 정보를 삭제할 수 없습니다.")
         return False
-    try:
-        all_records_values = worksheet.get_all_values()
-        header = all_records_values[0]
-        try:
-            label_col_idx = header.index("Label")
-            lat_col_idx = header.index("Latitude")
-            lon_col_idx = header.index("Longitude")
-        except ValueError:
-            st.error("시트 헤더에 'Label', 'Latitude', 'Longitude' 중 하나 이상이 없습니다. 삭제 기능을 사용할 수 없습니다.")
-            return False
-        row_to_delete_on_sheet = -1
-        for i in range(1, len(all_records_values)):
-            row_values = all_records_values[i]
-            try:
-                sheet_label = row_values[label_col_idx]
-                sheet_lat = float(row_values[lat_col_idx])
-                sheet_lon = float(row_values[lon_col_idx])
-                lat_match = abs(sheet_lat - location_to_delete["lat"]) < 0.00001
-                lon_match = abs(sheet_lon - location_to_delete["lon"]) < 0.00001
-                label_match = sheet_label == location_to_delete["label"]
-                if label_match and lat_match and lon_match:
-                    row_to_delete_on_sheet = i + 1
-                    break
-            except (ValueError, IndexError):
-                st.warning(f"시트의 {i+1}번째 행 데이터 형식 오류로 삭제 비교 중 건너뜁니다.")
-                continue
-        if row_to_delete_on_sheet != -1:
-            worksheet.delete_rows(row_to_delete_on_sheet)
-            return True
-        else: # 경고 메시지는 그대로 두되, 이 함수는 성공/실패만 반환
-            pass # st.warning(f"Google Sheet에서 '{location_to_delete['label']}' 항목을 찾지 못해 삭제하지 못했습니다.")
-            return False # 찾지 못했으므로 False 반환
-    except Exception as e:
-        st.error(f"Google Sheet에서 데이터를 삭제하는 중 오류 발생: {e}")
-        return False
+    mirror.queue_delete(location_to_delete)
+    return True
+
+@st.fragment(run_every="2s")
+def show_pending_writes(mirror):
+    # 시트에 아직 반영되지 않은 변경 수 (2초마다 이 부분만 다시 그림)
+    pending = mirror.pending_count()
+    if pending:
+        st.caption(f"⏳ Google Sheet 반영 대기 중인 변경 {pending}건")
+    if mirror.last_write_error is not None:
+        st.caption(f"⚠️ 시트 쓰기 재시도 중: {mirror.last_write_error}")
 
 # --- Streamlit App Title ---
 st.title("🗺️ 클릭하고 마커 찍기 (Google Sheets 연동)")
@@ -153,20 +112,19 @@ if "zoom_start" not in st.session_state:
     st.session_state.zoom_start = default_zoom_start
 if "last_clicked_coord" not in st.session_state:
     st.session_state.last_clicked_coord = None
-if "gs_client" not in st.session_state:
-    st.session_state.gs_client = init_gspread_client()
-if "worksheet" not in st.session_state:
-    st.session_state.worksheet = None
 if "data_loaded_from_sheet" not in st.session_state:
     st.session_state.data_loaded_from_sheet = False
 
 # --- Google Sheets 연결 및 초기 데이터 로드 ---
-if st.session_state.gs_client and st.session_state.worksheet is None:
-    st.session_state.worksheet = get_worksheet(st.session_state.gs_client, GOOGLE_SHEET_NAME_OR_URL, WORKSHEET_NAME)
+# 인증과 워크시트 연결은 프로세스에서 한 번만 하고, 모든 세션이 같은 로컬 사본(marker_store)을 읽습니다.
+marker_mirror = mirror_for(GOOGLE_SHEET_NAME_OR_URL, WORKSHEET_NAME)
+if marker_mirror.worksheet is None:
+    marker_mirror.attach(get_worksheet(init_gspread_client(), GOOGLE_SHEET_NAME_OR_URL, WORKSHEET_NAME))
+st.session_state.worksheet = marker_mirror.worksheet
 
 if st.session_state.worksheet and not st.session_state.data_loaded_from_sheet:
     with st.spinner("Google Sheets에서 데이터를 불러오는 중..."):
-        st.session_state.locations = load_locations_from_sheet(st.session_state.worksheet)
+        st.session_state.locations = load_locations_from_sheet(marker_mirror)
         st.session_state.data_loaded_from_sheet = True
         if st.session_state.locations:
             last_loc = st.session_state.locations[-1]
@@ -175,6 +133,9 @@ if st.session_state.worksheet and not st.session_state.data_loaded_from_sheet:
         else:
             st.session_state.map_center = list(default_map_center) # 리스트 형식으로 저장
             st.session_state.zoom_start = default_zoom_start
+elif st.session_state.worksheet:
+    # 다른 세션의 변경과 백그라운드 동기화 결과를 반영 (시트 요청 없음)
+    st.session_state.locations = marker_mirror.locations()
 
 # --- 레이아웃 설정 ---
 col1, col2 = st.columns([3, 1])
@@ -184,7 +145,11 @@ with col1:
     if st.button("🔄 Google Sheets에서 데이터 새로고침"):
         if st.session_state.worksheet:
             with st.spinner("Google Sheets에서 데이터를 다시 불러오는 중..."):
-                st.session_state.locations = load_locations_from_sheet(st.session_state.worksheet)
+                try:
+                    marker_mirror.sync()  # 시트가 바뀐 경우에만 값을 다시 받음
+                except Exception as e:
+                    st.error(f"Google Sheet에서 데이터를 불러오는 중 오류 발생: {e}")
+                st.session_state.locations = marker_mirror.locations()
                 if st.session_state.locations:
                     last_loc = st.session_state.locations[-1]
                     st.session_state.map_center = [last_loc['lat'], last_loc['lon']] # 리스트 형식
@@ -257,7 +222,7 @@ with col1:
 with col2:
     st.subheader("📍 마커 정보")
 
-    if not st.session_state.gs_client or not st.session_state.worksheet:
+    if not st.session_state.worksheet:
         st.error("Google Sheets에 연결되지 않았습니다. 다음을 확인하세요:\n1. Streamlit Secrets 설정(.streamlit/secrets.toml 또는 Cloud Secrets)\n2. Google Sheet 이름/URL 및 공유 설정\n3. 인터넷 연결")
     
     if st.session_state.last_clicked_coord: # last_clicked_coord는 딕셔너리
@@ -280,7 +245,7 @@ with col2:
                         "lon": lon  # 숫자
                     }
                     with st.spinner("Google Sheet에 저장 중..."):
-                        if add_location_to_sheet(st.session_state.worksheet, new_location_data):
+                        if add_location_to_sheet(marker_mirror, new_location_data):
                             st.session_state.locations.append(new_location_data)
                             st.toast(f"📍 '{marker_label}' 위치가 Google Sheet에 저장되었습니다.", icon="📄")
                             # map_center는 반드시 [lat, lon] 리스트 형태여야 함
@@ -294,20 +259,21 @@ with col2:
     st.divider()
     
     st.subheader("📋 저장된 위치 목록 (Sheet 동기화)")
+    show_pending_writes(marker_mirror)
     if st.session_state.locations:
         for i, loc_item in enumerate(st.session_state.locations):
             item_col, delete_col = st.columns([4,1])
             with item_col:
                 st.markdown(f"**{loc_item['label']}** ({loc_item['lat']:.5f}, {loc_item['lon']:.5f})")
             with delete_col:
-                button_key = f"delete_gs_final_{i}_{loc_item['label']}_{loc_item['lat']}_{loc_item['lon']}"
+                button_key = f"delete_gs_final_{loc_item['id']}"  # 같은 이름·좌표의 마커도 ID로 구분
                 if st.button(f"삭제", key=button_key):
                     if not st.session_state.worksheet:
                         st.error("워크시트에 연결되지 않아 삭제할 수 없습니다.")
                     else:
                         location_to_delete_data = loc_item
                         with st.spinner("Google Sheet에서 삭제 중..."):
-                            if delete_location_from_sheet(st.session_state.worksheet, location_to_delete_data):
+                            if delete_location_from_sheet(marker_mirror, location_to_delete_data):
                                 st.session_state.locations.pop(i)
                                 st.toast(f"🗑️ '{location_to_delete_data['label']}' 위치가 Google Sheet에서 삭제되었습니다.", icon="🚮")
                                 if not st.session_state.locations:
@@ -3,9 +3,12 @@ import folium
 from streamlit_folium import st_folium
 import gspread
 from google.oauth2.service_account import Credentials
-import requests
+from marker_store import mirror_for
+from route_cache import persistent_directions
+from http_client import get_json, run_parallel
+from geo import haversine_km
+from functools import partial
 import polyline
-import math
 
 # --- Streamlit 페이지 설정 ---
 st.set_page_config(layout="wide", page_title="지도 & 경로 안내", page_icon="🗺️")
@@ -39,57 +42,40 @@ def get_worksheet(gc, sheet_name):
         st.error(f"워크시트 접근 오류: {e}")
         return None
 
-def load_locations_from_sheet(worksheet):
-    if worksheet is None:
+def load_locations_from_sheet(mirror):
+    if mirror.worksheet is None:
         return []
     try:
-        records = worksheet.get_all_records()
-        locations = []
-        for i, record in enumerate(records):
-            try:
-                lat, lon = record.get("Latitude"), record.get("Longitude")
-                if lat is None or lon is None:
-                    continue
-                locations.append({
-                    "label": str(record.get("Label", f"마커 {i+1}")),
-                    "lat": float(lat),
-                    "lon": float(lon)
-                })
-            except ValueError:
-                continue
-        return locations
+        mirror.ensure_loaded()
+        return mirror.locations()
     except Exception as e:
         st.error(f"데이터 로딩 오류: {e}")
         return []
 
-def add_location_to_sheet(worksheet, location_data):
-    if worksheet is None:
-        return False
-    try:
-        worksheet.append_row([location_data["label"], location_data["lat"], location_data["lon"]])
-        return True
-    except Exception as e:
-        st.error(f"데이터 추가 오류: {e}")
+# 추가는 로컬 사본에 바로 반영하고 시트에는 모아서 보냄 (marker_store의 쓰기 지연 큐)
+def add_location_to_sheet(mirror, location_data):
+    if mirror.worksheet is None:
         return False
+    mirror.queue_add(location_data)
+    return True
+
+@st.fragment(run_every="2s")
+def show_pending_writes(mirror):
+    # 시트에 아직 반영되지 않은 변경 수 (2초마다 이 부분만 다시 그림)
+    pending = mirror.pending_count()
+    if pending:
+        st.caption(f"⏳ Google Sheet 반영 대기 중인 변경 {pending}건")
+    if mirror.last_write_error is not None:
+        st.caption(f"⚠️ 시트 쓰기 재시도 중: {mirror.last_write_error}")
 
 # --- 경로 계산 함수 ---
+@persistent_directions("map05")
 def get_directions(origin_lat, origin_lng, dest_lat, dest_lng, mode="driving"):
     if not GOOGLE_MAPS_API_KEY:
         return {"error_message": "Google Maps API 키가 설정되지 않았습니다."}
     
     # 직선 거리 계산 (km)
-    def haversine(lat1, lon1, lat2, lon2):
-        R = 6371  # 지구 반경 (km)
-        dLat = math.radians(lat2 - lat1)
-        dLon = math.radians(lon2 - lon1)
-        a = math.sin(dLat/2) * math.sin(dLat/2) + math.cos(math.radians(lat1)) \
-            * math.cos(math.radians(lat2)) * math.sin(dLon/2) * math.sin(dLon/2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        d = R * c
-        return d
-    
-    # 직선 거리 계산
-    direct_distance = haversine(origin_lat, origin_lng, dest_lat, dest_lng)
+    direct_distance = float(haversine_km(origin_lat, origin_lng, dest_lat, dest_lng))
     
     # 도보 모드에서 거리 체크
     if mode == "walking" and direct_distance > 100:
@@ -107,8 +93,7 @@ def get_directions(origin_lat, origin_lng, dest_lat, dest_lng, mode="driving"):
     }
     
     try:
-        response = requests.get(base_url, params=params)
-        data = response.json()
+        data = get_json(base_url, params)
         
         if data["status"] == "OK" and data["routes"]:
             route = data["routes"][0]
@@ -152,30 +137,33 @@ if "route_destination_label" not in st.session_state:
     st.session_state.route_destination_label = None
 if "route_results" not in st.session_state:
     st.session_state.route_results = None
-if "gs_client" not in st.session_state:
-    st.session_state.gs_client = None
 if "worksheet" not in st.session_state:
     st.session_state.worksheet = None
 if "data_loaded_from_sheet" not in st.session_state:
     st.session_state.data_loaded_from_sheet = False
 
 # --- Google Sheets 연결 ---
-if not st.session_state.gs_client:
-    st.session_state.gs_client = init_gspread_client()
-
-if st.session_state.gs_client and not st.session_state.worksheet:
-    st.session_state.worksheet = get_worksheet(st.session_state.gs_client, GOOGLE_SHEET_NAME)
+# 인증과 워크시트 연결은 프로세스에서 한 번만 하고, 모든 세션이 같은 로컬 사본(marker_store)을 읽습니다.
+marker_mirror = mirror_for(GOOGLE_SHEET_NAME, WORKSHEET_NAME)
+if marker_mirror.worksheet is None:
+    gc = init_gspread_client()
+    if gc:
+        marker_mirror.attach(get_worksheet(gc, GOOGLE_SHEET_NAME))
+st.session_state.worksheet = marker_mirror.worksheet
 
 # --- 데이터 로드 ---
 if st.session_state.worksheet and not st.session_state.data_loaded_from_sheet:
     with st.spinner("데이터 로드 중..."):
-        st.session_state.locations = load_locations_from_sheet(st.session_state.worksheet)
+        st.session_state.locations = load_locations_from_sheet(marker_mirror)
         st.session_state.data_loaded_from_sheet = True
         # 마커가 있으면 첫 번째 마커 위치로 지도 중심 이동
         if st.session_state.locations:
             first_marker = st.session_state.locations[0]
             st.session_state.map_lat = first_marker["lat"]
             st.session_state.map_lng = first_marker["lon"]
+elif st.session_state.worksheet:
+    # 다른 세션의 변경과 백그라운드 동기화 결과를 반영 (시트 요청 없음)
+    st.session_state.locations = marker_mirror.locations()
 
 # --- 앱 타이틀 ---
 st.title("🗺️ 마커 저장 및 경로 안내")
@@ -259,6 +247,7 @@ with col1:
 with col2:
     # --- 마커 추가 ---
     st.subheader("📍 마커 추가")
+    show_pending_writes(marker_mirror)
     if st.session_state.last_clicked_coord:
         lat, lng = st.session_state.last_clicked_coord["lat"], st.session_state.last_clicked_coord["lng"]
         st.info(f"선택 위치: {lat:.5f}, {lng:.5f}")
@@ -268,7 +257,7 @@ with col2:
         if st.button("✅ 마커 저장"):
             if st.session_state.worksheet:
                 new_loc = {"label": label, "lat": lat, "lon": lng}
-                if add_location_to_sheet(st.session_state.worksheet, new_loc):
+                if add_location_to_sheet(marker_mirror, new_loc):
                     st.session_state.locations.append(new_loc)
                     st.success(f"'{label}' 저장 완료!")
                     st.session_state.last_clicked_coord = None
@@ -291,25 +280,21 @@ with col2:
                 st.session_state.route_destination_label = destination
                 
                 # 출발지/도착지 좌표 찾기
-                origin_loc = next((loc for loc in st.session_state.locations if loc["label"] == origin), None)
-                dest_loc = next((loc for loc in st.session_state.locations if loc["label"] == destination), None)
+                origin_loc = marker_mirror.find_label(origin)
+                dest_loc = marker_mirror.find_label(destination)
                 
                 if origin_loc and dest_loc:
-                    results = {}
-                    
-                    if travel_mode in ["도보", "모두"]:
-                        results["walking"] = get_directions(
-                            origin_loc["lat"], origin_loc["lon"],
-                            dest_loc["lat"], dest_loc["lon"],
-                            mode="walking"
-                        )
-                    
-                    if travel_mode in ["자동차", "모두"]:
-                        results["driving"] = get_directions(
+                    modes = {"도보": ["walking"], "자동차": ["driving"], "모두": ["walking", "driving"]}[travel_mode]
+                    # 도보/자동차를 동시에 요청
+                    results = run_parallel({
+                        mode: partial(
+                            get_directions,
                             origin_loc["lat"], origin_loc["lon"],
                             dest_loc["lat"], dest_loc["lon"],
-                            mode="driving"
+                            mode=mode
                         )
+                        for mode in modes
+                    })
                     
                     st.session_state.route_results = results
                     st.rerun()
@@ -1,8 +1,21 @@
 import streamlit as st
 import folium
+from folium.plugins import FastMarkerCluster, MarkerCluster
 from streamlit_folium import st_folium
 import gspread
 from google.oauth2.service_account import Credentials
+from marker_store import mirror_for
+from route_cache import persistent_directions
+from http_client import get_json, run_parallel
+from distance_matrix import DISTANCE_MATRIX_URL, compute_distance_matrix, straight_distances
+from tour import missing_legs, optimize_tour, tour_cost
+from functools import partial
+from geo import viewport_bounds
+from marker_io import (
+    import_markers, iter_markers_csv, iter_markers_geojson, read_marker_csv, read_marker_geojson, write_chunks
+)
+import numpy as np
+import pandas as pd
 import requests
 import polyline
 from datetime import datetime, time, date, timedelta
@@ -18,6 +31,9 @@ st.set_page_config(
 # --- Google API 설정 ---
 GOOGLE_MAPS_API_KEY = st.secrets.get("google_maps_api_key", "")
 
+# Distance Matrix 엔드포인트 (로컬 스텁 서버로 테스트할 때 secrets에서 바꿀 수 있음)
+DISTANCE_MATRIX_BASE_URL = st.secrets.get("distance_matrix_url", DISTANCE_MATRIX_URL)
+
 # --- Google Sheets 관련 설정 ---
 GOOGLE_SHEET_NAME_OR_URL = "내 마커 데이터"  # 실제 시트 이름/URL로 변경 필요
 WORKSHEET_NAME = "Sheet1"
@@ -63,79 +79,83 @@ def get_worksheet(gc, sheet_key, worksheet_name_or_index=0):
         st.error(f"워크시트 '{sheet_key}' 로딩 중 오류: {e}")
         return None
 
-def load_locations_from_sheet(worksheet):
-    if worksheet is None:
+def load_locations_from_sheet(mirror):
+    if mirror.worksheet is None:
         return []
     try:
-        records = worksheet.get_all_records()
-        locations = []
-        for i, record in enumerate(records):
-            try:
-                lat, lon = record.get("Latitude"), record.get("Longitude")
-                if lat is None or lon is None:
-                    continue
-                locations.append({
-                    "label": str(record.get("Label", f"무명 마커 {i+1}")),
-                    "lat": float(lat),
-                    "lon": float(lon)
-                })
-            except ValueError:
-                continue
-        return locations
+        mirror.ensure_loaded()
+        return mirror.locations()
     except Exception as e:
         st.error(f"Google Sheet 데이터 로딩 중 오류: {e}")
         return []
 
-def add_location_to_sheet(worksheet, location_data):
-    if worksheet is None:
+# 추가/삭제는 로컬 사본에 바로 반영하고 시트에는 모아서 보냄 (marker_store의 쓰기 지연 큐)
+def add_location_to_sheet(mirror, location_data):
+    if mirror.worksheet is None:
         st.error("워크시트 연결 실패로 추가 불가.")
         return False
-    try:
-        worksheet.append_row([location_data["label"], location_data["lat"], location_data["lon"]])
-        return True
-    except Exception as e:
-        st.error(f"Google Sheet 데이터 추가 중 오류: {e}")
-        return False
+    mirror.queue_add(location_data)
+    return True
 
-def delete_location_from_sheet(worksheet, location_to_delete):
-    if worksheet is None:
+def delete_location_from_sheet(mirror, location_to_delete):
+    if mirror.worksheet is None:
         st.error("워크시트 연결 실패로 삭제 불가.")
         return False
-    try:
-        all_records_values = worksheet.get_all_values()
-        if not all_records_values or len(all_records_values) < 2:
-            st.warning("삭제할 데이터가 없습니다.")
-            return False
-        header = all_records_values[0]
-        try:
-            label_idx = header.index("Label")
-            lat_idx = header.index("Latitude")
-            lon_idx = header.index("Longitude")
-        except ValueError:
-            st.error("시트 헤더(Label, Latitude, Longitude) 오류로 삭제 불가.")
-            return False
-        row_to_delete = -1
-        for i in range(1, len(all_records_values)):
-            row = all_records_values[i]
-            try:
-                if (str(row[label_idx]) == location_to_delete["label"] and
-                    abs(float(row[lat_idx]) - location_to_delete["lat"]) < 0.00001 and
-                    abs(float(row[lon_idx]) - location_to_delete["lon"]) < 0.00001):
-                    row_to_delete = i + 1  # gspread는 1-base index
-                    break
-            except (ValueError, IndexError):
-                continue
-        if row_to_delete != -1:
-            worksheet.delete_rows(row_to_delete)
-            return True
-        else:
-            st.warning(f"Sheet에서 '{location_to_delete['label']}' 삭제 항목을 찾지 못했습니다.")
-            return False
-    except Exception as e:
-        st.error(f"Google Sheet 데이터 삭제 중 오류: {e}")
-        return False
+    mirror.queue_delete(location_to_delete)
+    return True
+
+@st.fragment(run_every="2s")
+def show_pending_writes(mirror):
+    # 시트에 아직 반영되지 않은 변경 수 (2초마다 이 부분만 다시 그림)
+    pending = mirror.pending_count()
+    if pending:
+        st.caption(f"⏳ Google Sheet 반영 대기 중인 변경 {pending}건")
+    if mirror.last_write_error is not None:
+        st.caption(f"⚠️ 시트 쓰기 재시도 중: {mirror.last_write_error}")
 
 # --- Google Maps Directions API 함수 ---
+# 이동 수단: (아이콘, 이름, 경로 색, 선 굵기)
+ROUTE_MODES = {
+    "driving": ("🚗", "자동차", "red", 5),
+    "walking": ("🚶", "도보", "blue", 4),
+    "transit": ("🚌", "대중교통", "green", 4),
+    "bicycling": ("🚲", "자전거", "orange", 4),
+}
+
+MAX_MATRIX_MARKERS = 100  # 행렬 계산에 넣을 수 있는 최대 마커 수
+MAX_TOUR_STOPS = 100  # 순서 최적화에 넣을 수 있는 최대 경유지 수
+TOUR_METRICS = ["직선거리", "도로 이동시간"]
+
+def tour_polyline(ordered_locations, mode, road):
+    # 방문 순서대로 이은 선. 도로 기준이면 구간별 경로(캐시 사용)를 동시에 받아 이어 붙이고, 실패한 구간은 직선으로 대신함
+    legs = list(zip(ordered_locations[:-1], ordered_locations[1:]))
+    if not road:
+        return [[loc["lat"], loc["lon"]] for loc in ordered_locations]
+    results = run_parallel({
+        k: partial(get_directions, a["lat"], a["lon"], b["lat"], b["lon"], mode=mode)
+        for k, (a, b) in enumerate(legs)
+    })
+    line = []
+    for k, (a, b) in enumerate(legs):
+        leg = results[k]
+        if leg.get("polyline") and "error_message" not in leg:
+            line.extend(leg["polyline"])
+        else:
+            line.extend([[a["lat"], a["lon"]], [b["lat"], b["lon"]]])
+    return line
+
+def mode_api_options(mode, api_options):
+    # 교통 모델은 자동차만, 출발 시간은 자동차/대중교통만, 회피 옵션은 대중교통에서 쓰지 않음
+    options = dict(api_options)
+    if mode != "driving":
+        options.pop("traffic_model", None)
+    if mode not in ("driving", "transit"):
+        options.pop("departure_time", None)
+    if mode == "transit":
+        options.pop("avoid", None)
+    return options
+
+@persistent_directions("map06")
 def get_directions(origin_lat, origin_lng, dest_lat, dest_lng, mode="driving", **kwargs):
     if not GOOGLE_MAPS_API_KEY:
         return {"error_message": "Google Maps API 키가 설정되지 않았습니다."}
@@ -154,9 +174,7 @@ def get_directions(origin_lat, origin_lng, dest_lat, dest_lng, mode="driving", *
         params.update(kwargs)
         
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()  # HTTP 오류 검출
-        data = response.json()
+        data = get_json(base_url, params)
         
         if data["status"] == "OK" and data["routes"]:
             route = data["routes"][0]
@@ -211,8 +229,7 @@ def get_place_details(place_id):
         "fields": "name,formatted_address,geometry,rating,formatted_phone_number,opening_hours,website,photos"
     }
     try:
-        response = requests.get(base_url, params=params)
-        data = response.json()
+        data = get_json(base_url, params)
         if data["status"] == "OK" and "result" in data:
             return data["result"]
         else:
@@ -242,8 +259,7 @@ def geocode_address(address):
         "region": "kr"
     }
     try:
-        response = requests.get(base_url, params=params)
-        data = response.json()
+        data = get_json(base_url, params)
         if data["status"] == "OK" and data["results"]:
             result = data["results"][0]
             location = result["geometry"]["location"]
@@ -261,6 +277,46 @@ def geocode_address(address):
     except Exception as e:
         return {"error_message": f"API 호출 오류: {str(e)}"}
 
+# --- 대량 마커 표시 ---
+# LARGE_MARKER_THRESHOLD개를 넘으면 현재 화면(center/zoom) 안의 마커만 개별 마커로 그립니다.
+# 화면 안 마커도 MAX_DETAILED_MARKERS개를 넘으면 FastMarkerCluster(브라우저에서 마커 생성)로 보냅니다.
+LARGE_MARKER_THRESHOLD = 500
+MAX_DETAILED_MARKERS = 300
+CLUSTER_MIN_MARKERS = 50
+MAX_LISTED_MARKERS = 100  # 오른쪽 목록에 버튼과 함께 그릴 최대 마커 수
+FAST_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindTooltip(row[2]);
+    return marker;
+}
+"""
+
+def split_markers_for_view(locations, visible_markers):
+    # (개별 마커, FastMarkerCluster로 보낼 마커, 점 레이어로 보낼 마커)
+    # visible_markers: 공간 색인으로 찾은 화면 범위 안 마커
+    if len(locations) <= LARGE_MARKER_THRESHOLD:
+        return locations, [], []
+    route_labels = {st.session_state.route_origin_label, st.session_state.route_destination_label}
+    visible_ids = {loc["id"] for loc in visible_markers}
+    visible = [loc.get("id") in visible_ids or loc["label"] in route_labels for loc in locations]
+    inside = [loc for loc, v in zip(locations, visible) if v]
+    outside = [loc for loc, v in zip(locations, visible) if not v]
+    if len(inside) <= MAX_DETAILED_MARKERS:
+        return inside, [], outside
+    # 출발/도착 마커는 색을 구분해야 하므로 항상 개별 마커로 그림
+    detailed = [loc for loc in inside if loc["label"] in route_labels]
+    fast = [loc for loc in inside if loc["label"] not in route_labels]
+    return detailed, fast, outside
+
+# 클릭 지점 주변 마커: 반경 R km 안 또는 가까운 k개 (설정은 오른쪽 패널 위젯 값)
+NEARBY_MODES = ["반경", "가까운 순"]
+
+def nearby_markers(point):
+    if st.session_state.get("nearby_mode", NEARBY_MODES[0]) == NEARBY_MODES[0]:
+        return marker_mirror.nearby(point["lat"], point["lng"], st.session_state.get("nearby_radius", 1.0))
+    return marker_mirror.nearest(point["lat"], point["lng"], int(st.session_state.get("nearby_k", 5)))
+
 # --- Streamlit App Title ---
 st.title("🗺️ 마커 저장 및 경로 안내 (Google Maps API 연동)")
 
@@ -277,8 +333,6 @@ def initialize_session_state():
         st.session_state.zoom_start = default_zoom_start
     if "last_clicked_coord" not in st.session_state:
         st.session_state.last_clicked_coord = None
-    if "gs_client" not in st.session_state:
-        st.session_state.gs_client = init_gspread_client()
     if "worksheet" not in st.session_state:
         st.session_state.worksheet = None
     if "data_loaded_from_sheet" not in st.session_state:
@@ -289,6 +343,10 @@ def initialize_session_state():
         st.session_state.route_destination_label = None
     if "route_results" not in st.session_state:
         st.session_state.route_results = None
+    if "matrix_results" not in st.session_state:
+        st.session_state.matrix_results = None
+    if "tour_results" not in st.session_state:
+        st.session_state.tour_results = None
     if "calculating_route" not in st.session_state:
         st.session_state.calculating_route = False
     if "search_address" not in st.session_state:
@@ -313,12 +371,15 @@ def initialize_session_state():
 initialize_session_state()
 
 # --- Google Sheets 연결 및 초기 데이터 로드 ---
-if st.session_state.gs_client and st.session_state.worksheet is None:
-    st.session_state.worksheet = get_worksheet(st.session_state.gs_client, GOOGLE_SHEET_NAME_OR_URL, WORKSHEET_NAME)
+# 인증과 워크시트 연결은 프로세스에서 한 번만 하고, 모든 세션이 같은 로컬 사본(marker_store)을 읽습니다.
+marker_mirror = mirror_for(GOOGLE_SHEET_NAME_OR_URL, WORKSHEET_NAME)
+if marker_mirror.worksheet is None:
+    marker_mirror.attach(get_worksheet(init_gspread_client(), GOOGLE_SHEET_NAME_OR_URL, WORKSHEET_NAME))
+st.session_state.worksheet = marker_mirror.worksheet
 
 if st.session_state.worksheet and not st.session_state.data_loaded_from_sheet:
     with st.spinner("Google Sheets에서 데이터를 불러오는 중..."):
-        st.session_state.locations = load_locations_from_sheet(st.session_state.worksheet)
+        st.session_state.locations = load_locations_from_sheet(marker_mirror)
         st.session_state.data_loaded_from_sheet = True
         if st.session_state.locations:
             st.success("Google Sheet에서 데이터를 성공적으로 불러왔습니다.")
@@ -329,6 +390,9 @@ if st.session_state.worksheet and not st.session_state.data_loaded_from_sheet:
             st.info("Google Sheet에 저장된 데이터가 없습니다.")
             st.session_state.map_center = list(default_map_center)
             st.session_state.zoom_start = default_zoom_start
+elif st.session_state.worksheet:
+    # 다른 세션의 변경과 백그라운드 동기화 결과를 반영 (시트 요청 없음)
+    st.session_state.locations = marker_mirror.locations()
 
 # --- 탭 기반 인터페이스 ---
 tab1, tab2, tab3 = st.tabs(["🗺️ 지도 및 마커", "🚗 경로 찾기", "ℹ️ API 설정 도움말"])
@@ -397,27 +461,45 @@ with tab1:
 
         # 경로 폴리라인 추가
         if st.session_state.route_results:
-            walking_info = st.session_state.route_results.get("walking", {})
-            if walking_info and "polyline" in walking_info and walking_info["polyline"] and "error_message" not in walking_info:
-                folium.PolyLine(
-                    locations=walking_info["polyline"],
-                    weight=4,
-                    color='blue',
-                    opacity=0.7,
-                    tooltip="도보 경로"
-                ).add_to(m)
-            driving_info = st.session_state.route_results.get("driving", {})
-            if driving_info and "polyline" in driving_info and driving_info["polyline"] and "error_message" not in driving_info:
-                folium.PolyLine(
-                    locations=driving_info["polyline"],
-                    weight=5,
-                    color='red',
-                    opacity=0.7,
-                    tooltip="자동차 경로"
-                ).add_to(m)
+            for mode, (icon, mode_name, color, weight) in ROUTE_MODES.items():
+                route_info = st.session_state.route_results.get(mode, {})
+                if route_info and route_info.get("polyline") and "error_message" not in route_info:
+                    folium.PolyLine(
+                        locations=route_info["polyline"],
+                        weight=weight,
+                        color=color,
+                        opacity=0.7,
+                        tooltip=f"{mode_name} 경로"
+                    ).add_to(m)
+
+        # 경유지 순서 최적화 결과: 이어 붙인 경로와 방문 번호
+        if st.session_state.tour_results:
+            tour_layer = folium.FeatureGroup(name="방문 순서").add_to(m)
+            folium.PolyLine(
+                locations=st.session_state.tour_results["polyline"],
+                weight=4,
+                color='purple',
+                opacity=0.8,
+                tooltip="최적 방문 순서"
+            ).add_to(tour_layer)
+            for stop_number, loc in enumerate(st.session_state.tour_results["stops"], start=1):
+                folium.Marker(
+                    [loc["lat"], loc["lon"]],
+                    tooltip=f"{stop_number}. {loc['label']}",
+                    icon=folium.DivIcon(
+                        html=f'<div style="background:purple;color:white;border-radius:50%;width:20px;height:20px;'
+                             f'text-align:center;font-size:11px;line-height:20px;">{stop_number}</div>',
+                        icon_size=(20, 20),
+                        icon_anchor=(10, 10)
+                    )
+                ).add_to(tour_layer)
 
         # 마커 추가
-        for loc_data in st.session_state.locations:
+        # 마커가 많으면 화면 범위 안쪽만 개별 마커(클러스터)로 보내고, 나머지는 가벼운 점 레이어로 표시
+        visible_markers = marker_mirror.within_bounds(viewport_bounds(current_map_center, current_zoom_start))
+        detailed, fast, background = split_markers_for_view(st.session_state.locations, visible_markers)
+        marker_layer = MarkerCluster(name="마커").add_to(m) if len(detailed) > CLUSTER_MIN_MARKERS else m
+        for loc_data in detailed:
             icon_color, icon_symbol, popup_text = 'blue', 'info-sign', loc_data["label"]
             if st.session_state.route_origin_label == loc_data["label"]:
                 icon_color, icon_symbol, popup_text = 'green', 'play', f"출발: {loc_data['label']}"
@@ -428,6 +510,23 @@ with tab1:
                 tooltip=loc_data["label"],
                 popup=folium.Popup(popup_text, max_width=200),
                 icon=folium.Icon(color=icon_color, icon=icon_symbol)
+            ).add_to(marker_layer)
+        if fast:
+            FastMarkerCluster(
+                [[loc["lat"], loc["lon"], loc["label"]] for loc in fast],
+                callback=FAST_MARKER_CALLBACK,
+                name="마커 (화면 안)"
+            ).add_to(m)
+        if background:
+            folium.GeoJson(
+                {"type": "FeatureCollection", "features": [
+                    {"type": "Feature", "properties": {}, "geometry": {
+                        "type": "Point", "coordinates": [round(loc["lon"], 5), round(loc["lat"], 5)]
+                    }}
+                    for loc in background
+                ]},
+                name="마커 (화면 밖)",
+                marker=folium.CircleMarker(radius=2, color="#3186cc", fill=True, fill_opacity=0.6, weight=0)
             ).add_to(m)
 
         # 마지막으로 클릭한 위치 마커 추가
@@ -437,6 +536,19 @@ with tab1:
                 tooltip="선택된 위치 (저장 전)",
                 icon=folium.Icon(color='purple', icon='plus')
             ).add_to(m)
+            # 주변 마커 검색 결과 강조
+            nearby_layer = folium.FeatureGroup(name="주변 마커").add_to(m)
+            if st.session_state.get("nearby_mode", NEARBY_MODES[0]) == NEARBY_MODES[0]:
+                folium.Circle(
+                    [st.session_state.last_clicked_coord["lat"], st.session_state.last_clicked_coord["lng"]],
+                    radius=st.session_state.get("nearby_radius", 1.0) * 1000,
+                    color="purple", fill=True, fill_opacity=0.05, weight=1
+                ).add_to(nearby_layer)
+            for loc, distance_km in nearby_markers(st.session_state.last_clicked_coord)[:MAX_DETAILED_MARKERS]:
+                folium.CircleMarker(
+                    [loc["lat"], loc["lon"]], radius=9, color="purple", weight=2, fill=False,
+                    tooltip=f"{loc['label']} ({distance_km:.2f} km)"
+                ).add_to(nearby_layer)
 
         # 검색 결과 위치 마커 추가
         if st.session_state.search_results and "error_message" not in st.session_state.search_results:
@@ -453,6 +565,7 @@ with tab1:
 
         # 지도 렌더링
         map_interaction_data = st_folium(m, width="100%", height=600, key="map_corrected_routes")
+        st.caption(f"현재 화면 범위 안 마커: {len(visible_markers)}개")
 
         # 지도 상호작용 처리
         if map_interaction_data:
@@ -487,7 +600,7 @@ with tab1:
                 if submit_btn:
                     if st.session_state.worksheet:
                         new_loc = {"label": label, "lat": lat, "lon": lng}
-                        if add_location_to_sheet(st.session_state.worksheet, new_loc):
+                        if add_location_to_sheet(marker_mirror, new_loc):
                             st.session_state.locations.append(new_loc)
                             st.toast(f"'{label}' 저장 완료!", icon="📄")
                             st.session_state.map_center = [lat, lng]
@@ -499,6 +612,19 @@ with tab1:
                 elif cancel_btn:
                     st.session_state.last_clicked_coord = None
                     st.rerun()
+            with st.expander("🔎 클릭 지점 주변 마커"):
+                nearby_mode = st.radio("검색 방식", NEARBY_MODES, horizontal=True, key="nearby_mode")
+                if nearby_mode == NEARBY_MODES[0]:
+                    st.number_input("반경 (km)", min_value=0.1, max_value=100.0, value=1.0, step=0.5, key="nearby_radius")
+                else:
+                    st.number_input("개수", min_value=1, max_value=50, value=5, step=1, key="nearby_k")
+                nearby = nearby_markers(st.session_state.last_clicked_coord)
+                if nearby:
+                    st.caption(f"{len(nearby)}개")
+                    for loc, distance_km in nearby[:MAX_LISTED_MARKERS]:
+                        st.markdown(f"**{loc['label']}** · {distance_km:.2f} km")
+                else:
+                    st.info("조건에 맞는 마커가 없습니다.")
         else:
             st.info("마커를 추가하려면 지도를 클릭하세요.")
 
@@ -508,6 +634,7 @@ with tab1:
 
         st.markdown("---")
         st.subheader("📋 저장된 위치 목록")
+        show_pending_writes(marker_mirror)
         filter_query = st.text_input("마커 필터링:", placeholder="이름으로 필터링...")
 
         if st.session_state.locations:
@@ -516,7 +643,9 @@ with tab1:
                 filtered_locations = [loc for loc in st.session_state.locations if filter_query.lower() in loc['label'].lower()]
             if not filtered_locations:
                 st.info(f"'{filter_query}'에 해당하는 마커가 없습니다.")
-            for i, loc in enumerate(filtered_locations):
+            elif len(filtered_locations) > MAX_LISTED_MARKERS:
+                st.caption(f"{len(filtered_locations)}개 중 {MAX_LISTED_MARKERS}개만 표시합니다. 필터로 좁혀 보세요.")
+            for i, loc in enumerate(filtered_locations[:MAX_LISTED_MARKERS]):
                 col1, col2, col3, col4 = st.columns([0.5, 0.15, 0.15, 0.2])
                 with col1:
                     st.markdown(f"**{loc['label']}**")
@@ -535,8 +664,8 @@ with tab1:
                         st.session_state.operation_time = datetime.now()
                         st.rerun()
                 with col4:
-                    if st.button("🗑️", key=f"del_{i}_{loc['label']}"):
-                        if st.session_state.worksheet and delete_location_from_sheet(st.session_state.worksheet, loc):
+                    if st.button("🗑️", key=f"del_{loc['id']}"):
+                        if st.session_state.worksheet and delete_location_from_sheet(marker_mirror, loc):
                             deleted_label = loc["label"]
                             if st.session_state.route_origin_label == deleted_label:
                                 st.session_state.route_origin_label = None
@@ -555,20 +684,58 @@ with tab1:
             if st.session_state.worksheet:
                 confirm = st.checkbox("정말로 모든 마커를 삭제하시겠습니까?")
                 if confirm:
+                    marker_mirror.queue_clear()
+                    st.session_state.locations = []
+                    st.session_state.route_origin_label = None
+                    st.session_state.route_destination_label = None
+                    st.session_state.route_results = None
+                    st.success("모든 마커가 삭제되었습니다.")
+                    st.session_state.last_operation = "all_markers_deleted"
+                    st.session_state.operation_time = datetime.now()
+                    st.rerun()
+
+        # --- 대량 가져오기 / 내보내기 ---
+        with st.expander("📦 마커 대량 가져오기 / 내보내기"):
+            import_file = st.file_uploader("CSV 또는 GeoJSON 파일", type=["csv", "geojson", "json"])
+            if import_file is not None and st.button("📥 가져오기", use_container_width=True):
+                if not st.session_state.worksheet:
+                    st.error("워크시트 연결 실패로 가져올 수 없습니다.")
+                else:
                     try:
-                        n = len(st.session_state.locations) + 1
-                        if n > 1:
-                            st.session_state.worksheet.delete_rows(2, n)
-                        st.session_state.locations = []
-                        st.session_state.route_origin_label = None
-                        st.session_state.route_destination_label = None
-                        st.session_state.route_results = None
-                        st.success("모든 마커가 삭제되었습니다.")
-                        st.session_state.last_operation = "all_markers_deleted"
+                        if import_file.name.lower().endswith(".csv"):
+                            chunks = read_marker_csv(import_file)
+                        else:
+                            chunks = read_marker_geojson(import_file)
+                        with st.spinner("파일을 읽고 검증하는 중..."):
+                            summary = import_markers(chunks, marker_mirror.locations(), marker_mirror.queue_add_many)
+                        st.success(
+                            f"{summary['read']}행 중 {summary['added']}개 추가 "
+                            f"(좌표 오류 {summary['invalid']}개, 중복 {summary['duplicate']}개 제외). "
+                            "Google Sheet에는 순서대로 나눠서 반영됩니다."
+                        )
+                        st.session_state.locations = marker_mirror.locations()
+                        st.session_state.last_operation = "markers_imported"
                         st.session_state.operation_time = datetime.now()
-                        st.rerun()
                     except Exception as e:
-                        st.error(f"마커 삭제 중 오류 발생: {e}")
+                        st.error(f"파일을 가져오는 중 오류 발생: {e}")
+
+            if st.session_state.locations:
+                # 내보낼 파일은 버튼을 누를 때 만들어짐
+                export_locations = list(st.session_state.locations)
+                st.download_button(
+                    "📤 GeoJSON으로 내보내기",
+                    data=lambda: write_chunks(iter_markers_geojson(export_locations)),
+                    file_name="markers.geojson",
+                    mime="application/geo+json",
+                    use_container_width=True,
+                )
+                st.download_button(
+                    "📤 CSV로 내보내기",
+                    data=lambda: write_chunks(iter_markers_csv(export_locations)),
+                    file_name="markers.csv",
+                    mime="text/csv",
+                    use_container_width=True,
+                )
 
 with tab2:
     st.subheader("🚗🚶 경로 찾기")
@@ -618,11 +785,11 @@ with tab2:
                     st.rerun()
         with col2:
             st.markdown("#### 경로 옵션")
-            travel_mode = st.radio(
+            travel_modes = st.multiselect(
                 "이동 수단 선택:",
-                options=["자동차 + 도보", "자동차만", "도보만"],
-                index=0,
-                horizontal=True
+                options=list(ROUTE_MODES),
+                default=["driving", "walking"],
+                format_func=lambda mode: f"{ROUTE_MODES[mode][0]} {ROUTE_MODES[mode][1]}"
             )
             alternatives = st.checkbox("대체 경로 검색", value=True)
             traffic_model = st.selectbox(
@@ -647,14 +814,15 @@ with tab2:
         # API 호출 결과 처리 로직
         if st.session_state.calculating_route:
             with st.spinner("경로를 계산하는 중입니다..."):
-                origin_loc = next((loc for loc in st.session_state.locations 
-                                  if loc["label"] == st.session_state.route_origin_label), None)
-                dest_loc = next((loc for loc in st.session_state.locations 
-                                if loc["label"] == st.session_state.route_destination_label), None)
+                origin_loc = marker_mirror.find_label(st.session_state.route_origin_label)
+                dest_loc = marker_mirror.find_label(st.session_state.route_destination_label)
                 
                 if not origin_loc or not dest_loc:
                     st.error("출발지 또는 도착지 위치 정보를 찾을 수 없습니다.")
                     st.session_state.calculating_route = False
+                elif not travel_modes:
+                    st.warning("이동 수단을 하나 이상 선택해주세요.")
+                    st.session_state.calculating_route = False
                 else:
                     # 사용자 선택 옵션 처리
                     api_options = {}
@@ -669,7 +837,7 @@ with tab2:
                         "낙관적 예측": "optimistic",
                         "비관적 예측": "pessimistic"
                     }
-                    if travel_mode in ["자동차 + 도보", "자동차만"] and traffic_model in traffic_model_map:
+                    if "driving" in travel_modes and traffic_model in traffic_model_map:
                         api_options["traffic_model"] = traffic_model_map[traffic_model]
                         api_options["departure_time"] = "now"
                     
@@ -700,31 +868,17 @@ with tab2:
                     elif "traffic_model" in api_options:  # 교통 모델이 지정된 경우 출발 시간 필요
                         api_options["departure_time"] = "now"
                         
-                    results = {}
-                    
-                    # 모드에 따른 API 호출
-                    if travel_mode in ["자동차 + 도보", "도보만"]:
-                        walking_api_options = api_options.copy()
-                        # 도보 모드에서는 traffic_model과 departure_time 제거 (지원되지 않음)
-                        walking_api_options.pop("traffic_model", None)
-                        walking_api_options.pop("departure_time", None)
-                        
-                        walking_result = get_directions(
-                            origin_loc["lat"], origin_loc["lon"],
-                            dest_loc["lat"], dest_loc["lon"],
-                            mode="walking",
-                            **walking_api_options
-                        )
-                        results["walking"] = walking_result
-                        
-                    if travel_mode in ["자동차 + 도보", "자동차만"]:
-                        driving_result = get_directions(
+                    # 선택한 이동 수단을 동시에 요청 (전체 대기 시간 = 가장 느린 요청)
+                    results = run_parallel({
+                        mode: partial(
+                            get_directions,
                             origin_loc["lat"], origin_loc["lon"],
                             dest_loc["lat"], dest_loc["lon"],
-                            mode="driving",
-                            **api_options
+                            mode=mode,
+                            **mode_api_options(mode, api_options)
                         )
-                        results["driving"] = driving_result
+                        for mode in travel_modes
+                    })
                         
                     # 지도 URL 생성
                     map_url_combined = f"https://www.google.com/maps/dir/?api=1&origin={origin_loc['lat']},{origin_loc['lon']}&destination={dest_loc['lat']},{dest_loc['lon']}"
@@ -740,59 +894,171 @@ with tab2:
         if st.session_state.route_results:
             st.markdown("---")
             st.subheader("🔍 경로 검색 결과")
-            walking_info = st.session_state.route_results.get("walking")
-            driving_info = st.session_state.route_results.get("driving")
-            if walking_info and driving_info:
-                col_walking, col_driving = st.columns(2)
-            else:
-                col_walking = col_driving = st
-            if walking_info:
-                with col_walking:
-                    if "error_message" in walking_info:
-                        st.warning(f"🚶 도보 경로 오류: {walking_info['error_message']}")
-                    elif walking_info.get("duration"):
-                        st.markdown(f"### 🚶 도보 경로")
-                        st.markdown(f"**예상 시간:** {walking_info.get('duration', '정보 없음')}")
-                        st.markdown(f"**거리:** {walking_info.get('distance', '정보 없음')}")
-                        if "steps" in walking_info and walking_info["steps"]:
-                            with st.expander("도보 경로 상세 안내"):
-                                for i, step in enumerate(walking_info["steps"]):
+            route_modes = [mode for mode in ROUTE_MODES if st.session_state.route_results.get(mode)]
+            route_columns = st.columns(len(route_modes)) if len(route_modes) > 1 else [st.container()] * len(route_modes)
+            for mode, route_column in zip(route_modes, route_columns):
+                route_info = st.session_state.route_results[mode]
+                icon, mode_name = ROUTE_MODES[mode][:2]
+                with route_column:
+                    if "error_message" in route_info:
+                        st.warning(f"{icon} {mode_name} 경로 오류: {route_info['error_message']}")
+                    elif route_info.get("duration"):
+                        st.markdown(f"### {icon} {mode_name} 경로")
+                        st.markdown(f"**예상 시간:** {route_info.get('duration', '정보 없음')}")
+                        st.markdown(f"**거리:** {route_info.get('distance', '정보 없음')}")
+                        if "steps" in route_info and route_info["steps"]:
+                            with st.expander(f"{mode_name} 경로 상세 안내"):
+                                for i, step in enumerate(route_info["steps"]):
                                     instruction = step.get('html_instructions', '')
                                     # HTML 태그 처리
                                     instruction = instruction.replace('<b>', '**').replace('</b>', '**')
                                     instruction = instruction.replace('<div style="font-size:0.9em">', '\n').replace('</div>', '')
                                     st.markdown(f"{i+1}. {instruction}")
                                     st.caption(f"{step.get('distance', {}).get('text', '')} ({step.get('duration', {}).get('text', '')})")
-                        if walking_info.get('url'):
-                            st.markdown(f"[Google Maps에서 도보 경로 보기]({walking_info.get('url')})")
+                        if route_info.get('url'):
+                            st.markdown(f"[Google Maps에서 {mode_name} 경로 보기]({route_info.get('url')})")
                     else:
-                        st.warning("🚶 도보 경로 정보를 가져올 수 없습니다.")
-            if driving_info:
-                with col_driving:
-                    if "error_message" in driving_info:
-                        st.warning(f"🚗 자동차 경로 오류: {driving_info['error_message']}")
-                    elif driving_info.get("duration"):
-                        st.markdown(f"### 🚗 자동차 경로")
-                        st.markdown(f"**예상 시간:** {driving_info.get('duration', '정보 없음')}")
-                        st.markdown(f"**거리:** {driving_info.get('distance', '정보 없음')}")
-                        if "steps" in driving_info and driving_info["steps"]:
-                            with st.expander("자동차 경로 상세 안내"):
-                                for i, step in enumerate(driving_info["steps"]):
-                                    instruction = step.get('html_instructions', '')
-                                    # HTML 태그 처리
-                                    instruction = instruction.replace('<b>', '**').replace('</b>', '**')
-                                    instruction = instruction.replace('<div style="font-size:0.9em">', '\n').replace('</div>', '')
-                                    st.markdown(f"{i+1}. {instruction}")
-                                    st.caption(f"{step.get('distance', {}).get('text', '')} ({step.get('duration', {}).get('text', '')})")
-                        if driving_info.get('url'):
-                            st.markdown(f"[Google Maps에서 자동차 경로 보기]({driving_info.get('url')})")
-                    else:
-                        st.warning("🚗 자동차 경로 정보를 가져올 수 없습니다.")
+                        st.warning(f"{icon} {mode_name} 경로 정보를 가져올 수 없습니다.")
             combined_map_url = st.session_state.route_results.get("map_url_combined")
             if combined_map_url:
                 st.markdown("---")
                 st.markdown(f"🗺️ [통합 경로 지도 보기 (Google Maps)]({combined_map_url})")
 
+        # 전체 마커 간 거리/시간 행렬
+        st.markdown("---")
+        st.subheader("📊 마커 간 거리/시간 행렬")
+        locations_by_id = {loc["id"]: loc for loc in st.session_state.locations if loc.get("id")}
+        matrix_ids = st.multiselect(
+            "행렬에 포함할 마커:",
+            options=list(locations_by_id),
+            default=list(locations_by_id)[:MAX_MATRIX_MARKERS],
+            format_func=lambda marker_id: locations_by_id[marker_id]["label"],
+            key="matrix_marker_ids"
+        )
+        col_matrix1, col_matrix2, col_matrix3 = st.columns(3)
+        with col_matrix1:
+            matrix_mode = st.selectbox(
+                "이동 수단:",
+                options=list(ROUTE_MODES),
+                format_func=lambda mode: f"{ROUTE_MODES[mode][0]} {ROUTE_MODES[mode][1]}",
+                key="matrix_mode"
+            )
+        with col_matrix2:
+            matrix_max_km = st.number_input("최대 직선거리 (km, 0이면 이동 수단 기본값)", min_value=0.0, value=0.0, step=5.0)
+        with col_matrix3:
+            calc_matrix = st.button("📊 행렬 계산", use_container_width=True, key="calc_matrix_btn")
+        if calc_matrix:
+            if len(matrix_ids) < 2:
+                st.warning("마커를 2개 이상 선택해주세요.")
+            elif len(matrix_ids) > MAX_MATRIX_MARKERS:
+                st.warning(f"행렬은 최대 {MAX_MATRIX_MARKERS}개 마커까지 계산할 수 있습니다.")
+            elif not GOOGLE_MAPS_API_KEY:
+                st.error("Google Maps API 키가 설정되지 않았습니다.")
+            else:
+                matrix_locations = [locations_by_id[marker_id] for marker_id in matrix_ids]
+                with st.spinner(f"{len(matrix_locations)}×{len(matrix_locations)} 행렬을 계산하는 중입니다..."):
+                    matrix = compute_distance_matrix(
+                        [(loc["lat"], loc["lon"]) for loc in matrix_locations],
+                        mode=matrix_mode,
+                        api_key=GOOGLE_MAPS_API_KEY,
+                        base_url=DISTANCE_MATRIX_BASE_URL,
+                        max_km=matrix_max_km or None
+                    )
+                # 이름이 겹쳐도 표의 행/열이 구분되도록 번호를 붙임
+                matrix["labels"] = [f"{i + 1}. {loc['label']}" for i, loc in enumerate(matrix_locations)]
+                matrix["mode"] = matrix_mode
+                st.session_state.matrix_results = matrix
+        matrix_results = st.session_state.matrix_results
+        if matrix_results:
+            icon, mode_name = ROUTE_MODES[matrix_results["mode"]][:2]
+            st.caption(
+                f"{icon} {mode_name} · API 요청 {matrix_results['requests']}회 · "
+                f"캐시 사용 {matrix_results['cached']}쌍 · 직선거리로 제외 {matrix_results['skipped']}쌍"
+            )
+            for error in matrix_results["errors"][:3]:
+                st.warning(f"일부 구간을 가져오지 못했습니다: {error}")
+            labels = matrix_results["labels"]
+            tab_duration, tab_distance = st.tabs(["⏱️ 시간 (분)", "📏 거리 (km)"])
+            with tab_duration:
+                st.dataframe(pd.DataFrame(matrix_results["duration"] / 60, index=labels, columns=labels).round(1))
+            with tab_distance:
+                st.dataframe(pd.DataFrame(matrix_results["distance"] / 1000, index=labels, columns=labels).round(2))
+
+        # 다중 경유지 방문 순서 최적화
+        st.markdown("---")
+        st.subheader("🧭 경유지 방문 순서 최적화")
+        tour_start_id = st.selectbox(
+            "출발 마커:",
+            options=list(locations_by_id),
+            format_func=lambda marker_id: locations_by_id[marker_id]["label"],
+            key="tour_start_id"
+        )
+        tour_stop_ids = st.multiselect(
+            "방문할 마커:",
+            options=list(locations_by_id),
+            format_func=lambda marker_id: locations_by_id[marker_id]["label"],
+            key="tour_stop_ids"
+        )
+        tour_stop_ids = [marker_id for marker_id in tour_stop_ids if marker_id != tour_start_id]
+        col_tour1, col_tour2, col_tour3 = st.columns(3)
+        with col_tour1:
+            tour_metric = st.radio("최적화 기준:", TOUR_METRICS, horizontal=True, key="tour_metric")
+            tour_closed = st.checkbox("출발지로 돌아오기", key="tour_closed")
+        with col_tour2:
+            tour_mode = st.selectbox(
+                "이동 수단:",
+                options=list(ROUTE_MODES),
+                format_func=lambda mode: f"{ROUTE_MODES[mode][0]} {ROUTE_MODES[mode][1]}",
+                key="tour_mode"
+            )
+        with col_tour3:
+            calc_tour = st.button("🧭 순서 계산", use_container_width=True, key="calc_tour_btn")
+            if st.button("🗑️ 순서 해제", use_container_width=True, key="clear_tour_btn"):
+                st.session_state.tour_results = None
+                st.rerun()
+        if calc_tour:
+            road = tour_metric == TOUR_METRICS[1]
+            if not tour_start_id or not tour_stop_ids:
+                st.warning("출발 마커와 방문할 마커를 1개 이상 선택해주세요.")
+            elif len(tour_stop_ids) > MAX_TOUR_STOPS:
+                st.warning(f"경유지는 최대 {MAX_TOUR_STOPS}개까지 선택할 수 있습니다.")
+            elif road and not GOOGLE_MAPS_API_KEY:
+                st.error("도로 이동시간 기준은 Google Maps API 키가 필요합니다.")
+            else:
+                tour_locations = [locations_by_id[marker_id] for marker_id in [tour_start_id, *tour_stop_ids]]
+                points = [(loc["lat"], loc["lon"]) for loc in tour_locations]
+                with st.spinner("방문 순서를 계산하는 중입니다..."):
+                    if road:
+                        tour_matrix = compute_distance_matrix(
+                            points, mode=tour_mode, api_key=GOOGLE_MAPS_API_KEY, base_url=DISTANCE_MATRIX_BASE_URL
+                        )["duration"]
+                    else:
+                        tour_matrix = straight_distances(points)
+                    started = time_module.perf_counter()
+                    order, _ = optimize_tour(tour_matrix, start=0, closed=tour_closed)
+                    elapsed_ms = (time_module.perf_counter() - started) * 1000
+                    ordered = [tour_locations[i] for i in order]
+                    path = ordered + ordered[:1] if tour_closed else ordered
+                    # 경로를 구하지 못한 구간은 총합에서 빼고 따로 알려줌
+                    no_route = missing_legs(tour_matrix, order, tour_closed)
+                    tour_total = tour_cost(np.nan_to_num(tour_matrix), order, tour_closed)
+                    st.session_state.tour_results = {
+                        "stops": ordered,
+                        "polyline": tour_polyline(path, tour_mode, road),
+                        "total": f"{tour_total / 60:.0f}분" if road else f"{tour_total:.1f} km (직선)",
+                        "no_route": [f"{tour_locations[a]['label']} → {tour_locations[b]['label']}" for a, b in no_route],
+                        "elapsed_ms": elapsed_ms,
+                    }
+                st.rerun()
+        if st.session_state.tour_results:
+            tour_results = st.session_state.tour_results
+            st.success(f"총 {tour_results['total']} · {len(tour_results['stops'])}곳 (계산 {tour_results['elapsed_ms']:.0f} ms)")
+            if tour_results["no_route"]:
+                st.warning("경로를 찾지 못한 구간은 총합에서 제외했습니다: " + ", ".join(tour_results["no_route"]))
+            st.markdown(" → ".join(
+                f"{stop_number}. {loc['label']}" for stop_number, loc in enumerate(tour_results["stops"], start=1)
+            ))
+
 with tab3:
     st.subheader("ℹ️ Google Maps API 설정 도움말")
     st.markdown("""
@@ -889,15 +1155,11 @@ if st.sidebar.checkbox("디버그 모드", value=False):
         st.sidebar.write(f"출발지: {st.session_state.route_origin_label}")
         st.sidebar.write(f"도착지: {st.session_state.route_destination_label}")
         if st.session_state.route_results:
-            if "walking" in st.session_state.route_results:
-                walk_info = st.session_state.route_results["walking"]
-                if "error_message" in walk_info:
-                    st.sidebar.write("도보 경로 오류:", walk_info["error_message"])
-                else:
-                    st.sidebar.write("도보 거리:", walk_info.get("distance"))
-            if "driving" in st.session_state.route_results:
-                drive_info = st.session_state.route_results["driving"]
-                if "error_message" in drive_info:
-                    st.sidebar.write("자동차 경로 오류:", drive_info["error_message"])
+            for mode, (icon, mode_name, color, weight) in ROUTE_MODES.items():
+                route_info = st.session_state.route_results.get(mode)
+                if not route_info:
+                    continue
+                if "error_message" in route_info:
+                    st.sidebar.write(f"{mode_name} 경로 오류:", route_info["error_message"])
                 else:
-                    st.sidebar.write("자동차 거리:", drive_info.get("distance"))
+                    st.sidebar.write(f"{mode_name} 거리:", route_info.get("distance"))
@@ -0,0 +1,133 @@
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+# --- 캐시 경로 설정 ---
+# 원본 CSV(cp949)를 한 번만 파싱하고, 파일 내용 해시를 키로 Parquet 캐시에 저장합니다.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, ".cache", "population")
+
+# 저장소에 포함된 2025년 4월 주민등록 인구 파일
+BUNDLED_MF_FILE = os.path.join(BASE_DIR, "202504_202504_남녀구분.csv")
+BUNDLED_TOTAL_FILE = os.path.join(BASE_DIR, "202504_202504_남여합계.csv")
+
+
+def file_digest(raw_bytes):
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+
+def age_columns(df):
+    return [col for col in df.columns if "세" in col]
+
+
+def parse_population_csv(raw_bytes):
+    # 헤더만 먼저 읽어 연령 컬럼의 dtype을 지정한 뒤,
+    # 천 단위 쉼표는 C 파서가 읽는 시점에 한 번에 처리합니다.
+    header = pd.read_csv(io.BytesIO(raw_bytes), encoding='cp949', nrows=0)
+    dtypes = {col: "int32" for col in header.columns if "세" in col.strip()}
+    df = pd.read_csv(io.BytesIO(raw_bytes), encoding='cp949', thousands=',', dtype=dtypes)
+    df.columns = df.columns.str.strip()
+
+    # 행정구역은 반복 조회용 범주형으로 저장
+    df['행정구역'] = df['행정구역'].astype("category")
+    return df
+
+
+def load_population_csv(raw_bytes):
+    cache_path = os.path.join(CACHE_DIR, f"{file_digest(raw_bytes)}.parquet")
+    if os.path.exists(cache_path):
+        return pd.read_parquet(cache_path)
+
+    df = parse_population_csv(raw_bytes)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, cache_path)  # 동시 실행 중에도 반쯤 쓰인 파일이 보이지 않도록
+    return df
+
+
+def read_bundled_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# --- 행정구역 코드 인덱스 ---
+# '서울특별시 종로구 청운효자동(1111051500)' 형식에서 10자리 행정기관코드를 파싱합니다.
+# 코드 앞 2자리는 시도, 5자리는 시군구, 10자리 전체는 읍면동을 나타냅니다.
+# 구가 있는 시(수원시, 창원시 등)의 일반구는 코드 5번째 자리가 0이 아니고, 상위 시 코드는 앞 4자리 + 0입니다.
+# 코드만으로는 일반구와 보통 시군구(예: 증평군)를 구분할 수 없으므로 이름('경기도 수원시 장안구')으로 판별합니다.
+REGION_PATTERN = r"^\s*(?P<name>.*?)\s*\((?P<code>\d{10})\)\s*$"
+LEVEL_SIDO = "시도"
+LEVEL_SIGUNGU = "시군구"
+LEVEL_GU = "구"
+LEVEL_EUPMYEONDONG = "읍면동"
+
+
+def region_level(code, gu_codes=frozenset()):
+    if code[2:] == "0" * 8:
+        return LEVEL_SIDO
+    if code[5:] == "0" * 5:
+        return LEVEL_GU if code in gu_codes else LEVEL_SIGUNGU
+    return LEVEL_EUPMYEONDONG
+
+
+def parent_code(code, gu_codes=frozenset()):
+    level = region_level(code, gu_codes)
+    if level == LEVEL_EUPMYEONDONG:
+        return code[:5] + "0" * 5
+    if level == LEVEL_GU:
+        return code[:4] + "0" * 6
+    if level == LEVEL_SIGUNGU:
+        return code[:2] + "0" * 8
+    return None
+
+
+def general_gu_codes(codes, names):
+    # 일반구 코드 집합: '시도 시 구' 세 단어인 시군구 행, 또는 '시도 시 구 동' 네 단어인 읍면동 행의 상위 코드
+    # (구 행이 없는 파일에서도 읍면동 이름으로 찾을 수 있도록)
+    gu_codes = set()
+    for code, name in zip(codes, names):
+        if not isinstance(code, str) or code[4] == "0":
+            continue
+        words = len(str(name).split())
+        level = region_level(code)
+        if level == LEVEL_SIGUNGU and words == 3:
+            gu_codes.add(code)
+        elif level == LEVEL_EUPMYEONDONG and words == 4:
+            gu_codes.add(code[:5] + "0" * 5)
+    return frozenset(gu_codes)
+
+
+def build_region_index(df):
+    parsed = df['행정구역'].astype(str).str.extract(REGION_PATTERN)
+    names = parsed["name"].str.split().str.join(" ")
+    codes = parsed["code"]
+
+    gu_codes = general_gu_codes(codes, names)
+    rows = []
+    for code, name in zip(codes, names):
+        if pd.isna(code):
+            continue
+        tokens = name.split(" ")
+        level = region_level(code, gu_codes)
+        rows.append({
+            "code": code,
+            "name": name,
+            "level": level,
+            "parent": parent_code(code, gu_codes),
+            "sido": tokens[0],
+            "sigungu": " ".join(tokens[1:-1] if level == LEVEL_EUPMYEONDONG else tokens[1:]),
+            "eupmyeondong": tokens[-1] if level == LEVEL_EUPMYEONDONG else "",
+        })
+    # code를 인덱스로 두어 코드 → 지역 정보 조회를 해시 탐색으로 처리
+    return pd.DataFrame(rows).set_index("code")
+
+
+def build_children_map(region_index):
+    # 상위 코드 → 하위 코드 목록 (시도 목록은 None 키에 저장)
+    children = {}
+    for code, parent in zip(region_index.index, region_index["parent"]):
+        children.setdefault(parent if isinstance(parent, str) else None, []).append(code)
+    return children
@@ -0,0 +1,260 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from population_data import (
+    BASE_DIR, LEVEL_EUPMYEONDONG, LEVEL_GU, LEVEL_SIGUNGU, REGION_PATTERN, file_digest, general_gu_codes,
+    load_population_csv, parent_code, region_level
+)
+
+# --- 월별 인구 저장소 ---
+# population_store/month=YYYY-MM/{남녀구분,남여합계}.parquet 형태로 월 단위 파티션을 저장합니다.
+# 새 월 파일이 들어오면 해당 월 파티션만 쓰고, 이미 적재된 파일(내용 해시 기준)은 건너뜁니다.
+STORE_DIR = os.path.join(BASE_DIR, "population_store")
+MANIFEST_PATH = os.path.join(STORE_DIR, "manifest.json")
+
+KIND_MF = "남녀구분"
+KIND_TOTAL = "남여합계"
+SEX_MALE = "남"
+SEX_FEMALE = "여"
+SEX_TOTAL = "계"
+
+# '2025년04월_남_0세' → ('2025', '04', '남_0세')
+MONTH_COLUMN_PATTERN = re.compile(r"^(\d{4})년(\d{2})월_(.+)$")
+
+
+def read_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {"files": {}}
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(manifest):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def store_version():
+    # 저장소 내용이 바뀔 때마다 달라지는 값 (조회 캐시 키로 사용)
+    return os.path.getmtime(MANIFEST_PATH) if os.path.exists(MANIFEST_PATH) else 0.0
+
+
+def partition_path(month, kind):
+    return os.path.join(STORE_DIR, f"month={month}", f"{kind}.parquet")
+
+
+def split_months(df):
+    # 한 파일에 여러 달이 들어 있을 수 있으므로 컬럼 접두어별로 나눕니다.
+    by_month = {}
+    for col in df.columns:
+        match = MONTH_COLUMN_PATTERN.match(col)
+        if match:
+            month = f"{match.group(1)}-{match.group(2)}"
+            by_month.setdefault(month, {})[col] = match.group(3)
+
+    codes = df['행정구역'].astype(str).str.extract(REGION_PATTERN)[["code"]]
+    parts = {}
+    for month, renames in by_month.items():
+        part = pd.concat([codes, df[['행정구역', *renames]].rename(columns=renames)], axis=1)
+        parts[month] = part[part["code"].notna()].reset_index(drop=True)
+    return parts
+
+
+def detect_kind(columns):
+    return KIND_MF if any(col.startswith(f"{SEX_MALE}_") for col in columns) else KIND_TOTAL
+
+
+def ingest_population_file(raw_bytes):
+    digest = file_digest(raw_bytes)
+    manifest = read_manifest()
+    if digest in manifest["files"]:
+        return manifest["files"][digest], False  # 이미 적재된 파일
+
+    ingested = []
+    for month, part in split_months(load_population_csv(raw_bytes)).items():
+        kind = detect_kind(part.columns)
+        path = partition_path(month, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        part.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        for width in AGE_BAND_WIDTHS:
+            write_cube(month, kind, width, build_cube(part, width))
+        ingested.append([month, kind])
+
+    manifest["files"][digest] = ingested
+    write_manifest(manifest)
+    return ingested, True
+
+
+def list_months(kind):
+    if not os.path.isdir(STORE_DIR):
+        return []
+    months = []
+    for entry in os.listdir(STORE_DIR):
+        if entry.startswith("month=") and os.path.exists(partition_path(entry[len("month="):], kind)):
+            months.append(entry[len("month="):])
+    return sorted(months)
+
+
+def load_partition(month, kind, codes=None):
+    filters = [("code", "in", list(codes))] if codes else None
+    return pd.read_parquet(partition_path(month, kind), filters=filters)
+
+
+def value_columns(columns, sexes):
+    return [col for col in columns if col.split("_", 1)[0] in sexes and "세" in col]
+
+
+# --- 조회 API: 지역 × 월 × 연령 × 성별 ---
+# 결과는 month, code, sex, age, population 컬럼의 long 형식이며
+# 지역별로 원본 파일의 컬럼 순서(성별 → 연령)를 따릅니다.
+def query_population(codes, months=None, sexes=(SEX_MALE, SEX_FEMALE), ages=None):
+    kind = KIND_TOTAL if tuple(sexes) == (SEX_TOTAL,) else KIND_MF
+    frames = []
+    for month in months or list_months(kind):
+        if not os.path.exists(partition_path(month, kind)):
+            continue
+        part = load_partition(month, kind, codes)
+        cols = value_columns(part.columns, sexes)
+        sex_age = [col.split("_", 1) for col in cols]
+        # melt 대신 (지역 × 컬럼) 행렬을 그대로 펼쳐 long 형식을 만듭니다.
+        frames.append(pd.DataFrame({
+            "month": month,
+            "code": np.repeat(part["code"].to_numpy(), len(cols)),
+            "sex": np.tile([sex for sex, _ in sex_age], len(part)),
+            "age": np.tile([age for _, age in sex_age], len(part)),
+            "population": part[cols].to_numpy().ravel(),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=["month", "code", "sex", "age", "population"])
+    result = pd.concat(frames, ignore_index=True)
+    if ages is not None:
+        result = result[result["age"].isin(ages)]
+    return result
+
+
+# --- 행정구역 × 성별 × 연령대 사전 집계 큐브 ---
+# 적재 시점에 5세/10세 연령대 합계를 미리 계산해 month=YYYY-MM/cube_{종류}_{폭}세_v{버전}.parquet로 저장합니다.
+# 행은 (code, sex), 열은 연령대이며 하위 지역만 있는 파일은 상위 지역 합계를 채워 넣습니다.
+# 큐브의 parent는 바로 위 단계만 가리키므로(시도 → 시군구 → 구 → 읍면동) 한 부모의 하위 지역 합은 부모 행과 같습니다.
+AGE_BAND_WIDTHS = (5, 10)
+OPEN_ENDED_AGE = 100
+CUBE_VERSION = 2  # 계층 규칙이 바뀌면 올려서 예전 큐브 파일을 다시 만들게 함
+
+
+def age_value(age_label):
+    return int(re.match(r"\d+", age_label).group())
+
+
+def band_label(age, width):
+    if age >= OPEN_ENDED_AGE:
+        return f"{OPEN_ENDED_AGE}세 이상"
+    low = age // width * width
+    return f"{low}-{low + width - 1}세"
+
+
+def cube_path(month, kind, width):
+    return os.path.join(STORE_DIR, f"month={month}", f"cube_{kind}_{width}세_v{CUBE_VERSION}.parquet")
+
+
+def partition_gu_codes(part):
+    names = part["행정구역"].astype(str).str.extract(REGION_PATTERN)["name"]
+    return general_gu_codes(part["code"], names)
+
+
+def rollup_missing_parents(values, codes, gu_codes=frozenset()):
+    # 읍면동 → 구 → 시군구 → 시도 순으로, 파일에 없는 상위 지역 행을 바로 아래 단계의 합계로 만듭니다.
+    # 아래 단계부터 채우므로 새로 만든 구/시 행도 그 위 단계 합계에 포함됩니다.
+    known = set(codes)
+    codes = list(codes)
+    for child_level in (LEVEL_EUPMYEONDONG, LEVEL_GU, LEVEL_SIGUNGU):
+        rows = [i for i, code in enumerate(codes) if region_level(code, gu_codes) == child_level]
+        parents = [parent_code(codes[i], gu_codes) for i in rows]
+        missing = sorted({p for p in parents if p not in known})
+        if not missing:
+            continue
+        sums = values.iloc[rows].groupby(pd.Index(parents)).sum().loc[missing]
+        values = pd.concat([values, sums.set_axis(range(len(values), len(values) + len(missing)))])
+        codes += missing
+        known.update(missing)
+    return values, codes
+
+
+def build_cube(part, width):
+    sexes = [SEX_MALE, SEX_FEMALE] if detect_kind(part.columns) == KIND_MF else [SEX_TOTAL]
+    cols = {sex: value_columns(part.columns, (sex,)) for sex in sexes}
+    gu_codes = partition_gu_codes(part)
+    values, codes = rollup_missing_parents(
+        part[[col for sex in sexes for col in cols[sex]]].reset_index(drop=True), part["code"].tolist(), gu_codes
+    )
+
+    frames = []
+    for sex in sexes:
+        ages = [age_value(col.split("_", 1)[1]) for col in cols[sex]]
+        labels = [band_label(age, width) for age in ages]
+        bands = list(dict.fromkeys(labels))
+        # (연령 × 연령대) 0/1 행렬을 곱해 모든 지역의 연령대 합계를 한 번에 계산
+        onehot = np.zeros((len(ages), len(bands)), dtype=np.int64)
+        onehot[np.arange(len(ages)), [bands.index(label) for label in labels]] = 1
+        frames.append((sex, values[cols[sex]].to_numpy(dtype=np.int64) @ onehot, bands))
+
+    if sexes == [SEX_MALE, SEX_FEMALE]:
+        frames.append((SEX_TOTAL, frames[0][1] + frames[1][1], frames[0][2]))
+
+    cube = pd.concat([
+        pd.DataFrame(matrix, columns=bands).assign(code=codes, sex=sex) for sex, matrix, bands in frames
+    ], ignore_index=True)
+    cube["level"] = [region_level(code, gu_codes) for code in cube["code"]]
+    cube["parent"] = [parent_code(code, gu_codes) for code in cube["code"]]
+    return cube.set_index(["code", "sex"])
+
+
+def write_cube(month, kind, width, cube):
+    path = cube_path(month, kind, width)
+    tmp_path = path + ".tmp"
+    cube.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_cube(month, kind, width):
+    path = cube_path(month, kind, width)
+    if not os.path.exists(path):
+        # 큐브 도입 이전에 적재된 월은 처음 조회할 때 한 번 만들어 둡니다.
+        write_cube(month, kind, width, build_cube(load_partition(month, kind), width))
+    return pd.read_parquet(path)
+
+
+def cube_bands(cube):
+    return [col for col in cube.columns if col not in ("level", "parent")]
+
+
+def query_cube(month, width, sex, codes=None, parent=None, level=None):
+    kind = KIND_TOTAL if sex == SEX_TOTAL and not os.path.exists(partition_path(month, KIND_MF)) else KIND_MF
+    cube = load_cube(month, kind, width).xs(sex, level="sex")
+    if codes is not None:
+        cube = cube.reindex(codes)
+    if parent is not None:
+        cube = cube[cube["parent"] == parent]
+    if level is not None:
+        cube = cube[cube["level"] == level]
+    return cube[cube_bands(cube)]
+
+
+def population_matrix(long_df, sexes):
+    # query_population 결과를 (지역 × 성별 × 연령) 배열로 되돌립니다.
+    if long_df.empty:
+        return [], [], np.zeros((0, len(sexes), 0), dtype=np.int64)
+    ages = long_df["age"].iloc[:len(long_df["age"].unique())].tolist()
+    block = len(sexes) * len(ages)
+    codes = long_df["code"].to_numpy()[::block].tolist()
+    values = long_df["population"].to_numpy().reshape(len(codes), len(sexes), len(ages))
+    return codes, ages, values
@@ -0,0 +1,127 @@
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- 경로 응답 디스크 캐시 (SQLite) ---
+# Directions API 결과를 (반올림한 출발/도착 좌표, 이동 수단, 회피, 대체 경로, 교통 모델, 출발 시각)을 키로 저장합니다.
+# 파일 하나를 모든 세션과 프로세스가 같이 쓰므로 재시작 후에도 같은 경로는 API를 다시 부르지 않습니다.
+# 오류 응답은 저장하지 않습니다.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROUTE_CACHE_FILE = os.path.join(BASE_DIR, ".cache", "routes.sqlite3")
+
+COORD_DECIMALS = 5  # 약 1m: 같은 마커끼리의 요청이 같은 키가 되도록
+STATIC_TTL_SECONDS = 7 * 24 * 60 * 60  # 출발 시각이 없는 경로 (도로가 바뀌지 않는 한 그대로)
+LIVE_TTL_SECONDS = 5 * 60  # departure_time=now: 실시간 교통이 반영되므로 짧게
+FUTURE_TTL_SECONDS = 24 * 60 * 60  # 미래 출발 시각 예측: 출발 시각 전까지, 최대 하루
+DEPARTURE_BUCKET_SECONDS = 15 * 60  # 지정 출발 시각은 15분 단위로 묶음
+
+_local = threading.local()
+
+
+def connect(path=ROUTE_CACHE_FILE):
+    # 스레드마다 연결 하나 (Streamlit 세션은 서로 다른 스레드에서 실행됨)
+    connections = _local.__dict__.setdefault("connections", {})
+    if path not in connections:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS routes (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS routes_expires_at ON routes (expires_at)")
+        conn.commit()
+        connections[path] = conn
+    return connections[path]
+
+
+def cache_policy(namespace, origin_lat, origin_lng, dest_lat, dest_lng, mode, options, now=None):
+    # (캐시 키, 유효 시간 초)
+    now = time.time() if now is None else now
+    departure = options.get("departure_time")
+    if departure is None:
+        departure_key, ttl = None, STATIC_TTL_SECONDS
+    elif departure == "now":
+        departure_key, ttl = "now", LIVE_TTL_SECONDS
+    else:
+        departure = int(departure)
+        departure_key = departure // DEPARTURE_BUCKET_SECONDS * DEPARTURE_BUCKET_SECONDS
+        ttl = min(departure - now, FUTURE_TTL_SECONDS) if departure > now else LIVE_TTL_SECONDS
+    avoid = options.get("avoid")
+    key = json.dumps([
+        namespace,
+        [round(float(v), COORD_DECIMALS) for v in (origin_lat, origin_lng, dest_lat, dest_lng)],
+        mode,
+        sorted(avoid.split("|")) if avoid else [],
+        str(options.get("alternatives", "false")).lower() == "true",
+        options.get("traffic_model"),
+        departure_key,
+    ])
+    return key, ttl
+
+
+def get_cached_route(key, path=ROUTE_CACHE_FILE):
+    row = connect(path).execute(
+        "SELECT value FROM routes WHERE key = ? AND expires_at > ?", (key, time.time())
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def put_cached_route(key, value, ttl, path=ROUTE_CACHE_FILE):
+    put_cached_routes([(key, value, ttl)], path)
+
+
+# SQLite가 한 문장에 받는 변수 수(기본 999)보다 작게 나눠 조회
+LOOKUP_CHUNK = 500
+
+
+def get_cached_routes(keys, path=ROUTE_CACHE_FILE):
+    # 여러 키를 몇 번의 쿼리로 조회 → {키: 값} (없거나 만료된 키는 빠짐)
+    keys = list(keys)
+    conn, now, found = connect(path), time.time(), {}
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys[start:start + LOOKUP_CHUNK]
+        rows = conn.execute(
+            f"SELECT key, value FROM routes WHERE expires_at > ? AND key IN ({','.join('?' * len(chunk))})",
+            (now, *chunk),
+        ).fetchall()
+        found.update((key, json.loads(value)) for key, value in rows)
+    return found
+
+
+def put_cached_routes(items, path=ROUTE_CACHE_FILE):
+    # items: [(키, 값, 유효 시간 초)], 한 트랜잭션으로 저장
+    now = time.time()
+    conn = connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO routes (key, value, expires_at) VALUES (?, ?, ?)",
+            [(key, json.dumps(value, ensure_ascii=False), now + ttl) for key, value, ttl in items],
+        )
+        conn.execute("DELETE FROM routes WHERE expires_at <= ?", (now,))
+
+
+def persistent_directions(namespace, path=ROUTE_CACHE_FILE):
+    # get_directions(origin_lat, origin_lng, dest_lat, dest_lng, mode, **options)에 씌우는 데코레이터
+    # namespace: 페이지마다 돌려주는 값의 형태가 다르므로 키를 나눔
+    def decorate(fetch):
+        @functools.wraps(fetch)
+        def wrapper(origin_lat, origin_lng, dest_lat, dest_lng, mode="driving", **options):
+            key, ttl = cache_policy(namespace, origin_lat, origin_lng, dest_lat, dest_lng, mode, options)
+            try:
+                cached = get_cached_route(key, path)
+            except sqlite3.Error:
+                cached = None  # 캐시 파일 문제는 API 호출로 대신함
+            if cached is not None:
+                return cached
+            result = fetch(origin_lat, origin_lng, dest_lat, dest_lng, mode, **options)
+            if "error_message" not in result:
+                try:
+                    put_cached_route(key, result, ttl, path)
+                except sqlite3.Error:
+                    pass
+            return result
+        return wrapper
+    return decorate
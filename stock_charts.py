@@ -0,0 +1,83 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# --- 차트용 다운샘플링 ---
+# 긴 기간(수년치 일봉)도 화면에 필요한 만큼의 점만 보내도록 LTTB(Largest-Triangle-Three-Buckets)로 줄입니다.
+MAX_CHART_POINTS = 1500
+
+
+def lttb_indices(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # 이전 선택점 a, 현재 버킷의 후보점, 다음 버킷 평균점이 이루는 삼각형 넓이가 가장 큰 점 선택
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def downsample_positions(series, threshold=MAX_CHART_POINTS):
+    if len(series) <= threshold:
+        return np.arange(len(series))
+    x = series.index.asi8 if hasattr(series.index, "asi8") else np.arange(len(series))
+    return lttb_indices(x, series.to_numpy(), threshold)
+
+
+# 오버레이 이름 → 선 스타일
+OVERLAY_STYLES = {
+    "이동평균": dict(color='orange', width=1.5),
+    "지수이동평균": dict(color='green', width=1.5),
+    "볼린저 상단": dict(color='gray', width=1, dash='dot'),
+    "볼린저 하단": dict(color='gray', width=1, dash='dot'),
+}
+
+
+def build_price_figure(data, company_name, period_label, currency="KRW", overlays=None):
+    close = data["Close"].dropna()
+    # 지표선도 종가와 같은 위치의 점만 남겨 선끼리 어긋나지 않게 함
+    positions = downsample_positions(close)
+    sampled_close = close.iloc[positions]
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=sampled_close.index,
+        y=sampled_close.values,
+        mode='lines',
+        name=f'{company_name} 종가',
+        line=dict(color='dodgerblue', width=2)
+    ))
+    for label, series in (overlays or {}).items():
+        sampled = series.reindex(close.index).iloc[positions]
+        fig.add_trace(go.Scattergl(
+            x=sampled.index,
+            y=sampled.values,
+            mode='lines',
+            name=label,
+            line=OVERLAY_STYLES.get(label, dict(width=1))
+        ))
+    fig.update_layout(
+        title=f'{company_name} 최근 {period_label} 주가 추이',
+        xaxis_title='날짜',
+        yaxis_title=f'주가 ({currency})',
+        height=500,
+        hovermode='x unified',
+        legend=dict(orientation="h", y=-0.2),
+    )
+    fig.update_xaxes(rangeslider_visible=len(data) > 300)
+    return fig
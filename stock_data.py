@@ -0,0 +1,313 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- 종목 유니버스 ---
+# name,ticker 컬럼의 CSV 파일로 관리합니다. (data/global_universe.csv)
+GLOBAL_UNIVERSE_FILE = os.path.join(BASE_DIR, "data", "global_universe.csv")
+
+
+def load_universe(path=GLOBAL_UNIVERSE_FILE):
+    universe = pd.read_csv(path, dtype=str).dropna(subset=["name", "ticker"])
+    return dict(zip(universe["name"].str.strip(), universe["ticker"].str.strip()))
+
+
+# 본사 위치가 있는 기업 목록: name,ticker,lat,lon,logo (data/k_companies.csv)
+K_COMPANIES_FILE = os.path.join(BASE_DIR, "data", "k_companies.csv")
+
+
+def load_company_table(path=K_COMPANIES_FILE):
+    # 기업명을 인덱스로 둔 메타데이터 표 (가격 데이터는 포함하지 않음)
+    table = pd.read_csv(path, dtype={"ticker": str, "logo": str}).dropna(subset=["name", "ticker", "lat", "lon"])
+    table["logo"] = table["logo"].fillna("")
+    return table.drop_duplicates("name").set_index("name")
+
+
+def companies_in_bounds(table, bounds):
+    # st_folium이 돌려주는 bounds({'_southWest': {...}, '_northEast': {...}}) 안의 기업
+    south_west, north_east = bounds["_southWest"], bounds["_northEast"]
+    mask = (
+        table["lat"].between(south_west["lat"], north_east["lat"])
+        & table["lon"].between(south_west["lng"], north_east["lng"])
+    )
+    return table[mask]
+
+
+# --- 주가 조회 ---
+# 여러 종목을 동시에 요청해 페이지 로딩이 종목 수만큼 늘어나지 않도록 합니다.
+MAX_FETCH_WORKERS = 8
+
+
+def yahoo_history(ticker, start=None, end=None, period=None):
+    ticker_obj = yf.Ticker(ticker)
+    if period is not None:
+        return ticker_obj.history(period=period)
+    return ticker_obj.history(start=start, end=end)
+
+
+def pick_close(hist):
+    # 'Adj Close' 우선 사용, 없으면 'Close'
+    if "Adj Close" in hist.columns:
+        return hist["Adj Close"]
+    if "Close" in hist.columns:
+        return hist["Close"]
+    return None
+
+
+# --- 디스크 주가 캐시 (종목별 Parquet) ---
+# 지금까지 받은 일봉을 모두 보관하고, 다음 요청 때는 마지막 저장일 이후 구간만 다시 받습니다.
+# 마지막 저장일은 장중 미완성 봉일 수 있으므로 그날부터 다시 받아 덮어씁니다.
+# 파일 속성(attrs)에 뒤쪽을 어디까지 확인했는지(checked_until)와 그 시각(checked_at)을 함께 저장해,
+# 이미 확인한 구간은 다시 묻지 않고 오늘이 포함된 요청만 MIN_REFRESH_SECONDS마다 다시 받습니다.
+# yfinance는 분할/배당을 반영한 수정 가격(auto_adjust)을 주므로, 그 사이 분할/배당이 있었다면
+# 저장된 과거 가격과 새로 받은 가격의 기준이 달라집니다. 이때는 저장본을 버리고 전체 구간을 다시 받습니다.
+PRICE_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "prices")
+MIN_REFRESH_SECONDS = 15 * 60  # 오늘 봉을 이 시간 안에 확인했으면 다시 묻지 않음
+
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+
+def period_start(period, today=None):
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    return today - PERIOD_OFFSETS[period]
+
+
+def price_cache_path(ticker):
+    return os.path.join(PRICE_CACHE_DIR, f"{ticker}.parquet")
+
+
+def normalize_index(hist):
+    # 거래소별 시간대를 제거하고 날짜 단위로 맞춰 여러 시장을 같은 축에 놓을 수 있게 함
+    hist = hist.copy()
+    index = pd.DatetimeIndex(hist.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    hist.index = index.normalize()
+    hist.index.name = "Date"
+    return hist
+
+
+def read_cached_prices(ticker):
+    path = price_cache_path(ticker)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def write_cached_prices(ticker, hist):
+    os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+    path = price_cache_path(ticker)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    hist.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+ADJUSTMENT_COLUMNS = ("Stock Splits", "Dividends")
+
+
+def price_basis_changed(stored, fetched):
+    # 다시 받은 마지막 저장일 봉의 시가가 달라졌거나, 그 뒤 새 봉에 분할/배당이 있으면 True
+    # (종가는 장중 미완성 봉이면 원래 바뀌므로 하루 중 고정되는 시가로 비교)
+    last_day = stored.index[-1]
+    if last_day in fetched.index and "Open" in stored.columns and "Open" in fetched.columns:
+        before, after = stored.at[last_day, "Open"], fetched.loc[[last_day], "Open"].iloc[-1]
+        if not np.isclose(before, after, rtol=1e-6, equal_nan=True):
+            return True
+    new_bars = fetched[fetched.index > last_day]
+    return any(
+        (new_bars[col].fillna(0) != 0).any() for col in ADJUSTMENT_COLUMNS if col in new_bars.columns
+    )
+
+
+def cached_history(ticker, start=None, end=None, period=None, provider=yahoo_history):
+    start = pd.Timestamp(start).normalize() if start is not None else period_start(period or "1y")
+    end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+
+    stored = read_cached_prices(ticker)
+    if stored is None or stored.empty:
+        frames, covered_from, checked_until, checked_at = [], start, end, 0.0
+        ranges, fetch_tail = [(start, end)], True
+    else:
+        # covered_from: 이미 요청해 본 가장 이른 날짜 (상장 전 구간을 반복해서 묻지 않도록)
+        frames, covered_from = [stored], pd.Timestamp(stored.attrs.get("covered_from", stored.index[0]))
+        checked_until = pd.Timestamp(stored.attrs.get("checked_until", stored.index[-1] + pd.Timedelta(days=1)))
+        checked_at = float(stored.attrs.get("checked_at", 0.0))
+        ranges = []
+        # 저장본이 요청 끝까지 닿지 않고 그 구간을 아직 확인하지 않았거나,
+        # 요청에 오늘이 포함되어 있고 마지막 확인이 MIN_REFRESH_SECONDS보다 오래된 경우 뒤쪽을 다시 받음
+        beyond_stored = stored.index[-1] < end - pd.Timedelta(days=1) and end > checked_until
+        today_is_stale = end > pd.Timestamp.today().normalize() and time.time() - checked_at >= MIN_REFRESH_SECONDS
+        fetch_tail = beyond_stored or today_is_stale
+        if fetch_tail:
+            ranges.append((stored.index[-1], end))  # 마지막 저장일 이후 (가격 기준이 바뀌었는지 먼저 확인)
+        if start < covered_from:
+            ranges.append((start, covered_from))  # 저장된 구간보다 앞쪽 (기간을 늘린 경우)
+
+    for fetch_start, fetch_end in ranges:
+        fetched = provider(ticker, start=fetch_start, end=fetch_end)
+        if fetched is None or fetched.empty:
+            continue
+        fetched = normalize_index(fetched)
+        if frames and fetch_start == stored.index[-1] and price_basis_changed(stored, fetched):
+            # 저장된 가격의 기준이 바뀜 → 저장본을 지우고 지금까지 덮었던 전체 구간을 새로 받음
+            os.remove(price_cache_path(ticker))
+            full = cached_history(ticker, start=min(start, covered_from), end=end, provider=provider)
+            return full.loc[full.index >= start]
+        frames.append(fetched)
+
+    if not frames:
+        return pd.DataFrame()
+    merged = pd.concat(frames)
+    if ranges:
+        if fetch_tail:
+            # 뒤쪽(또는 처음 전체)을 받았으면 확인한 끝 날짜와 시각을 갱신 (앞쪽만 받은 경우는 그대로 유지)
+            checked_until, checked_at = max(checked_until, end), time.time()
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        merged.attrs = {
+            "covered_from": str(min(start, covered_from).date()),
+            "checked_until": str(checked_until.date()),
+            "checked_at": checked_at,
+        }
+        write_cached_prices(ticker, merged)
+    return merged.loc[(merged.index >= start) & (merged.index < end)]
+
+
+# --- 세션 간 공유 캐시 (single-flight + stale-while-revalidate) ---
+# 같은 프로세스의 모든 세션이 하나의 캐시를 씁니다.
+# - 같은 키를 동시에 요청하면 업스트림 호출은 한 번만 하고 나머지는 그 결과를 기다립니다.
+# - REFRESH_AFTER가 지난 항목은 기존 값을 바로 돌려주고 백그라운드에서 갱신합니다.
+# - MAX_STALE을 넘긴 항목만 새 값을 받을 때까지 기다립니다.
+REFRESH_AFTER_SECONDS = 45 * 60
+MAX_STALE_SECONDS = 3 * 60 * 60
+
+
+class SharedCache:
+    def __init__(self, loader, refresh_after=REFRESH_AFTER_SECONDS, max_stale=MAX_STALE_SECONDS,
+                 max_workers=MAX_FETCH_WORKERS):
+        self._loader = loader
+        self._refresh_after = refresh_after
+        self._max_stale = max_stale
+        self._entries = {}  # key -> (값, 적재 시각)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-cache")
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                age = time.monotonic() - loaded_at
+                if age < self._max_stale:
+                    if age >= self._refresh_after:
+                        self._start_load(key)  # 기다리지 않고 기존 값 반환
+                    return value
+            future = self._start_load(key)
+        return future.result()
+
+    def prefetch(self, key):
+        # 결과를 기다리지 않고 캐시만 미리 채움 (이미 신선한 항목은 건너뜀)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] >= self._refresh_after:
+                self._start_load(key)
+
+    def _start_load(self, key):
+        # self._lock을 잡은 상태에서만 호출
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._executor.submit(self._load, key)
+            self._inflight[key] = future
+        return future
+
+    def _load(self, key):
+        try:
+            value = self._loader(*key)
+            with self._lock:
+                now = time.monotonic()
+                self._entries[key] = (value, now)
+                for old_key in [k for k, (_, t) in self._entries.items() if now - t >= self._max_stale]:
+                    del self._entries[old_key]
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+def _load_history(ticker, start, end):
+    return cached_history(ticker, start=start, end=end)
+
+
+_shared_prices = SharedCache(_load_history)
+
+
+def history_key(ticker, start=None, end=None, period=None):
+    # 날짜 단위로 키를 맞춰 같은 날 같은 구간을 요청한 세션끼리 결과를 공유
+    start = pd.Timestamp(start).normalize() if start is not None else period_start(period or "1y")
+    end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    return ticker, start, end
+
+
+def shared_history(ticker, start=None, end=None, period=None):
+    # 캐시된 DataFrame은 여러 세션이 같이 쓰므로 복사본을 돌려줌
+    return _shared_prices.get(history_key(ticker, start, end, period)).copy()
+
+
+def prefetch_histories(tickers, start=None, end=None, period=None):
+    for ticker in tickers:
+        _shared_prices.prefetch(history_key(ticker, start, end, period))
+
+
+def fetch_histories(tickers, start=None, end=None, period=None, provider=yahoo_history,
+                    max_workers=MAX_FETCH_WORKERS):
+    # 종목별 결과를 (DataFrame 또는 None, 예외 또는 None)으로 돌려줍니다.
+    def fetch_one(ticker):
+        try:
+            return provider(ticker, start=start, end=end, period=period), None
+        except Exception as e:
+            return None, e
+
+    tickers = list(tickers)
+    if not tickers:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers))) as executor:
+        results = executor.map(fetch_one, tickers)
+        return dict(zip(tickers, results))
+
+
+def fetch_close_prices(companies, start, end, provider=shared_history, max_workers=MAX_FETCH_WORKERS):
+    # companies: {회사명: 티커} → ({회사명: 종가 Series}, 오류 메시지 목록)
+    histories = fetch_histories(companies.values(), start=start, end=end,
+                                provider=provider, max_workers=max_workers)
+    data = {}
+    error_list = []
+    for name, ticker in companies.items():
+        hist, error = histories[ticker]
+        if error is not None:
+            error_list.append(f"{name} 데이터 로드 실패: {error}")
+            continue
+        if hist is None or hist.empty:
+            error_list.append(f"{name}: 데이터 없음")
+            continue
+        series = pick_close(hist)
+        if series is None:
+            error_list.append(f"{name}: 'Adj Close' 또는 'Close' 컬럼 없음")
+            continue
+        data[name] = series
+    return data, error_list
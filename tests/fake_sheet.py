@@ -0,0 +1,98 @@
+import json
+
+import requests
+from gspread.exceptions import APIError
+from gspread.utils import a1_to_rowcol
+
+# --- 테스트용 가짜 워크시트 ---
+# MarkerMirror가 쓰는 gspread 메서드만 메모리 안의 2차원 목록으로 흉내 냅니다.
+# 호출 기록(calls)과 수정 시각(revision)을 남기고, fail_next로 다음 호출을 API 오류로 실패시킬 수 있습니다.
+
+
+def api_error(code, message="error"):
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({"error": {"code": code, "message": message, "status": ""}}).encode()
+    return APIError(response)
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def get_lastUpdateTime(self):
+        self.worksheet.record("get_lastUpdateTime")
+        return f"rev{self.worksheet.revision}"
+
+    def batch_update(self, body):
+        self.worksheet.record("batch_update", body)
+        spans = [
+            (request["deleteDimension"]["range"]["startIndex"], request["deleteDimension"]["range"]["endIndex"])
+            for request in body["requests"]
+        ]
+        # 요청 순서대로 적용 (실제 API와 같이 앞 요청의 결과 위에서 다음 요청의 인덱스를 해석)
+        for start, end in spans:
+            del self.worksheet.values[start:end]
+        self.worksheet.revision += 1
+
+
+class FakeWorksheet:
+    id = 0
+    title = "Sheet1"
+
+    def __init__(self, values=None):
+        self.values = [list(row) for row in values or []]
+        self.revision = 0
+        self.calls = []
+        self.failures = {}
+        self.spreadsheet = FakeSpreadsheet(self)
+
+    def fail_next(self, method, code, times=1):
+        self.failures[method] = [code] * times
+
+    def record(self, method, *args):
+        self.calls.append((method, *args))
+        if self.failures.get(method):
+            raise api_error(self.failures[method].pop(0))
+
+    def count(self, method):
+        return sum(1 for call in self.calls if call[0] == method)
+
+    def touch(self):
+        # 다른 곳에서 시트를 고친 것처럼 수정 시각만 올림
+        self.revision += 1
+
+    def get_all_values(self, **kwargs):
+        self.record("get_all_values")
+        return [list(row) for row in self.values]
+
+    def append_rows(self, rows, **kwargs):
+        self.record("append_rows", len(rows))
+        first = len(self.values) + 1
+        self.values.extend(list(row) for row in rows)
+        self.revision += 1
+        return {"updates": {"updatedRange": f"{self.title}!A{first}:D{len(self.values)}"}}
+
+    def batch_get(self, ranges, **kwargs):
+        self.record("batch_get", list(ranges))
+        cells = []
+        for a1 in ranges:
+            row, col = a1_to_rowcol(a1)
+            value = self.values[row - 1][col - 1] if row <= len(self.values) and col <= len(self.values[row - 1]) else ""
+            cells.append([[value]] if value != "" else [])
+        return cells
+
+    def update(self, values, range_name=None, **kwargs):
+        self.record("update", range_name)
+        row, col = a1_to_rowcol(range_name.split(":")[0])
+        for i, new_values in enumerate(values):
+            while len(self.values) < row + i:
+                self.values.append([])
+            target = self.values[row - 1 + i]
+            target.extend([""] * (col - 1 + len(new_values) - len(target)))
+            target[col - 1:col - 1 + len(new_values)] = new_values
+        self.revision += 1
+
+    def col_values(self, col):
+        self.record("col_values", col)
+        return [row[col - 1] if len(row) >= col else "" for row in self.values]
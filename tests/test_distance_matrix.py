@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from distance_matrix import MAX_ELEMENTS_PER_REQUEST, MAX_POINTS_PER_SIDE, compute_distance_matrix, matrix_batches
+
+API_KEY = "test-secret-key"
+SEOUL = [(37.50 + 0.01 * k, 127.00 + 0.01 * k) for k in range(10)]
+BUSAN = [(35.10 + 0.01 * k, 129.00 + 0.01 * k) for k in range(10)]
+
+
+class StubMatrixApi:
+    # 요청받은 출발지/도착지 묶음을 기록하고 좌표로 정해지는 시간·거리를 돌려주는 가짜 Distance Matrix API
+    def __init__(self, response=None, error=None):
+        self.calls = []
+        self.response = response
+        self.error = error
+
+    def __call__(self, base_url, params):
+        origins = [parse_point(p) for p in params["origins"].split("|")]
+        destinations = [parse_point(p) for p in params["destinations"].split("|")]
+        self.calls.append((origins, destinations))
+        if self.error:
+            raise self.error
+        if self.response:
+            return self.response
+        return {"status": "OK", "rows": [
+            {"elements": [element(o, d) for d in destinations]} for o in origins
+        ]}
+
+
+def parse_point(text):
+    lat, lon = text.split(",")
+    return float(lat), float(lon)
+
+
+def travel_seconds(origin, dest):
+    return int(round((abs(origin[0] - dest[0]) + abs(origin[1] - dest[1])) * 1e4)) + 1
+
+
+def element(origin, dest):
+    seconds = travel_seconds(origin, dest)
+    return {"status": "OK", "duration": {"value": seconds}, "distance": {"value": seconds * 10}}
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "routes.sqlite3")
+
+
+def run(points, api, cache_path, mode="driving"):
+    return compute_distance_matrix(points, mode, api_key=API_KEY, base_url="http://stub", cache_path=cache_path, fetch=api)
+
+
+# --- 요청 묶음 ---
+def test_batches_respect_element_and_side_limits(cache_path):
+    points = [(37.0 + 0.01 * i, 127.0 + 0.013 * i) for i in range(37)]
+    api = StubMatrixApi()
+    result = run(points, api, cache_path)
+    assert api.calls and result["requests"] == len(api.calls)
+    for origins, destinations in api.calls:
+        assert len(origins) * len(destinations) <= MAX_ELEMENTS_PER_REQUEST
+        assert len(origins) <= MAX_POINTS_PER_SIDE and len(destinations) <= MAX_POINTS_PER_SIDE
+    expected = np.array([[travel_seconds(o, d) if i != j else 0 for j, d in enumerate(points)]
+                         for i, o in enumerate(points)], dtype=float)
+    np.testing.assert_array_equal(result["duration"], expected)
+    np.testing.assert_array_equal(result["distance"], np.where(expected > 0, expected * 10, 0))
+    assert result["errors"] == []
+
+
+def test_single_origin_uses_at_most_side_limit():
+    needed = np.zeros((60, 60), dtype=bool)
+    needed[0, 1:] = True
+    batches = matrix_batches(needed)
+    assert [len(d) for _, d in batches] == [25, 25, 9]
+    assert all(len(o) == 1 for o, _ in batches)
+
+
+# --- 직선거리 사전 필터 ---
+def test_far_pairs_are_skipped_without_requests(cache_path):
+    points = SEOUL + BUSAN
+    api = StubMatrixApi()
+    result = run(points, api, cache_path, mode="walking")
+    assert result["skipped"] == 2 * len(SEOUL) * len(BUSAN)
+    requested = {(o, d) for origins, destinations in api.calls for o in origins for d in destinations}
+    assert not any((o in SEOUL) != (d in SEOUL) for o, d in requested)
+    assert np.isnan(result["duration"][:10, 10:]).all() and np.isnan(result["duration"][10:, :10]).all()
+    assert not np.isnan(result["duration"][:10, :10]).any()
+
+
+def test_same_place_is_zero_without_requests(cache_path):
+    api = StubMatrixApi()
+    result = run([SEOUL[0], (SEOUL[0][0] + 1e-6, SEOUL[0][1])], api, cache_path)
+    assert api.calls == []
+    np.testing.assert_array_equal(result["duration"], np.zeros((2, 2)))
+
+
+# --- 경로 캐시 ---
+def test_second_run_is_served_from_cache(cache_path):
+    points = SEOUL + [(37.9, 127.4), (37.2, 126.8)]
+    first = run(points, StubMatrixApi(), cache_path)
+    api = StubMatrixApi()
+    second = run(points, api, cache_path)
+    pairs = len(points) * (len(points) - 1)
+    assert api.calls == [] and second["requests"] == 0
+    assert second["cached"] == pairs
+    np.testing.assert_array_equal(second["duration"], first["duration"])
+    np.testing.assert_array_equal(second["distance"], first["distance"])
+
+
+def test_errors_are_not_cached(cache_path):
+    run(SEOUL[:3], StubMatrixApi(response={"status": "OVER_QUERY_LIMIT"}), cache_path)
+    api = StubMatrixApi()
+    result = run(SEOUL[:3], api, cache_path)
+    assert len(api.calls) == 1 and result["cached"] == 0
+
+
+# --- 오류 메시지 ---
+def test_exception_message_does_not_leak_key(cache_path):
+    api = StubMatrixApi(error=ConnectionError(f"failed: http://stub?key={API_KEY}"))
+    result = run(SEOUL[:3], api, cache_path)
+    assert result["errors"] == ["API 호출 오류: ConnectionError"]
+    assert np.isnan(result["duration"][~np.eye(3, dtype=bool)]).all()
+
+
+def test_error_message_does_not_leak_key(cache_path):
+    response = {"status": "REQUEST_DENIED", "error_message": f"The provided API key is invalid: {API_KEY}"}
+    result = run(SEOUL[:3], StubMatrixApi(response=response), cache_path)
+    assert result["errors"] and all(API_KEY not in e for e in result["errors"])
+    assert result["errors"][0] == "The provided API key is invalid: ***"
+
+
+def test_status_is_reported_without_error_message(cache_path):
+    result = run(SEOUL[:3], StubMatrixApi(response={"status": "OVER_QUERY_LIMIT"}), cache_path)
+    assert result["errors"] == ["OVER_QUERY_LIMIT"]
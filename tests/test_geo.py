@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from geo import MarkerIndex, destination_point, distance_matrix_km, haversine_km, initial_bearing, vincenty_km
+
+
+def random_markers(rng, count, lat_range=(-85, 85), lon_range=(-180, 180)):
+    lats = rng.uniform(*lat_range, count)
+    lons = rng.uniform(*lon_range, count)
+    return [{"id": f"m{i}", "label": f"마커{i}", "lat": float(lat), "lon": float(lon)}
+            for i, (lat, lon) in enumerate(zip(lats, lons))]
+
+
+def brute_force_radius(markers, lat, lon, radius_km):
+    distances = haversine_km(lat, lon, [m["lat"] for m in markers], [m["lon"] for m in markers])
+    return sorted(m["id"] for m, d in zip(markers, distances) if d <= radius_km)
+
+
+def brute_force_nearest(markers, lat, lon, k):
+    distances = haversine_km(lat, lon, [m["lat"] for m in markers], [m["lon"] for m in markers])
+    return [markers[i]["id"] for i in np.argsort(distances, kind="stable")[:k]]
+
+
+# --- 반경 질의 ---
+def test_marker_just_inside_radius_across_cell_edge():
+    # 중심은 37.05° 칸 경계 바로 아래, 마커는 정북 0.99995km (경계 너머 칸)
+    lat, lon = 37.05 - 1 / 111.30, 127.0
+    marker_lat, marker_lon = destination_point(lat, lon, 0.0, 0.99995)
+    index = MarkerIndex([{"id": "a", "label": "a", "lat": float(marker_lat), "lon": float(marker_lon)}])
+
+    found = index.within_radius(lat, lon, 1.0)
+    assert [marker["id"] for marker, _ in found] == ["a"]
+    assert index.nearest(lat, lon, k=1)[0][0]["id"] == "a"
+
+
+def test_marker_at_high_latitude_edge_of_circle():
+    # 고위도에서는 원의 동서 끝이 중심 위도보다 극 쪽에 있어 cos(중심 위도)로 구한 경도 폭보다 넓음
+    lat, lon = 70.0, 20.0
+    markers = []
+    for i, bearing in enumerate(np.linspace(0, 360, 73)[:-1]):
+        marker_lat, marker_lon = destination_point(lat, lon, bearing, 499.999)
+        markers.append({"id": f"b{i}", "label": "", "lat": float(marker_lat), "lon": float(marker_lon)})
+    found = MarkerIndex(markers).within_radius(lat, lon, 500.0)
+    assert len(found) == len(markers)
+
+
+@pytest.mark.parametrize("radius_km", [0.5, 3, 40, 800, 5000])
+def test_within_radius_matches_brute_force(radius_km):
+    rng = np.random.default_rng(int(radius_km * 10))
+    markers = random_markers(rng, 3000)
+    index = MarkerIndex(markers)
+    for lat, lon in zip(rng.uniform(-89, 89, 30), rng.uniform(-180, 180, 30)):
+        found = sorted(marker["id"] for marker, _ in index.within_radius(lat, lon, radius_km))
+        assert found == brute_force_radius(markers, lat, lon, radius_km)
+
+
+def test_within_radius_across_antimeridian_and_pole():
+    markers = [
+        {"id": "east", "label": "", "lat": 10.0, "lon": 179.99},
+        {"id": "west", "label": "", "lat": 10.0, "lon": -179.99},
+        {"id": "pole_a", "label": "", "lat": 89.9, "lon": 0.0},
+        {"id": "pole_b", "label": "", "lat": 89.9, "lon": 180.0},
+    ]
+    index = MarkerIndex(markers)
+    assert {m["id"] for m, _ in index.within_radius(10.0, 179.995, 5)} == {"east", "west"}
+    assert {m["id"] for m, _ in index.within_radius(89.95, 90.0, 30)} == {"pole_a", "pole_b"}
+
+
+# --- 최근접 질의 ---
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_nearest_matches_brute_force(k):
+    rng = np.random.default_rng(k)
+    markers = random_markers(rng, 2000, lat_range=(33, 39), lon_range=(124, 132))
+    index = MarkerIndex(markers)
+    for lat, lon in zip(rng.uniform(30, 42, 25), rng.uniform(120, 135, 25)):
+        found = [marker["id"] for marker, _ in index.nearest(lat, lon, k)]
+        assert found == brute_force_nearest(markers, lat, lon, k)
+
+
+def test_nearest_after_removal():
+    rng = np.random.default_rng(7)
+    markers = random_markers(rng, 500, lat_range=(33, 39), lon_range=(124, 132))
+    index = MarkerIndex(markers)
+    removed = {f"m{i}" for i in range(0, 500, 2)}
+    for marker_id in removed:
+        index.remove(marker_id)
+    remaining = [m for m in markers if m["id"] not in removed]
+    assert len(index) == len(remaining)
+    assert [m["id"] for m, _ in index.nearest(36.0, 128.0, 10)] == brute_force_nearest(remaining, 36.0, 128.0, 10)
+
+
+# --- 거리 / 방위 ---
+def test_vincenty_flinders_peak_to_buninyong():
+    # Vincenty(1975)의 검증 예제
+    assert vincenty_km(-37.95103342, 144.42486789, -37.65282114, 143.92649554) == pytest.approx(54.972271, abs=1e-6)
+
+
+def test_haversine_matches_scalar_formula():
+    rng = np.random.default_rng(3)
+    lat1, lon1, lat2, lon2 = rng.uniform(33, 38, 4), rng.uniform(125, 129, 4), rng.uniform(33, 38, 4), rng.uniform(125, 129, 4)
+    expected = [
+        2 * 6371.0088 * np.arcsin(np.sqrt(
+            np.sin(np.radians(b - a) / 2) ** 2
+            + np.cos(np.radians(a)) * np.cos(np.radians(b)) * np.sin(np.radians(d - c) / 2) ** 2
+        ))
+        for a, c, b, d in zip(lat1, lon1, lat2, lon2)
+    ]
+    assert haversine_km(lat1, lon1, lat2, lon2) == pytest.approx(expected, abs=1e-9)
+    assert distance_matrix_km(lat1, lon1)[0, 1] == pytest.approx(float(haversine_km(lat1[0], lon1[0], lat1[1], lon1[1])))
+
+
+def test_destination_point_round_trip():
+    lat, lon = destination_point(37.5665, 126.9780, 135.0, 50.0)
+    assert haversine_km(37.5665, 126.9780, lat, lon) == pytest.approx(50.0, abs=1e-9)
+    assert initial_bearing(37.5665, 126.9780, lat, lon) == pytest.approx(135.0, abs=1e-9)
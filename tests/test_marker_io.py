@@ -0,0 +1,126 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import marker_io
+from marker_io import (
+    import_markers, iter_markers_csv, iter_markers_geojson, normalize_columns, read_marker_csv,
+    read_marker_geojson, validate_coordinates, write_chunks
+)
+
+
+def csv_file(text, encoding="utf-8"):
+    return io.BytesIO(text.encode(encoding))
+
+
+def run_import(chunks, existing=()):
+    batches = []
+    summary = import_markers(chunks, list(existing), batches.append)
+    return summary, [marker for batch in batches for marker in batch]
+
+
+# --- 컬럼 이름 맞추기 ---
+@pytest.mark.parametrize("header", [
+    "label,lat,lon", "Name,Latitude,Longitude", "title, LAT , lng", "이름,위도,경도", "장소,y,x",
+])
+def test_column_aliases(header):
+    chunks = list(read_marker_csv(csv_file(f"{header}\n서울시청,37.5665,126.978\n")))
+    assert list(chunks[0].columns) == ["label", "lat", "lon"]
+    assert chunks[0].iloc[0].tolist() == ["서울시청", "37.5665", "126.978"]
+
+
+def test_unknown_columns_are_kept():
+    frame = normalize_columns(pd.DataFrame(columns=["Latitude", "Longitude", "메모"]))
+    assert list(frame.columns) == ["lat", "lon", "메모"]
+
+
+# --- 인코딩 ---
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "cp949"])
+def test_read_csv_encodings(encoding):
+    text = "이름,위도,경도\n" + "".join(f"장소{i},37.{i:04d},127.0\n" for i in range(20)) + "마지막 한글 행,36.0,128.0\n"
+    chunks = list(read_marker_csv(csv_file(text, encoding), chunksize=7))
+    frame = pd.concat(chunks, ignore_index=True)
+    assert list(frame.columns) == ["label", "lat", "lon"]
+    assert frame["label"].iloc[0] == "장소0" and frame["label"].iloc[-1] == "마지막 한글 행"
+    assert len(frame) == 21
+
+
+def test_detect_encoding_checks_the_whole_file_and_rewinds():
+    # 앞부분은 ASCII뿐이고 cp949 글자가 한참 뒤에 나와도 cp949로 판단
+    data = ("label,lat,lon\n" + "a,37.0,127.0\n" * 1000 + "한글,37.1,127.1\n").encode("cp949")
+    file = io.BytesIO(data)
+    assert marker_io.detect_encoding(file, block_size=64) == "cp949"
+    assert file.tell() == 0
+    assert marker_io.detect_encoding(io.BytesIO("한글".encode("utf-8")), block_size=1) == "utf-8-sig"
+
+
+# --- 좌표 검증 ---
+def test_validate_coordinates_drops_bad_rows():
+    frame = pd.DataFrame({
+        "label": [" 정상 ", None, "문자", "범위 밖", "빈 값", "경계"],
+        "lat": ["37.5", "36", "abc", "91", "", "-90"],
+        "lon": ["127", "128", "127", "127", "127", "180"],
+    })
+    cleaned, invalid = validate_coordinates(frame)
+    assert invalid == 3
+    assert cleaned["label"].tolist() == ["정상", "", "경계"]
+    assert cleaned["lat"].tolist() == [37.5, 36.0, -90.0]
+
+
+def test_validate_coordinates_without_coordinate_columns():
+    cleaned, invalid = validate_coordinates(pd.DataFrame({"label": ["a", "b"]}))
+    assert cleaned.empty and invalid == 2
+
+
+# --- 공간 해시 중복 제거 ---
+def test_import_dedupes_within_file_across_chunks_and_against_existing():
+    text = (
+        "label,lat,lon\n"
+        "A,37.500003,127.000003\n"
+        "A 중복,37.500004,127.000004\n"  # 같은 약 1m 칸
+        "B,37.500103,127.000003\n"  # 약 11m 떨어짐 → 다른 칸
+        "C,35.100003,129.000003\n"
+        "B 다른 덩어리,37.500103,127.000003\n"
+        "기존,33.450003,126.570003\n"
+        "잘못,abc,127\n"
+    )
+    existing = [{"label": "기존 마커", "lat": 33.450004, "lon": 126.570004}]
+    summary, added = run_import(read_marker_csv(csv_file(text), chunksize=4), existing)
+
+    assert summary == {"read": 7, "invalid": 1, "duplicate": 3, "added": 3}
+    assert [marker["label"] for marker in added] == ["A", "B", "C"]
+
+
+def test_import_names_unlabelled_markers_in_order():
+    text = "label,lat,lon\n,37.0,127.0\n이름 있음,37.1,127.1\n,37.2,127.2\n"
+    _, added = run_import(read_marker_csv(csv_file(text), chunksize=2))
+    assert [marker["label"] for marker in added] == ["마커 1", "이름 있음", "마커 3"]
+
+
+def test_spatial_keys_separate_neighbouring_cells():
+    # 약 1m 칸 안의 두 점은 같은 키, 두 칸 떨어진 점은 다른 키
+    keys = marker_io.spatial_keys([37.000003, 37.000004, 37.000023], [127.000003, 127.000004, 127.000003])
+    assert keys[0] == keys[1] != keys[2]
+
+
+# --- GeoJSON / 내보내기 ---
+def test_read_geojson_points_only():
+    collection = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [127.0, 37.5]}, "properties": {"name": "가"}},
+        {"type": "Feature", "geometry": {"type": "LineString", "coordinates": [[127, 37], [128, 38]]}, "properties": {}},
+        {"type": "Feature", "geometry": None, "properties": {"label": "좌표 없음"}},
+    ]}
+    summary, added = run_import(read_marker_geojson(io.BytesIO(json.dumps(collection).encode())))
+    assert summary["invalid"] == 2
+    assert added == [{"label": "가", "lat": 37.5, "lon": 127.0}]
+
+
+def test_export_round_trip():
+    locations = [{"label": f"장소 {i}", "lat": 37 + i / 1000, "lon": 127 + i / 1000} for i in range(25)]
+    csv_chunks = list(read_marker_csv(write_chunks(iter_markers_csv(locations, chunk_rows=10))))
+    _, from_csv = run_import(csv_chunks)
+    _, from_geojson = run_import(read_marker_geojson(write_chunks(iter_markers_geojson(locations))))
+    assert from_csv == locations
+    assert from_geojson == locations
@@ -0,0 +1,184 @@
+import time
+
+import pytest
+
+import marker_store
+from fake_sheet import FakeWorksheet, api_error
+from marker_store import MarkerMirror
+
+HEADER = ["Label", "Latitude", "Longitude", "ID"]
+FLUSH_TIMEOUT_SECONDS = 10
+
+
+def sheet_rows(count):
+    return [HEADER] + [[f"마커{i}", 37.5 + i / 100, 127.0 + i / 100, f"m{i:03d}"] for i in range(1, count + 1)]
+
+
+def sheet_ids(worksheet):
+    return [row[3] for row in worksheet.values[1:]]
+
+
+def loaded_mirror(worksheet):
+    mirror = MarkerMirror(flush_delay=0)
+    mirror.attach(worksheet)
+    mirror.sync()
+    return mirror
+
+
+def wait_flushed(mirror):
+    deadline = time.monotonic() + FLUSH_TIMEOUT_SECONDS
+    while mirror.pending_count():
+        assert time.monotonic() < deadline, "쓰기 큐가 비워지지 않음"
+        time.sleep(0.01)
+
+
+def index_matches_sheet(mirror, worksheet):
+    # 로컬 ID → 행 번호 색인이 시트의 실제 위치와 같은지
+    actual = {marker_id: row for row, marker_id in enumerate(sheet_ids(worksheet), start=2)}
+    return mirror._rows.to_dict() == actual
+
+
+# --- 동기화 ---
+def test_sync_loads_sheet_and_skips_unchanged_revision():
+    worksheet = FakeWorksheet(sheet_rows(3))
+    mirror = loaded_mirror(worksheet)
+
+    assert [record["id"] for record in mirror.locations()] == ["m001", "m002", "m003"]
+    assert mirror.sync() is False
+    assert worksheet.count("get_all_values") == 1
+
+    worksheet.values.append(["새 마커", 36.0, 128.0, "m004"])
+    worksheet.touch()
+    assert mirror.sync() is True
+    assert worksheet.count("get_all_values") == 2
+    assert len(mirror.locations()) == 4
+
+
+def test_sync_skips_rows_without_coordinates():
+    worksheet = FakeWorksheet(sheet_rows(2) + [["좌표 없음", "", "", "m900"], ["잘못된 값", "abc", 127, "m901"]])
+    mirror = loaded_mirror(worksheet)
+    assert [record["id"] for record in mirror.locations()] == ["m001", "m002"]
+
+
+def test_sync_backfills_missing_ids_in_one_update():
+    worksheet = FakeWorksheet([["Label", "Latitude", "Longitude"], ["가", 37.5, 127.0], ["나", 37.6, 127.1]])
+    mirror = loaded_mirror(worksheet)
+
+    assert worksheet.values[0] == HEADER
+    ids = sheet_ids(worksheet)
+    assert all(ids) and len(set(ids)) == 2
+    assert worksheet.count("update") == 1
+    assert [record["id"] for record in mirror.locations()] == ids
+    assert index_matches_sheet(mirror, worksheet)
+    # ID를 채운 뒤의 수정 시각을 기억하므로 다음 동기화는 다시 받지 않음
+    assert mirror.sync() is False
+
+
+def test_sync_creates_header_for_empty_sheet():
+    worksheet = FakeWorksheet()
+    mirror = loaded_mirror(worksheet)
+    assert worksheet.values == [HEADER]
+    assert mirror.locations() == []
+
+
+# --- 추가 ---
+def test_append_uses_updated_range_for_row_index():
+    worksheet = FakeWorksheet(sheet_rows(3))
+    mirror = loaded_mirror(worksheet)
+    added = mirror.queue_add_many([{"label": f"추가{i}", "lat": 35.0 + i, "lon": 129.0} for i in range(3)])
+    wait_flushed(mirror)
+
+    assert sheet_ids(worksheet)[-3:] == [location["id"] for location in added]
+    assert worksheet.count("append_rows") == 1
+    assert index_matches_sheet(mirror, worksheet)
+    assert worksheet.count("col_values") == 0
+
+
+def test_added_marker_is_visible_before_flush():
+    worksheet = FakeWorksheet(sheet_rows(1))
+    mirror = MarkerMirror(flush_delay=0.5)
+    mirror.attach(worksheet)
+    mirror.sync()
+    location = mirror.queue_add({"label": "바로 보임", "lat": 33.5, "lon": 126.5})
+
+    assert mirror.locations()[-1] == location
+    assert mirror.nearest(33.5, 126.5, k=1)[0][0]["id"] == location["id"]
+    wait_flushed(mirror)
+    assert sheet_ids(worksheet)[-1] == location["id"]
+
+
+# --- 삭제 ---
+def test_delete_removes_rows_and_shifts_index():
+    worksheet = FakeWorksheet(sheet_rows(6))
+    mirror = loaded_mirror(worksheet)
+    records = {record["id"]: record for record in mirror.locations()}
+
+    mirror.queue_delete(records["m002"])
+    mirror.queue_delete(records["m004"])
+    wait_flushed(mirror)
+    assert sheet_ids(worksheet) == ["m001", "m003", "m005", "m006"]
+    assert index_matches_sheet(mirror, worksheet)
+
+    # 위 삭제로 행 번호가 당겨진 마커도 색인의 행으로 바로 지움
+    mirror.queue_delete(records["m006"])
+    wait_flushed(mirror)
+    assert sheet_ids(worksheet) == ["m001", "m003", "m005"]
+    assert worksheet.count("col_values") == 0
+    assert [record["id"] for record in mirror.locations()] == ["m001", "m003", "m005"]
+
+
+def test_delete_rebuilds_index_when_sheet_changed_elsewhere():
+    worksheet = FakeWorksheet(sheet_rows(4))
+    mirror = loaded_mirror(worksheet)
+    target = next(record for record in mirror.locations() if record["id"] == "m003")
+    # 다른 곳에서 맨 위에 행이 끼워져 색인의 행 번호가 어긋남
+    worksheet.values.insert(1, ["외부 추가", 35.0, 129.0, "x001"])
+
+    mirror.queue_delete(target)
+    wait_flushed(mirror)
+    assert sheet_ids(worksheet) == ["x001", "m001", "m002", "m004"]
+    assert worksheet.count("col_values") == 1
+    assert index_matches_sheet(mirror, worksheet)
+
+
+def test_clear_keeps_only_header():
+    worksheet = FakeWorksheet(sheet_rows(5))
+    mirror = loaded_mirror(worksheet)
+    mirror.queue_clear()
+
+    assert mirror.locations() == []
+    wait_flushed(mirror)
+    assert worksheet.values == [HEADER]
+    assert mirror._rows.empty
+
+
+# --- 재시도 ---
+def test_rate_limited_write_is_retried():
+    worksheet = FakeWorksheet(sheet_rows(1))
+    mirror = loaded_mirror(worksheet)
+    worksheet.fail_next("append_rows", 429)
+    location = mirror.queue_add({"label": "재시도", "lat": 37.0, "lon": 127.0})
+    wait_flushed(mirror)
+
+    assert worksheet.count("append_rows") == 2
+    assert sheet_ids(worksheet) == ["m001", location["id"]]
+    assert mirror.last_write_error is None
+
+
+def test_non_retryable_error_drops_batch_and_resyncs():
+    worksheet = FakeWorksheet(sheet_rows(2))
+    mirror = loaded_mirror(worksheet)
+    worksheet.fail_next("append_rows", 400)
+    mirror.queue_add({"label": "실패", "lat": 37.0, "lon": 127.0})
+    wait_flushed(mirror)
+
+    assert worksheet.count("append_rows") == 1
+    assert mirror.last_write_error.code == 400
+    # 버린 변경은 다음 동기화에서 시트 내용으로 되돌림
+    assert mirror.sync() is True
+    assert [record["id"] for record in mirror.locations()] == ["m001", "m002"]
+
+
+@pytest.mark.parametrize("code, retryable", [(429, True), (503, True), (400, False), (403, False)])
+def test_is_retryable(code, retryable):
+    assert marker_store.is_retryable(api_error(code)) is retryable
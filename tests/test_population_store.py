@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+import population_data
+import population_store
+from population_data import (
+    BUNDLED_MF_FILE, BUNDLED_TOTAL_FILE, LEVEL_EUPMYEONDONG, LEVEL_GU, LEVEL_SIGUNGU, read_bundled_file,
+    region_level
+)
+from population_store import KIND_MF, SEX_FEMALE, SEX_MALE, SEX_TOTAL
+
+MONTH = "2025-04"
+GYEONGGI = "4100000000"
+SUWON = "4111000000"
+SUWON_JANGAN = "4111100000"
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    # 기본 제공 2025년 4월 파일 두 개를 임시 저장소에 적재
+    # 파싱 캐시(population_data.CACHE_DIR)도 임시 폴더로 돌려 작업 트리에 파일을 남기지 않음
+    store_dir = tmp_path_factory.mktemp("population_store")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(population_data, "CACHE_DIR", str(tmp_path_factory.mktemp("population_cache")))
+        mp.setattr(population_store, "STORE_DIR", str(store_dir))
+        mp.setattr(population_store, "MANIFEST_PATH", os.path.join(store_dir, "manifest.json"))
+        for path in (BUNDLED_MF_FILE, BUNDLED_TOTAL_FILE):
+            population_store.ingest_population_file(read_bundled_file(path))
+        yield
+
+
+def cube_for(width, sex):
+    return population_store.load_cube(MONTH, KIND_MF, width).xs(sex, level="sex")
+
+
+@pytest.mark.parametrize("width", population_store.AGE_BAND_WIDTHS)
+@pytest.mark.parametrize("sex", [SEX_MALE, SEX_FEMALE, SEX_TOTAL])
+def test_children_sum_to_parent_row(store, width, sex):
+    cube = cube_for(width, sex)
+    bands = population_store.cube_bands(cube)
+    sums = cube[cube["parent"].notna()].groupby("parent")[bands].sum()
+    assert (sums == cube.loc[sums.index, bands]).all().all()
+
+
+def test_city_districts_sit_under_the_city(store):
+    cube = cube_for(10, SEX_TOTAL)
+    assert cube.at[SUWON_JANGAN, "level"] == LEVEL_GU
+    assert cube.at[SUWON_JANGAN, "parent"] == SUWON
+    assert cube.at[SUWON, "parent"] == GYEONGGI
+    # 증평군(4374500000)은 영동군(4374000000)과 앞 4자리가 같지만 일반구가 아님
+    assert cube.at["4374500000", "level"] == LEVEL_SIGUNGU
+    assert cube.at["4374500000", "parent"] == "4300000000"
+
+
+def test_drilldown_does_not_double_count(store):
+    children = population_store.query_cube(MONTH, 10, SEX_TOTAL, parent=GYEONGGI)
+    parent = population_store.query_cube(MONTH, 10, SEX_TOTAL, codes=[GYEONGGI])
+    assert SUWON in children.index and SUWON_JANGAN not in children.index
+    assert children.to_numpy().sum() == parent.to_numpy().sum()
+
+
+def test_rollup_builds_missing_city_and_district_rows(store):
+    # 읍면동 행만 남긴 파티션에서 구 → 시 → 시도 행을 다시 만들어도 원본 행과 같아야 함
+    part = population_store.load_partition(MONTH, KIND_MF)
+    dongs = part[[region_level(code) == LEVEL_EUPMYEONDONG for code in part["code"]]].reset_index(drop=True)
+    rebuilt = population_store.build_cube(dongs, 10).xs(SEX_TOTAL, level="sex")
+    full = cube_for(10, SEX_TOTAL)
+    bands = population_store.cube_bands(full)
+    codes = [GYEONGGI, SUWON, SUWON_JANGAN]
+    assert (rebuilt.loc[codes, bands] == full.loc[codes, bands]).all().all()
+    assert rebuilt.at[SUWON_JANGAN, "parent"] == SUWON
+
+
+def test_population_matrix_round_trip(store):
+    codes = [SUWON_JANGAN, SUWON]
+    result = population_store.query_population(codes, [MONTH], (SEX_MALE, SEX_FEMALE))
+    found, ages, values = population_store.population_matrix(result, (SEX_MALE, SEX_FEMALE))
+    assert sorted(found) == sorted(codes)
+    assert values.shape == (2, 2, len(ages))
+    assert values.sum() == result["population"].sum()
+
+
+def test_population_matrix_empty_query(store):
+    result = population_store.query_population(["9999999999"], [MONTH], (SEX_MALE, SEX_FEMALE))
+    codes, ages, values = population_store.population_matrix(result, (SEX_MALE, SEX_FEMALE))
+    assert codes == [] and ages == []
+    assert values.shape == (0, 2, 0)
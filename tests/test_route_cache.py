@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+import route_cache
+from route_cache import (
+    DEPARTURE_BUCKET_SECONDS, FUTURE_TTL_SECONDS, LIVE_TTL_SECONDS, STATIC_TTL_SECONDS, cache_policy,
+    get_cached_route, get_cached_routes, persistent_directions, put_cached_route, put_cached_routes
+)
+
+NOW = 1_699_999_200  # DEPARTURE_BUCKET_SECONDS(900)의 배수
+ORIGIN = (37.5665, 126.9780)
+DEST = (35.1796, 129.0756)
+
+
+def policy(options, now=NOW, origin=ORIGIN, dest=DEST, mode="driving", namespace="test"):
+    return cache_policy(namespace, *origin, *dest, mode, options, now=now)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "routes.sqlite3")
+
+
+# --- 유효 시간 ---
+def test_ttl_without_departure_time():
+    key, ttl = policy({})
+    assert ttl == STATIC_TTL_SECONDS
+    assert json.loads(key)[-1] is None
+
+
+def test_ttl_for_departure_now():
+    key, ttl = policy({"departure_time": "now"})
+    assert ttl == LIVE_TTL_SECONDS
+    assert json.loads(key)[-1] == "now"
+
+
+def test_ttl_for_future_departure_is_time_until_departure():
+    _, ttl = policy({"departure_time": NOW + 2 * 60 * 60})
+    assert ttl == 2 * 60 * 60
+
+
+def test_ttl_for_far_future_departure_is_capped():
+    _, ttl = policy({"departure_time": str(NOW + 3 * 24 * 60 * 60)})
+    assert ttl == FUTURE_TTL_SECONDS
+
+
+def test_ttl_for_past_departure_is_short():
+    _, ttl = policy({"departure_time": NOW - 60})
+    assert ttl == LIVE_TTL_SECONDS
+
+
+def test_departure_times_share_a_bucket():
+    base = NOW + 60 * 60
+    same = {policy({"departure_time": base + offset})[0] for offset in (0, 1, DEPARTURE_BUCKET_SECONDS - 1)}
+    assert len(same) == 1
+    assert json.loads(same.pop())[-1] == base
+    assert policy({"departure_time": base + DEPARTURE_BUCKET_SECONDS})[0] != policy({"departure_time": base})[0]
+
+
+# --- 캐시 키 ---
+def test_key_rounds_coordinates_to_five_decimals():
+    nudged = (ORIGIN[0] + 4e-6, ORIGIN[1] - 4e-6)
+    assert policy({}, origin=nudged)[0] == policy({})[0]
+    assert policy({}, origin=(ORIGIN[0] + 2e-5, ORIGIN[1]))[0] != policy({})[0]
+    assert json.loads(policy({})[0])[1] == [37.5665, 126.978, 35.1796, 129.0756]
+
+
+def test_key_sorts_avoid_and_normalizes_alternatives():
+    assert policy({"avoid": "tolls|highways"})[0] == policy({"avoid": "highways|tolls"})[0]
+    assert policy({"avoid": "tolls"})[0] != policy({})[0]
+    assert policy({"alternatives": "True"})[0] == policy({"alternatives": True})[0]
+    assert policy({"alternatives": "false"})[0] == policy({})[0]
+
+
+def test_key_separates_namespace_mode_and_traffic_model():
+    base = policy({})[0]
+    assert policy({}, namespace="other")[0] != base
+    assert policy({}, mode="walking")[0] != base
+    assert policy({"traffic_model": "pessimistic"})[0] != base
+
+
+# --- SQLite 저장소 ---
+def test_put_and_get_round_trip(cache_path):
+    put_cached_route("k1", {"duration": "1시간", "경로": [1, 2]}, 60, cache_path)
+    assert get_cached_route("k1", cache_path) == {"duration": "1시간", "경로": [1, 2]}
+    assert get_cached_route("missing", cache_path) is None
+
+
+def test_expired_entries_are_not_returned(cache_path, monkeypatch):
+    put_cached_routes([("old", {"v": 1}, 10), ("new", {"v": 2}, 1000)], cache_path)
+    real_time = route_cache.time.time
+    monkeypatch.setattr(route_cache.time, "time", lambda: real_time() + 100)
+    assert get_cached_routes(["old", "new"], cache_path) == {"new": {"v": 2}}
+    # 다음 저장 때 만료된 행은 지워짐
+    put_cached_route("other", {"v": 3}, 1000, cache_path)
+    count = route_cache.connect(cache_path).execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+    assert count == 2
+
+
+def test_get_cached_routes_splits_large_lookups(cache_path, monkeypatch):
+    monkeypatch.setattr(route_cache, "LOOKUP_CHUNK", 3)
+    put_cached_routes([(f"k{i}", {"i": i}, 60) for i in range(10)], cache_path)
+    found = get_cached_routes([f"k{i}" for i in range(12)], cache_path)
+    assert found == {f"k{i}": {"i": i} for i in range(10)}
+
+
+def test_persistent_directions_caches_only_successes(cache_path):
+    calls = []
+
+    @persistent_directions("test", cache_path)
+    def fetch(origin_lat, origin_lng, dest_lat, dest_lng, mode="driving", **options):
+        calls.append(mode)
+        if mode == "transit":
+            return {"error_message": "경로 없음"}
+        return {"mode": mode}
+
+    assert fetch(*ORIGIN, *DEST, "driving") == {"mode": "driving"}
+    assert fetch(*ORIGIN, *DEST, "driving") == {"mode": "driving"}
+    assert fetch(*ORIGIN, *DEST, "transit") == {"error_message": "경로 없음"}
+    assert fetch(*ORIGIN, *DEST, "transit") == {"error_message": "경로 없음"}
+    assert calls == ["driving", "transit", "transit"]
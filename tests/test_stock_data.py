@@ -0,0 +1,295 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import stock_data
+
+SLEEP_SECONDS = 0.2
+
+
+class SleepingProvider:
+    # 호출마다 잠깐 멈추고, 동시에 실행 중인 호출 수의 최댓값을 기록하는 가짜 주가 제공자
+    def __init__(self, frames=None, errors=None):
+        self.frames = frames or {}
+        self.errors = errors or {}
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker, start=None, end=None, period=None):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(SLEEP_SECONDS)
+            if ticker in self.errors:
+                raise self.errors[ticker]
+            return self.frames.get(ticker, daily_bars("2024-01-01", "2024-02-01"))
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class RecordingProvider:
+    # 요청받은 (start, end) 구간을 기록하고 그 구간의 영업일 봉을 돌려주는 가짜 주가 제공자
+    def __init__(self, close=None):
+        self.calls = []
+        self.close = close or price_on
+
+    def __call__(self, ticker, start=None, end=None, period=None):
+        self.calls.append((pd.Timestamp(start), pd.Timestamp(end)))
+        index = pd.date_range(start, end, freq="B", inclusive="left", tz="Asia/Seoul")
+        return bars(index, self.close(index.tz_localize(None)))
+
+
+def price_on(index):
+    # 날짜마다 정해진 가격 (어느 구간으로 다시 받아도 같은 날은 같은 값)
+    return 100 + (index - pd.Timestamp("2024-01-01")).days.to_numpy(dtype=float)
+
+
+def bars(index, close):
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1000}, index=index)
+
+
+def daily_bars(start, end):
+    index = pd.date_range(start, end, freq="B", inclusive="left")
+    return bars(index, np.linspace(100, 110, len(index)))
+
+
+@pytest.fixture
+def price_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(stock_data, "PRICE_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def make_stale(ticker, seconds=None):
+    # 마지막으로 뒤쪽을 확인한 시각(checked_at)을 MIN_REFRESH_SECONDS보다 과거로 돌림
+    stored = stock_data.read_cached_prices(ticker)
+    stored.attrs["checked_at"] -= stock_data.MIN_REFRESH_SECONDS + 60 if seconds is None else seconds
+    stock_data.write_cached_prices(ticker, stored)
+
+
+# --- 동시 요청 ---
+def test_fetch_histories_runs_tickers_concurrently():
+    tickers = [f"T{i}" for i in range(8)]
+    provider = SleepingProvider()
+    started = time.monotonic()
+    results = stock_data.fetch_histories(tickers, start="2024-01-01", end="2024-02-01",
+                                         provider=provider, max_workers=8)
+    elapsed = time.monotonic() - started
+
+    assert list(results) == tickers
+    assert all(error is None and not hist.empty for hist, error in results.values())
+    assert provider.peak == len(tickers)
+    assert elapsed < SLEEP_SECONDS * len(tickers) / 2
+
+
+def test_fetch_histories_respects_max_workers():
+    provider = SleepingProvider()
+    stock_data.fetch_histories([f"T{i}" for i in range(6)], provider=provider, max_workers=2)
+    assert provider.peak == 2
+
+
+def test_fetch_histories_empty():
+    assert stock_data.fetch_histories([], provider=SleepingProvider()) == {}
+
+
+# --- 오류 메시지 ---
+def test_fetch_close_prices_error_messages():
+    no_close = daily_bars("2024-01-01", "2024-02-01").drop(columns=["Close"])
+    provider = SleepingProvider(
+        frames={"EMPTY": pd.DataFrame(), "NOCLOSE": no_close},
+        errors={"BROKEN": RuntimeError("연결 끊김")},
+    )
+    companies = {"정상": "OK", "오류": "BROKEN", "빈값": "EMPTY", "컬럼없음": "NOCLOSE"}
+    data, error_list = stock_data.fetch_close_prices(companies, "2024-01-01", "2024-02-01", provider=provider)
+
+    assert list(data) == ["정상"]
+    assert data["정상"].equals(daily_bars("2024-01-01", "2024-02-01")["Close"])
+    assert error_list == [
+        "오류 데이터 로드 실패: 연결 끊김",
+        "빈값: 데이터 없음",
+        "컬럼없음: 'Adj Close' 또는 'Close' 컬럼 없음",
+    ]
+
+
+def test_fetch_close_prices_prefers_adj_close():
+    hist = daily_bars("2024-01-01", "2024-02-01").assign(**{"Adj Close": 1.0})
+    data, error_list = stock_data.fetch_close_prices({"A": "A"}, None, None, provider=SleepingProvider({"A": hist}))
+    assert error_list == []
+    assert (data["A"] == 1.0).all()
+
+
+# --- 디스크 캐시의 증분 요청 구간 ---
+def test_cached_history_first_call_fetches_whole_range(price_cache):
+    provider = RecordingProvider()
+    hist = stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+
+    assert provider.calls == [(pd.Timestamp("2024-01-01"), pd.Timestamp("2024-03-01"))]
+    assert hist.index[0] == pd.Timestamp("2024-01-01") and hist.index[-1] == pd.Timestamp("2024-02-29")
+    assert hist.index.tz is None
+
+
+def test_cached_history_fresh_cache_skips_provider(price_cache):
+    provider = RecordingProvider()
+    stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+    again = stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+
+    assert len(provider.calls) == 1
+    assert len(again) == len(pd.bdate_range("2024-01-01", "2024-02-29"))
+
+
+def test_cached_history_fetches_only_the_new_tail(price_cache):
+    provider = RecordingProvider()
+    stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+    make_stale("AAA")
+    hist = stock_data.cached_history("AAA", start="2024-01-01", end="2024-04-01", provider=provider)
+
+    # 마지막 저장일(2024-02-29)부터 다시 받아 미완성 봉을 덮어씀
+    assert provider.calls[1:] == [(pd.Timestamp("2024-02-29"), pd.Timestamp("2024-04-01"))]
+    assert hist.index.is_unique and hist.index.is_monotonic_increasing
+    assert hist.index[-1] == pd.Timestamp("2024-03-29")
+
+
+def test_cached_history_extends_a_fresh_cache_to_a_later_end(price_cache):
+    # 방금 저장한 종목이라도 저장본이 닿지 않는 뒤쪽 구간을 요청하면 받아야 함
+    provider = RecordingProvider()
+    stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+    hist = stock_data.cached_history("AAA", start="2024-01-01", end="2024-04-01", provider=provider)
+
+    assert provider.calls[1:] == [(pd.Timestamp("2024-02-29"), pd.Timestamp("2024-04-01"))]
+    assert hist.index[-1] == pd.Timestamp("2024-03-29")
+
+
+def test_cached_history_head_fetch_does_not_hide_the_tail(price_cache):
+    # 앞쪽만 받아 파일을 다시 쓴 직후에도, 더 넓은 요청의 뒤쪽 구간은 받아야 함
+    provider = RecordingProvider()
+    stock_data.cached_history("AAA", start="2024-06-01", end="2024-07-01", provider=provider)
+    hist = stock_data.cached_history("AAA", start="2024-01-01", end="2024-09-01", provider=provider)
+
+    assert sorted(provider.calls[1:]) == [
+        (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-06-01")),
+        (pd.Timestamp("2024-06-28"), pd.Timestamp("2024-09-01")),
+    ]
+    assert hist.index[0] == pd.Timestamp("2024-01-01") and hist.index[-1] == pd.Timestamp("2024-08-30")
+
+
+def test_cached_history_refreshes_todays_bar_after_min_refresh(price_cache):
+    today = pd.Timestamp.today().normalize()
+    price = {"value": 100.0}
+    calls = []
+
+    def intraday(ticker, start=None, end=None, period=None):
+        calls.append((pd.Timestamp(start), pd.Timestamp(end)))
+        index = pd.date_range(start, min(pd.Timestamp(end), today + pd.Timedelta(days=1)), freq="D", inclusive="left")
+        return bars(index, np.full(len(index), price["value"]))
+
+    start = today - pd.Timedelta(days=10)
+    first = stock_data.cached_history("LIVE", start=start, provider=intraday)
+    assert first.index[-1] == today and first["Close"].iloc[-1] == 100
+
+    # MIN_REFRESH_SECONDS 안에서는 다시 묻지 않음
+    price["value"] = 150.0
+    assert stock_data.cached_history("LIVE", start=start, provider=intraday)["Close"].iloc[-1] == 100
+    assert len(calls) == 1
+
+    # 마지막 확인이 한 시간 전이면 오늘 봉을 다시 받아 덮어씀 (시가는 그대로라 전체를 다시 받지는 않음)
+    make_stale("LIVE", seconds=60 * 60)
+
+    def moved_close(ticker, start=None, end=None, period=None):
+        hist = intraday(ticker, start=start, end=end)
+        hist["Open"] = 100.0
+        return hist
+
+    refreshed = stock_data.cached_history("LIVE", start=start, provider=moved_close)
+    assert calls[1:] == [(today, today + pd.Timedelta(days=1))]
+    assert refreshed["Close"].iloc[-1] == 150
+
+
+def test_cached_history_past_range_is_not_refetched_when_stale(price_cache):
+    provider = RecordingProvider()
+    stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+    make_stale("AAA")
+    stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+    assert len(provider.calls) == 1
+
+
+def test_cached_history_fetches_only_the_earlier_head(price_cache):
+    provider = RecordingProvider()
+    stock_data.cached_history("AAA", start="2024-02-01", end="2024-03-01", provider=provider)
+    hist = stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+
+    assert provider.calls[1:] == [(pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01"))]
+    assert hist.index[0] == pd.Timestamp("2024-01-01")
+    assert stock_data.read_cached_prices("AAA").attrs["covered_from"] == "2024-01-01"
+
+
+def test_cached_history_does_not_refetch_before_listing(price_cache):
+    # 상장 전 구간처럼 빈 결과가 나온 앞쪽 구간은 covered_from으로 기억해 다시 묻지 않음
+    provider = RecordingProvider()
+    listed = pd.Timestamp("2024-02-01")
+
+    def listed_provider(ticker, start=None, end=None, period=None):
+        if pd.Timestamp(end) <= listed:
+            return pd.DataFrame()
+        return provider(ticker, start=max(pd.Timestamp(start), listed), end=end)
+
+    stock_data.cached_history("NEW", start="2024-01-01", end="2024-03-01", provider=listed_provider)
+    make_stale("NEW")
+    hist = stock_data.cached_history("NEW", start="2024-01-01", end="2024-03-01", provider=listed_provider)
+
+    assert len(provider.calls) == 1
+    assert hist.index[0] == listed
+
+
+# --- 분할/배당으로 수정 가격 기준이 바뀐 경우 ---
+def test_cached_history_refetches_everything_after_a_split(price_cache):
+    provider = RecordingProvider()
+    stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+    make_stale("AAA")
+    # 3월에 2:1 분할 → 그 이전 가격이 모두 절반으로 다시 계산되어 내려옴
+    provider.close = lambda index: price_on(index) / 2
+    hist = stock_data.cached_history("AAA", start="2024-02-01", end="2024-04-01", provider=provider)
+
+    assert provider.calls[1:] == [
+        (pd.Timestamp("2024-02-29"), pd.Timestamp("2024-04-01")),
+        (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-04-01")),
+    ]
+    stored = stock_data.read_cached_prices("AAA")
+    assert stored.attrs["covered_from"] == "2024-01-01"
+    assert stored.index[0] == pd.Timestamp("2024-01-01") and stored["Close"].iloc[0] == 50
+    assert hist.index[0] == pd.Timestamp("2024-02-01")
+
+
+def test_cached_history_refetches_everything_after_a_dividend(price_cache):
+    provider = RecordingProvider()
+    stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+    make_stale("AAA")
+
+    def with_dividend(ticker, start=None, end=None, period=None):
+        hist = provider(ticker, start=start, end=end)
+        hist["Dividends"] = np.where(hist.index.tz_localize(None) == pd.Timestamp("2024-03-15"), 0.5, 0.0)
+        return hist
+
+    stock_data.cached_history("AAA", start="2024-01-01", end="2024-04-01", provider=with_dividend)
+    assert provider.calls[-1] == (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-04-01"))
+
+
+def test_cached_history_keeps_stored_bars_when_only_the_last_close_moves(price_cache):
+    # 장중에 저장한 마지막 봉은 종가만 바뀌므로 그 봉만 덮어쓰고 전체를 다시 받지 않음
+    provider = RecordingProvider()
+    stock_data.cached_history("AAA", start="2024-01-01", end="2024-03-01", provider=provider)
+    make_stale("AAA")
+
+    def closed_higher(ticker, start=None, end=None, period=None):
+        hist = provider(ticker, start=start, end=end)
+        hist["Close"] = hist["Close"] + 3
+        return hist
+
+    hist = stock_data.cached_history("AAA", start="2024-01-01", end="2024-04-01", provider=closed_higher)
+    assert len(provider.calls) == 2
+    assert hist.at[pd.Timestamp("2024-02-28"), "Close"] == hist.at[pd.Timestamp("2024-02-28"), "Open"]
+    assert hist.at[pd.Timestamp("2024-02-29"), "Close"] == hist.at[pd.Timestamp("2024-02-29"), "Open"] + 3
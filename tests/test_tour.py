@@ -0,0 +1,59 @@
+import itertools
+
+import numpy as np
+
+from tour import fill_missing, missing_legs, optimize_tour, tour_cost
+
+NAN = np.nan
+
+
+def brute_force_cost(matrix, closed):
+    n = len(matrix)
+    return min(tour_cost(matrix, (0, *rest), closed) for rest in itertools.permutations(range(1, n)))
+
+
+# --- 최적화 ---
+def test_finds_optimal_order_on_small_asymmetric_matrix():
+    rng = np.random.default_rng(1)
+    matrix = rng.uniform(1, 100, size=(7, 7))
+    np.fill_diagonal(matrix, 0)
+    for closed in (False, True):
+        order, cost = optimize_tour(matrix, start=0, closed=closed, time_budget=0)
+        assert order[0] == 0 and sorted(order) == list(range(7))
+        assert cost == tour_cost(matrix, order, closed)
+        assert np.isclose(cost, brute_force_cost(matrix, closed))
+
+
+def test_start_is_kept_first():
+    matrix = np.abs(np.subtract.outer(np.arange(5.0), np.arange(5.0)))
+    order, cost = optimize_tour(matrix, start=2)
+    assert order[0] == 2 and cost == 6
+
+
+# --- 구하지 못한 구간 ---
+def test_missing_leg_is_not_counted_as_penalty():
+    matrix = np.array([[0, 1, NAN], [1, 0, 2], [NAN, 2, 0]])
+    order, cost = optimize_tour(matrix, start=0, closed=True)
+    assert list(order) == [0, 1, 2]
+    assert np.isnan(cost)
+    assert missing_legs(matrix, order, closed=True) == [(2, 0)]
+    assert tour_cost(np.nan_to_num(matrix), order, closed=True) == 3
+
+
+def test_penalty_still_avoids_missing_legs():
+    matrix = np.array([
+        [0, NAN, 1, 5],
+        [NAN, 0, 1, 1],
+        [1, 1, 0, 1],
+        [5, 1, 1, 0],
+    ])
+    order, cost = optimize_tour(matrix, start=0)
+    assert missing_legs(matrix, order) == []
+    assert cost == tour_cost(matrix, order) == 3
+    assert fill_missing(matrix)[0, 1] == 51
+
+
+def test_open_tour_has_no_return_leg():
+    matrix = np.array([[0, 1, NAN], [1, 0, 2], [NAN, 2, 0]])
+    order, cost = optimize_tour(matrix, start=0)
+    assert cost == 3 and missing_legs(matrix, order) == []
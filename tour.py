@@ -0,0 +1,166 @@
+import time
+
+import numpy as np
+
+# --- 다중 경유지 순서 최적화 (TSP 휴리스틱) ---
+# 거리(또는 시간) 행렬에서 출발지를 고정하고 모든 경유지를 한 번씩 도는 순서를 찾습니다.
+# 최근접 이웃으로 초기 순서를 만든 뒤, 2-opt(구간 뒤집기)와 Or-opt(1~3개 구간을 그대로/뒤집어 옮기기)를
+# 더 줄어들지 않을 때까지 번갈아 적용합니다. 각 단계의 후보 비교는 NumPy 벡터 연산으로 한 번에 계산합니다.
+# TIME_BUDGET_SECONDS 안에서는 순서를 조금 흔든 뒤 다시 개선하는 과정을 반복해 국소 최적에서 벗어납니다.
+# 도로 시간처럼 방향에 따라 값이 다른 행렬도 쓸 수 있도록 2-opt는 뒤집힌 구간 안쪽의 비용 변화까지 계산합니다.
+MAX_OR_OPT_SEGMENT = 3
+MAX_IMPROVEMENT_ROUNDS = 50
+IMPROVEMENT_EPS = 1e-9
+TIME_BUDGET_SECONDS = 0.5
+MIN_PERTURB_STOPS = 8
+
+
+def fill_missing(matrix):
+    # 구하지 못한 구간(NaN)은 가장 먼 구간의 10배로 두어 되도록 쓰지 않게 함
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if not np.isnan(matrix).any():
+        return matrix
+    finite_max = np.nanmax(matrix) if np.isfinite(np.nanmax(matrix)) else 1.0
+    return np.where(np.isnan(matrix), finite_max * 10 + 1, matrix)
+
+
+def padded(matrix):
+    # 마지막 행/열에 0을 붙여 '다음 지점 없음(열린 경로의 끝)'을 인덱스 n으로 표현
+    n = len(matrix)
+    out = np.zeros((n + 1, n + 1))
+    out[:n, :n] = matrix
+    return out
+
+
+def nearest_neighbour_order(matrix, start=0):
+    n = len(matrix)
+    order = [start]
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, matrix[order[-1]])
+        nxt = int(np.argmin(row))
+        order.append(nxt)
+        visited[nxt] = True
+    return np.array(order)
+
+
+def tour_legs(order, closed=False):
+    # 방문 순서 → (출발 인덱스 배열, 도착 인덱스 배열), 닫힌 경로면 출발지로 돌아오는 구간 포함
+    order = np.asarray(order)
+    if closed and len(order) > 1:
+        return order, np.append(order[1:], order[0])
+    return order[:-1], order[1:]
+
+
+def tour_cost(matrix, order, closed=False):
+    # 구하지 못한 구간(NaN)이 있으면 NaN
+    origins, destinations = tour_legs(order, closed)
+    return float(np.asarray(matrix, dtype=np.float64)[origins, destinations].sum())
+
+
+def missing_legs(matrix, order, closed=False):
+    # 방문 순서 중 값을 구하지 못한(NaN) 구간 → [(출발 인덱스, 도착 인덱스)]
+    origins, destinations = tour_legs(order, closed)
+    missing = np.isnan(np.asarray(matrix, dtype=np.float64)[origins, destinations])
+    return [(int(a), int(b)) for a, b in zip(origins[missing], destinations[missing])]
+
+
+def _successors(order, closed, sentinel):
+    # 각 위치의 다음 지점 (열린 경로의 마지막은 sentinel)
+    tail = order[0] if closed else sentinel
+    return np.append(order[1:], tail)
+
+
+def two_opt(matrix, order, closed=False):
+    # 위치 i..j 구간을 뒤집어 줄어드는 경우 적용 (출발지 위치 0은 고정)
+    d = padded(matrix)
+    order = order.copy()
+    n = len(order)
+    improved = False
+    for i in range(1, n - 1):
+        nxt = _successors(order, closed, n)
+        # 구간 안쪽 비용: 정방향/역방향 누적합의 차로 모든 j를 한 번에 계산
+        forward = np.concatenate([[0.0], np.cumsum(d[order[:-1], order[1:]])])
+        backward = np.concatenate([[0.0], np.cumsum(d[order[1:], order[:-1]])])
+        a, b = order[i - 1], order[i]
+        j = np.arange(i + 1, n)
+        c, e = order[j], nxt[j]
+        delta = (d[a, c] + d[b, e] - d[a, b] - d[c, e]
+                 + (backward[j] - backward[i]) - (forward[j] - forward[i]))
+        best = int(np.argmin(delta))
+        if delta[best] < -IMPROVEMENT_EPS:
+            order[i:j[best] + 1] = order[i:j[best] + 1][::-1]
+            improved = True
+    return order, improved
+
+
+def or_opt(matrix, order, closed=False):
+    # 길이 1~MAX_OR_OPT_SEGMENT 구간을 떼어 다른 자리에 (뒤집어서라도) 끼웠을 때 줄어드는 경우 적용
+    d = padded(matrix)
+    order = order.copy()
+    n = len(order)
+    improved = False
+    for length in range(1, MAX_OR_OPT_SEGMENT + 1):
+        i = 1
+        while i + length <= n:
+            segment = order[i:i + length]
+            rest = np.concatenate([order[:i], order[i + length:]])
+            prev = order[i - 1]
+            after = order[i + length] if i + length < n else (order[0] if closed else n)
+            removal_gain = d[prev, segment[0]] + d[segment[-1], after] - d[prev, after]
+            # rest의 k번째 지점 뒤에 그대로/뒤집어 끼우는 비용 (k=0은 출발지 바로 뒤)
+            rest_next = _successors(rest, closed, n)
+            reversed_segment = segment[::-1]
+            reverse_delta = d[reversed_segment[:-1], reversed_segment[1:]].sum() - d[segment[:-1], segment[1:]].sum()
+            insert_cost = np.stack([
+                d[rest, segment[0]] + d[segment[-1], rest_next] - d[rest, rest_next],
+                d[rest, segment[-1]] + d[segment[0], rest_next] - d[rest, rest_next] + reverse_delta,
+            ])
+            insert_cost[0, i - 1] = np.inf  # 원래 자리
+            flip, k = np.unravel_index(int(np.argmin(insert_cost)), insert_cost.shape)
+            if insert_cost[flip, k] - removal_gain < -IMPROVEMENT_EPS:
+                order = np.concatenate([rest[:k + 1], reversed_segment if flip else segment, rest[k + 1:]])
+                improved = True
+            i += 1
+    return order, improved
+
+
+def improve(matrix, order, closed=False, max_rounds=MAX_IMPROVEMENT_ROUNDS):
+    # 2-opt와 Or-opt를 더 줄어들지 않을 때까지 번갈아 적용
+    for _ in range(max_rounds):
+        order, improved_2opt = two_opt(matrix, order, closed)
+        order, improved_or = or_opt(matrix, order, closed)
+        if not (improved_2opt or improved_or):
+            break
+    return order
+
+
+def double_bridge(order, rng):
+    # 출발지를 뺀 순서를 세 곳에서 잘라 두 구간의 위치를 맞바꿈 (2-opt/Or-opt로는 되돌리기 어려운 변형)
+    a, b, c = np.sort(rng.choice(np.arange(1, len(order)), size=3, replace=False))
+    return np.concatenate([order[:a], order[b:c], order[a:b], order[c:]])
+
+
+def optimize_tour(matrix, start=0, closed=False, time_budget=TIME_BUDGET_SECONDS, seed=0):
+    # matrix: N×N 비용 행렬 → (방문 순서 인덱스 배열, 총 비용)
+    # 최근접 이웃 + 국소 개선 결과에서 시작해, 시간이 남으면 변형(double bridge) 후 다시 개선해 더 짧은 순서를 찾음
+    # 구하지 못한 구간의 벌점은 순서를 정할 때만 쓰고, 총 비용은 원래 행렬로 계산함 (그런 구간을 지나면 NaN)
+    original = np.asarray(matrix, dtype=np.float64)
+    order = _best_order(fill_missing(original), start, closed, time_budget, seed)
+    return order, tour_cost(original, order, closed)
+
+
+def _best_order(matrix, start, closed, time_budget, seed):
+    if len(matrix) <= 2:
+        return np.array([start] + [i for i in range(len(matrix)) if i != start])
+    deadline = time.monotonic() + time_budget
+    best_order = improve(matrix, nearest_neighbour_order(matrix, start), closed)
+    best_cost = tour_cost(matrix, best_order, closed)
+    rng = np.random.default_rng(seed)
+    while len(matrix) >= MIN_PERTURB_STOPS and time.monotonic() < deadline:
+        order = improve(matrix, double_bridge(best_order, rng), closed)
+        cost = tour_cost(matrix, order, closed)
+        if cost < best_cost - IMPROVEMENT_EPS:
+            best_order, best_cost = order, cost
+    return best_order